@@ -1,27 +1,68 @@
 import os
-import requests
-from fastapi import FastAPI, Request
-
-from modules.pdf_to_word import handle_pdf_to_word
-from modules.summary import (
-    handle_summary_pdf,
-    handle_summary_word,
-    handle_summary_text,
-)
-from modules.ocr_cleaner import handle_ocr_pdf
-
-BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-TELEGRAM_API = f"https://api.telegram.org/bot{BOT_TOKEN}"
+import math
+import asyncio
+from contextlib import asynccontextmanager
 
-app = FastAPI()
-
-# حالت کاربر:
-# {chat_id: "WORD" | "SUMMARY_PDF" | "SUMMARY_WORD" | "SUMMARY_TEXT" | "OCR_PDF" | None}
-user_state = {}
-
-# وضعیت دسترسی کاربران:
-# { user_id: {"free_used": bool, "paid_remaining": int} }
-user_access = {}
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+
+from modules.handlers import HANDLERS, WARMUP_HANDLERS, warm_up
+from modules.batch import batches, BATCH_MODES, BATCH_MAX_FILES
+from modules.router import Router, UpdateContext, PDF_MIME, DOCX_MIME
+from modules.pool import shutdown_executor
+from modules.jobs import QueueFullError, UserQueueFullError, estimate_cost
+from modules.ratelimit import RateLimiter
+from modules.broker import create_job_queue
+from modules.telegram_api import close_client
+from modules.outbox import outbox
+from modules.workspace import cleanup_stale_workspaces
+from modules.downloader import MAX_DOWNLOAD_BYTES, FileTooLargeError
+from modules.prefetch import prefetch_buffer
+from modules.cache import result_cache
+from modules.storage import AsyncStorage, create_storage
+from modules.polling import UPDATE_MODE, UpdatePoller
+from modules import metrics
+
+# صف کارهای سنگین؛ webhook فقط کار را در صف می‌گذارد و سریع جواب می‌دهد
+# (با JOB_BROKER کارها را پروسس‌های جدای worker.py اجرا می‌کنند)
+job_queue = create_job_queue()
+
+# محدودیت نرخ ثبت کار برای هر کاربر (token bucket)
+rate_limiter = RateLimiter()
+
+metrics.queue_depth.set_function(lambda: len(job_queue))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    cleanup_stale_workspaces()
+    await job_queue.start()
+    # هندلرها lazy هستند؛ با WARMUP_HANDLERS بعد از بالا آمدن سرور در پس‌زمینه بار می‌شوند
+    warmup = asyncio.create_task(asyncio.to_thread(warm_up)) if WARMUP_HANDLERS else None
+    # با UPDATE_MODE=polling آپدیت‌ها به جای webhook با getUpdates گرفته می‌شوند
+    poller = UpdatePoller(handle_update, storage) if UPDATE_MODE == "polling" else None
+    if poller is not None:
+        poller.start()
+    yield
+    if poller is not None:
+        await poller.stop()
+    if warmup is not None:
+        await warmup
+    await job_queue.stop()
+    prefetch_buffer.close()
+    await outbox.flush()
+    await close_client()
+    shutdown_executor()
+    storage.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# حالت کاربر و وضعیت دسترسی کاربران (حافظه یا SQLite؛ STORAGE_BACKEND):
+# حالت: "WORD" | "SUMMARY_PDF" | "SUMMARY_WORD" | "SUMMARY_TEXT" | "OCR_PDF" | "HYBRID_PDF" | None
+# دسترسی: {"free_used": bool, "paid_remaining": int}
+# فراخوانی‌ها async هستند تا SQLite در ترد جدا اجرا شود، نه روی event loop
+storage = AsyncStorage(create_storage())
 
 # آی‌دی تلگرام ادمین (خودت) - باید در Environment تنظیم شده باشد
 ADMIN_ID = int(os.getenv("TELEGRAM_ADMIN_ID", "0"))
@@ -32,278 +73,453 @@ def home():
     return {"status": "ok", "message": "bot is running"}
 
 
+@app.get("/metrics")
+def metrics_endpoint():
+    # فرمت متنی Prometheus
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/webhook")
 async def telegram_webhook(req: Request):
     update = await req.json()
+    metrics.updates_total.inc(source="webhook")
+    return await handle_update(update)
+
+
+async def handle_update(update: dict):
+    """
+    مسیریابی یک آپدیت تلگرام؛ هم webhook و هم UpdatePoller (حالت polling) از این استفاده می‌کنند.
+    """
     message = update.get("message") or update.get("edited_message")
     if not message:
         return {"ok": True}
 
-    chat_id = message["chat"]["id"]
-    text = message.get("text")
-    document = message.get("document")
-    from_user = message.get("from") or {}
-    user_id = from_user.get("id", chat_id)
-
-    # ---------- دستورات ادمین ----------
-    if text and text.startswith("/credit"):
-        if user_id != ADMIN_ID:
-            send_message(chat_id, "شما ادمین نیستید ❌")
-            return {"ok": True}
-
-        parts = text.split()
-        if len(parts) != 3:
-            send_message(
-                chat_id,
-                "فرمت درست:\n/credit USER_ID COUNT\nمثال:\n/credit 123456789 10",
-            )
-            return {"ok": True}
-
-        try:
-            target_id = int(parts[1])
-            count = int(parts[2])
-        except ValueError:
-            send_message(chat_id, "USER_ID و COUNT باید عددی باشند.")
-            return {"ok": True}
-
-        info = user_access.setdefault(
-            target_id, {"free_used": True, "paid_remaining": 0}
-        )
-        info["paid_remaining"] += count
-        info["free_used"] = True  # یعنی رایگانش را مصرف شده فرض می‌کنیم
+    await router.dispatch(UpdateContext(message))
+    return {"ok": True}
 
-        send_message(
-            chat_id,
-            f"برای کاربر {target_id} تعداد {count} اعتبار اضافه شد ✅",
-        )
-        return {"ok": True}
 
-    if text and text.startswith("/me"):
-        info = user_access.get(user_id, {"free_used": False, "paid_remaining": 0})
-        msg = (
-            f"وضعیت شما:\n"
-            f"- استفاده رایگان: {'مصرف شده' if info['free_used'] else 'هنوز باقیه'}\n"
-            f"- اعتبار پولی باقی‌مانده: {info['paid_remaining']}"
-        )
-        send_message(chat_id, msg)
-        return {"ok": True}
+# ---------- جدول مسیرها ----------
 
-    # ---------- /start ----------
-    if text == "/start":
-        send_main_menu(chat_id)
-        user_state[chat_id] = None
-        return {"ok": True}
+router = Router(get_mode=storage.get_state)
+
+# منو: (متن دکمه، حالت، پیام تأیید، ردیف کیبورد)
+router.menu_item(
+    "📄 PDF → Word", "WORD",
+    "حالت «PDF → Word» انتخاب شد ✅\nلطفاً فایل PDF را بفرست.",
+    row=0,
+)
+router.menu_item(
+    "🧾 خلاصه PDF", "SUMMARY_PDF",
+    "حالت «خلاصه PDF» انتخاب شد ✅\nلطفاً فایل PDF را بفرست.",
+    row=1,
+)
+router.menu_item(
+    "📑 خلاصه Word", "SUMMARY_WORD",
+    "حالت «خلاصه Word» انتخاب شد ✅\nلطفاً فایل Word را بفرست.",
+    row=1,
+)
+router.menu_item(
+    "✍ خلاصه متن", "SUMMARY_TEXT",
+    "حالت «خلاصه متن» انتخاب شد ✅\nمتن خودت رو اینجا پیست کن تا خلاصه کنم.",
+    row=2,
+)
+router.menu_item(
+    "🔤 تبدیل اسکن به متن (PDF)", "OCR_PDF",
+    "حالت «تبدیل اسکن به متن تایپی (PDF → Word تایپی)» فعال شد ✅\n"
+    "لطفاً فایل PDF اسکن‌شده یا عکس‌دار را بفرست.",
+    row=3,
+)
+router.menu_item(
+    "🧩 PDF ترکیبی (متن + اسکن)", "HYBRID_PDF",
+    "حالت «PDF ترکیبی» فعال شد ✅\n"
+    "صفحه‌های متنی مستقیم خونده می‌شن و فقط صفحه‌های اسکن‌شده OCR می‌شن.\n"
+    "لطفاً فایل PDF را بفرست.",
+    row=4,
+)
+
+# کارها: (حالت، نوع فایل) -> هندلر؛ None یعنی پیام متنی
+# (هندلرها از modules.handlers می‌آیند و ماژولشان اولین بار موقع اجرای کار import می‌شود)
+router.job("WORD", PDF_MIME, HANDLERS["handle_pdf_to_word"])
+router.job("SUMMARY_PDF", PDF_MIME, HANDLERS["handle_summary_pdf"])
+router.job("OCR_PDF", PDF_MIME, HANDLERS["handle_ocr_pdf"])
+router.job("HYBRID_PDF", PDF_MIME, HANDLERS["handle_hybrid_pdf"])
+router.job("SUMMARY_WORD", DOCX_MIME, HANDLERS["handle_summary_word"])
+router.job("SUMMARY_TEXT", None, HANDLERS["handle_summary_text"])
 
-    # ---------- انتخاب از منو ----------
-    if text == "📄 PDF → Word":
-        user_state[chat_id] = "WORD"
-        send_message(
-            chat_id,
-            "حالت «PDF → Word» انتخاب شد ✅\nلطفاً فایل PDF را بفرست.",
-        )
-        return {"ok": True}
 
-    if text == "🧾 خلاصه PDF":
-        user_state[chat_id] = "SUMMARY_PDF"
-        send_message(
+@router.on_job
+async def run_job(ctx: UpdateContext, handler, *args):
+    """
+    مشترک برای همه کارها: بررسی دسترسی (و ثبت استفاده) و بعد صف.
+    """
+    file_ids = [ctx.document["file_id"]] if ctx.document else []
+    allowed, source = await check_access(ctx.user_id)
+    if not allowed:
+        prefetch_buffer.discard(*file_ids)
+        await send_no_access_message(ctx.chat_id)
+        return
+
+    await enqueue_job(
+        ctx.chat_id, ctx.user_id, source, handler, *args,
+        cost=estimate_cost(ctx.mode, ctx.file_size), file_ids=file_ids,
+    )
+
+
+@router.on_menu
+async def select_mode(ctx: UpdateContext, item):
+    await storage.set_state(ctx.chat_id, item.mode)
+
+    # اگر قبلاً فایلی بدون حالت فرستاده بود، همان با حالت جدید پردازش می‌شود
+    entry = prefetch_buffer.take_waiting(ctx.chat_id)
+    handler = None
+    if entry is not None:
+        handler = router.jobs.get((item.mode, entry.mime))
+        if handler is None:
+            prefetch_buffer.hold(ctx.chat_id, entry)
+    if handler is None:
+        outbox.send(ctx.chat_id, item.reply)
+        return
+
+    outbox.send(ctx.chat_id, "حالت انتخاب شد ✅ همون فایلی که فرستاده بودی رو پردازش می‌کنم.")
+    job_ctx = UpdateContext(entry.message)
+    job_ctx.mode = item.mode
+    document = job_ctx.document
+    await run_job(job_ctx, handler, document["file_id"], document.get("file_unique_id"))
+
+
+# ---------- دستورات ادمین ----------
+@router.command("/credit")
+async def credit_command(ctx: UpdateContext):
+    chat_id = ctx.chat_id
+    if ctx.user_id != ADMIN_ID:
+        outbox.send(chat_id, "شما ادمین نیستید ❌")
+        return
+
+    parts = ctx.text.split()
+    if len(parts) != 3:
+        outbox.send(
             chat_id,
-            "حالت «خلاصه PDF» انتخاب شد ✅\nلطفاً فایل PDF را بفرست.",
+            "فرمت درست:\n/credit USER_ID COUNT\nمثال:\n/credit 123456789 10",
         )
-        return {"ok": True}
+        return
 
-    if text == "📑 خلاصه Word":
-        user_state[chat_id] = "SUMMARY_WORD"
-        send_message(
+    try:
+        target_id = int(parts[1])
+        count = int(parts[2])
+    except ValueError:
+        outbox.send(chat_id, "USER_ID و COUNT باید عددی باشند.")
+        return
+
+    await storage.add_credit(target_id, count)
+
+    outbox.send(
+        chat_id,
+        f"برای کاربر {target_id} تعداد {count} اعتبار اضافه شد ✅",
+    )
+
+
+@router.command("/me")
+async def me_command(ctx: UpdateContext):
+    info = await storage.get_access(ctx.user_id)
+    msg = (
+        f"وضعیت شما:\n"
+        f"- استفاده رایگان: {'مصرف شده' if info['free_used'] else 'هنوز باقیه'}\n"
+        f"- اعتبار پولی باقی‌مانده: {info['paid_remaining']}"
+    )
+    outbox.send(ctx.chat_id, msg)
+
+
+@router.command("/start")
+async def start_command(ctx: UpdateContext):
+    await send_main_menu(ctx.chat_id)
+    await storage.set_state(ctx.chat_id, None)
+    batch = batches.close(ctx.chat_id)
+    if batch:
+        # دسته نیمه‌کاره اجرا نمی‌شود؛ پیش‌دریافت فایل‌هایش هم لازم نیست
+        prefetch_buffer.discard(*[file_id for file_id, _, _ in batch["files"]])
+
+
+# ---------- حالت دسته‌ای (چند فایل در یک کار) ----------
+@router.command("/batch")
+async def batch_command(ctx: UpdateContext):
+    chat_id = ctx.chat_id
+    mode = await storage.get_state(chat_id)
+    if mode not in BATCH_MODES:
+        outbox.send(
             chat_id,
-            "حالت «خلاصه Word» انتخاب شد ✅\nلطفاً فایل Word را بفرست.",
+            "اول از منو یکی از حالت‌های فایل (PDF → Word، خلاصه، OCR یا ترکیبی) رو انتخاب کن، "
+            "بعد /batch رو بزن.",
         )
-        return {"ok": True}
+        return
+
+    batches.open(chat_id, ctx.user_id, mode)
+    outbox.send(
+        chat_id,
+        f"حالت دسته‌ای شروع شد 📚\nتا {BATCH_MAX_FILES} فایل بفرست و آخرش /done رو بزن.\n"
+        "همه با هم و فقط با یک اعتبار پردازش می‌شن.",
+    )
+
 
-    if text == "✍ خلاصه متن":
-        user_state[chat_id] = "SUMMARY_TEXT"
-        send_message(
+@router.command("/done")
+async def done_command(ctx: UpdateContext):
+    batch = batches.close(ctx.chat_id)
+    if not batch or not batch["files"]:
+        outbox.send(ctx.chat_id, "هیچ فایلی برای پردازش دسته‌ای نفرستادی.")
+        return
+
+    await submit_batch(batch)
+
+
+# ---------- دریافت فایل (PDF / Word) ----------
+# کارهای کوتاه پس‌زمینه (مثل پیام راهنمای بعد از پیش‌دریافت)؛
+# ارجاعشان نگه داشته می‌شود تا garbage collector وسط کار جمعشان نکند
+_background_tasks = set()
+
+# حداکثر انتظار برای پیش‌دریافت قبل از فرستادن پیام راهنمای PDF (ثانیه)
+PREFETCH_HINT_TIMEOUT = 30
+
+
+def run_in_background(coro):
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+@router.document_filter
+async def reject_large_file(ctx: UpdateContext) -> bool:
+    # فایل‌های خیلی بزرگ قبل از رفتن به صف و دانلود رد می‌شوند
+    if ctx.file_size > MAX_DOWNLOAD_BYTES:
+        outbox.send(ctx.chat_id, str(FileTooLargeError()))
+        return True
+    return False
+
+
+@router.document_filter
+async def prefetch_document(ctx: UpdateContext) -> bool:
+    # دانلود و بررسی سریع فایل از همین حالا در پس‌زمینه (تا نوبت صف یا انتخاب حالت)؛
+    # برای کاربری که اعتبار ندارد، یا فایلی که نتیجه‌اش از قبل در کش است
+    # (هندلر اصلاً دانلودش نمی‌کند)، پهنای باند و جای بافر خرج نمی‌شود
+    fetch = await has_access(ctx.user_id) and not await has_cached_result(ctx)
+    prefetch_buffer.start(ctx.message, fetch=fetch)
+    return False
+
+
+async def has_cached_result(ctx: UpdateContext) -> bool:
+    """
+    آیا نتیجه همین فایل در حالت فعلی کاربر از قبل در کش نتایج هست.
+    """
+    file_unique_id = ctx.document.get("file_unique_id")
+    # کارهای دسته‌ای همه فایل‌ها را دانلود می‌کنند
+    if not file_unique_id or ctx.media_group_id or batches.get(ctx.chat_id):
+        return False
+    handler = router.jobs.get((ctx.mode, ctx.mime))
+    if handler is None:
+        return False
+    try:
+        key = await asyncio.to_thread(handler.cache_key, file_unique_id)
+    except Exception as e:
+        print("ERROR in has_cached_result:", e)
+        return False
+    return key is not None and await result_cache.acontains(key)
+
+
+@router.document_filter
+async def collect_batch_file(ctx: UpdateContext) -> bool:
+    # دسته‌ای: آلبوم (media_group_id) یا بین /batch و /done
+    chat_id = ctx.chat_id
+    open_batch = batches.get(chat_id)
+    if not (open_batch or (ctx.media_group_id and ctx.mode in BATCH_MODES)):
+        return False
+
+    batch_mode = open_batch["mode"] if open_batch else ctx.mode
+    if ctx.mime != BATCH_MODES[batch_mode]:
+        prefetch_buffer.discard(ctx.document["file_id"])
+        outbox.send(
             chat_id,
-            "حالت «خلاصه متن» انتخاب شد ✅\nمتن خودت رو اینجا پیست کن تا خلاصه کنم.",
+            "نوع این فایل با حالت انتخاب‌شده جور نیست و به دسته اضافه نشد.",
         )
-        return {"ok": True}
-
-    if text == "🔤 تبدیل اسکن به متن (PDF)":
-        user_state[chat_id] = "OCR_PDF"
-        send_message(
+        return True
+
+    document = ctx.document
+    added = batches.add(
+        chat_id, ctx.user_id, batch_mode,
+        [document["file_id"], document.get("file_unique_id"), document.get("file_name")],
+        cost=estimate_cost(batch_mode, ctx.file_size),
+        media_group_id=ctx.media_group_id,
+        on_ready=submit_batch,
+    )
+    if not added:
+        prefetch_buffer.discard(document["file_id"])
+        outbox.send(
             chat_id,
-            "حالت «تبدیل اسکن به متن تایپی (PDF → Word تایپی)» فعال شد ✅\n"
-            "لطفاً فایل PDF اسکن‌شده یا عکس‌دار را بفرست.",
+            f"هر دسته حداکثر {BATCH_MAX_FILES} فایل می‌تونه داشته باشه؛ این فایل اضافه نشد.",
         )
-        return {"ok": True}
+    return True
 
-    mode = user_state.get(chat_id)
 
-    # ---------- خلاصه متن (بدون فایل) ----------
-    if mode == "SUMMARY_TEXT" and text and not text.startswith("/"):
-        allowed, source = check_access(user_id)
-        if not allowed:
-            send_no_access_message(chat_id)
-            return {"ok": True}
+@router.fallback(PDF_MIME)
+async def pdf_without_mode(ctx: UpdateContext):
+    # اگر حالت مشخص نشده بود فایل نگه داشته می‌شود تا بعد از انتخاب حالت پردازش شود
+    entry = prefetch_buffer.lookup(ctx.message)
+    prefetch_buffer.hold(ctx.chat_id, entry)
+
+    outbox.send(
+        ctx.chat_id,
+        "مشخص نکردی با این PDF چه کاری انجام بدم.\n"
+        "از منو یکی از گزینه‌ها رو انتخاب کن 🌱 (لازم نیست فایل رو دوباره بفرستی)",
+    )
+    await send_main_menu(ctx.chat_id)
+    if entry.task is not None:
+        run_in_background(send_pdf_hint(ctx.chat_id, entry))
+
+
+async def send_pdf_hint(chat_id: int, entry):
+    # وقتی پیش‌دریافت تمام شد (و کاربر هنوز حالت را انتخاب نکرده) تعداد صفحات و نوع PDF را می‌گوییم
+    try:
+        info = await prefetch_buffer.info(entry, timeout=PREFETCH_HINT_TIMEOUT)
+        if not info.get("pages") or not prefetch_buffer.is_waiting(chat_id, entry):
+            return
+        text = f"📄 این فایل {info['pages']} صفحه داره."
+        if not info["has_text"]:
+            text += "\nبه نظر اسکن‌شده‌ست؛ گزینه «🔤 تبدیل اسکن به متن (PDF)» براش مناسب‌تره."
+        outbox.send(chat_id, text)
+    except Exception as e:
+        print("ERROR in send_pdf_hint:", e)
+
+
+@router.fallback(DOCX_MIME)
+async def docx_without_mode(ctx: UpdateContext):
+    prefetch_buffer.hold(ctx.chat_id, prefetch_buffer.lookup(ctx.message))
+    outbox.send(
+        ctx.chat_id,
+        "برای خلاصه‌کردن Word، از منو گزینه «📑 خلاصه Word» رو انتخاب کن "
+        "(لازم نیست فایل رو دوباره بفرستی).",
+    )
+
+
+@router.fallback()
+async def unsupported_file(ctx: UpdateContext):
+    # سایر فایل‌ها
+    outbox.send(
+        ctx.chat_id,
+        "این نوع فایل را پشتیبانی نمی‌کنم. فقط PDF و Word (docx) را بفرست.",
+    )
 
-        await handle_summary_text(chat_id, text)
-        register_use(user_id, source)
-        return {"ok": True}
 
-    # ---------- دریافت فایل (PDF / Word) ----------
-    if document:
-        mime = document.get("mime_type", "")
-        file_id = document["file_id"]
-
-        # ===== PDF ها =====
-        if mime == "application/pdf":
-            # PDF → Word
-            if mode == "WORD":
-                allowed, source = check_access(user_id)
-                if not allowed:
-                    send_no_access_message(chat_id)
-                    return {"ok": True}
-
-                send_message(
-                    chat_id,
-                    "در حال تبدیل PDF به Word هستم، چند لحظه صبر کن... ⏳",
-                )
-                await handle_pdf_to_word(chat_id, file_id)
-                register_use(user_id, source)
-                return {"ok": True}
-
-            # خلاصه PDF
-            if mode == "SUMMARY_PDF":
-                allowed, source = check_access(user_id)
-                if not allowed:
-                    send_no_access_message(chat_id)
-                    return {"ok": True}
-
-                await handle_summary_pdf(chat_id, file_id)
-                register_use(user_id, source)
-                return {"ok": True}
-
-            # OCR PDF → Word تایپی
-            if mode == "OCR_PDF":
-                allowed, source = check_access(user_id)
-                if not allowed:
-                    send_no_access_message(chat_id)
-                    return {"ok": True}
-
-                await handle_ocr_pdf(chat_id, file_id)
-                register_use(user_id, source)
-                return {"ok": True}
-
-            # اگر حالت مشخص نشده بود
-            send_message(
-                chat_id,
-                "مشخص نکردی با این PDF چه کاری انجام بدم.\n"
-                "از منو یکی از گزینه‌ها رو انتخاب کن 🌱",
-            )
-            send_main_menu(chat_id)
-            return {"ok": True}
-
-        # ===== Word (docx) =====
-        if mime == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-            if mode == "SUMMARY_WORD":
-                allowed, source = check_access(user_id)
-                if not allowed:
-                    send_no_access_message(chat_id)
-                    return {"ok": True}
-
-                await handle_summary_word(chat_id, file_id)
-                register_use(user_id, source)
-                return {"ok": True}
-
-            send_message(
-                chat_id,
-                "برای خلاصه‌کردن Word، اول از منو گزینه «📑 خلاصه Word» رو انتخاب کن.",
-            )
-            return {"ok": True}
-
-        # سایر فایل‌ها
-        send_message(
+# ---------- سایر متن‌ها ----------
+@router.on_text
+async def unknown_text(ctx: UpdateContext):
+    outbox.send(
+        ctx.chat_id,
+        "برای شروع /start را بزن و از منو یکی از حالت‌ها را انتخاب کن 🌱",
+    )
+
+
+async def submit_batch(batch: dict):
+    """
+    یک دسته کامل را به عنوان یک کار (و با یک اعتبار) در صف می‌گذارد.
+    """
+    chat_id, user_id = batch["chat_id"], batch["user_id"]
+    file_ids = [file_id for file_id, _, _ in batch["files"]]
+    allowed, source = await check_access(user_id)
+    if not allowed:
+        prefetch_buffer.discard(*file_ids)
+        await send_no_access_message(chat_id)
+        return
+
+    await enqueue_job(
+        chat_id, user_id, source, HANDLERS["handle_batch"], batch["mode"], batch["files"],
+        cost=batch["cost"], file_ids=file_ids,
+    )
+
+
+async def enqueue_job(chat_id, user_id, source, handler, *args, cost=1, file_ids=()):
+    """
+    file_ids: فایل‌های کار؛ اگر کار به صف نرسد یا بدون دانلودشان تمام شود
+    (مثلاً نتیجه از کش آمد) پیش‌دریافتشان از بافر بیرون می‌رود.
+    """
+    wait = rate_limiter.take(user_id)
+    if wait:
+        # اعتبار در check_access کم شده بود؛ کار اجرا نشد پس برمی‌گردد
+        await refund_use(user_id, source)
+        prefetch_buffer.discard(*file_ids)
+        outbox.send(
             chat_id,
-            "این نوع فایل را پشتیبانی نمی‌کنم. فقط PDF و Word (docx) را بفرست.",
+            "تعداد درخواست‌هات پشت سر هم زیاد شده ⏱\n"
+            f"حدود {math.ceil(wait)} ثانیه دیگه دوباره امتحان کن.",
         )
-        return {"ok": True}
+        return
 
-    # ---------- سایر متن‌ها ----------
-    if text:
-        send_message(
+    try:
+        ahead = await job_queue.asubmit(
+            chat_id, prefetch_buffer.releasing(handler, file_ids), chat_id, *args,
+            user_id=user_id, cost=cost,
+        )
+    except UserQueueFullError:
+        await refund_use(user_id, source)
+        rate_limiter.refund(user_id)
+        prefetch_buffer.discard(*file_ids)
+        outbox.send(
             chat_id,
-            "برای شروع /start را بزن و از منو یکی از حالت‌ها را انتخاب کن 🌱",
+            "چند تا کار از تو هنوز توی صف منتظرن ⏳\n"
+            "صبر کن اون‌ها تموم بشن، بعد فایل بعدی رو بفرست.",
         )
+        return
+    except QueueFullError:
+        await refund_use(user_id, source)
+        rate_limiter.refund(user_id)
+        prefetch_buffer.discard(*file_ids)
+        outbox.send(
+            chat_id,
+            "سرور الان خیلی شلوغه 😕\n"
+            "چند دقیقه دیگه دوباره امتحان کن.",
+        )
+        return
 
-    return {"ok": True}
+    if ahead:
+        outbox.send(
+            chat_id,
+            f"درخواستت در صف قرار گرفت ⏳\n{ahead} کار جلوتر از تو در صف هست.",
+        )
+
+
+async def send_main_menu(chat_id):
+    outbox.send(
+        chat_id,
+        "سلام 👋\nیکی از گزینه‌ها را انتخاب کن:",
+        reply_markup=router.keyboard(),
+    )
 
 
-def send_message(chat_id, text):
-    requests.post(f"{TELEGRAM_API}/sendMessage", json={
-        "chat_id": chat_id,
-        "text": text,
-    })
-
-
-def send_main_menu(chat_id):
-    keyboard = {
-        "keyboard": [
-            [
-                {"text": "📄 PDF → Word"},
-            ],
-            [
-                {"text": "🧾 خلاصه PDF"},
-                {"text": "📑 خلاصه Word"},
-            ],
-            [
-                {"text": "✍ خلاصه متن"},
-            ],
-            [
-                {"text": "🔤 تبدیل اسکن به متن (PDF)"},
-            ],
-        ],
-        "resize_keyboard": True,
-    }
-
-    requests.post(f"{TELEGRAM_API}/sendMessage", json={
-        "chat_id": chat_id,
-        "text": "سلام 👋\nیکی از گزینه‌ها را انتخاب کن:",
-        "reply_markup": keyboard,
-    })
-
-
-def check_access(user_id: int):
+async def check_access(user_id: int):
     """
+    دسترسی را بررسی و در همان قدم (به صورت اتمی) یک استفاده ثبت می‌کند:
+    اول استفاده رایگان، بعد اعتبار پولی.
     برمی‌گردونه:
     (allowed: bool, source: 'FREE' | 'PAID' | None)
     """
-    info = user_access.get(user_id, {"free_used": False, "paid_remaining": 0})
-
-    # هنوز استفاده رایگان نکرده
-    if not info["free_used"]:
-        return True, "FREE"
+    source = await storage.consume_credit(user_id)
+    return source is not None, source
 
-    # استفاده رایگان کرده و اعتبار پولی دارد
-    if info["paid_remaining"] > 0:
-        return True, "PAID"
 
-    # هیچ دسترسی ندارد
-    return False, None
+async def has_access(user_id: int) -> bool:
+    """
+    مثل check_access ولی بدون ثبت استفاده (فقط برای تصمیم‌های ارزان مثل پیش‌دریافت).
+    """
+    access = await storage.get_access(user_id)
+    return not access["free_used"] or access["paid_remaining"] > 0
 
 
-def register_use(user_id: int, source: str):
+async def refund_use(user_id: int, source: str):
     """
-    بعد از هر استفاده موفق صدا زده می‌شود.
+    وقتی کار بعد از check_access اصلاً اجرا نشد، اعتبار را برمی‌گرداند.
     """
-    info = user_access.setdefault(user_id, {"free_used": False, "paid_remaining": 0})
-
-    if source == "FREE":
-        info["free_used"] = True
-    elif source == "PAID" and info["paid_remaining"] > 0:
-        info["paid_remaining"] -= 1
+    await storage.refund_credit(user_id, source)
 
 
-def send_no_access_message(chat_id: int):
-    send_message(
+async def send_no_access_message(chat_id: int):
+    outbox.send(
         chat_id,
         "سهمیه استفاده‌ات تموم شده ❌\n"
         "یک بار استفاده رایگان داشتی که مصرف شده.\n"
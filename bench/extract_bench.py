@@ -0,0 +1,72 @@
+"""
+مقایسه موتورهای استخراج متن PDF روی یک پوشه از فایل‌های نمونه.
+
+    python -m bench.extract_bench path/to/pdfs [--repeat 3] [--backends pypdf2,pdfium]
+
+برای هر فایل و هر موتور، زمان استخراج ترتیبی (یک پروسس) و موازی
+(استخر پروسس‌ها) و تعداد کاراکترهای استخراج‌شده را به صورت JSON چاپ می‌کند.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+from modules.extract import available_backends, extract_pages
+from modules.pool import shutdown_executor
+
+
+async def measure(pdf_bytes: bytes, backend: str, parallel: bool, repeat: int) -> dict:
+    # با parallel_min_pages خیلی بزرگ، همه صفحات در یک پروسس خوانده می‌شوند
+    min_pages = 1 if parallel else sys.maxsize
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        texts = await extract_pages(pdf_bytes, backend, parallel_min_pages=min_pages)
+        times.append(time.perf_counter() - start)
+
+    return {
+        "pages": len(texts),
+        "chars": sum(len(t) for t in texts),
+        "best_seconds": round(min(times), 4),
+        "pages_per_second": round(len(texts) / min(times), 1) if min(times) else None,
+    }
+
+
+async def run(corpus: str, backends: list, repeat: int) -> list:
+    results = []
+    for name in sorted(os.listdir(corpus)):
+        if not name.lower().endswith(".pdf"):
+            continue
+        with open(os.path.join(corpus, name), "rb") as f:
+            pdf_bytes = f.read()
+
+        for backend in backends:
+            for parallel in (False, True):
+                row = {"file": name, "backend": backend, "parallel": parallel}
+                try:
+                    row.update(await measure(pdf_bytes, backend, parallel, repeat))
+                except Exception as e:
+                    row["error"] = str(e)
+                results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("corpus", help="پوشه فایل‌های PDF نمونه")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backends", default=",".join(available_backends()))
+    args = parser.parse_args()
+
+    try:
+        results = asyncio.run(run(args.corpus, args.backends.split(","), args.repeat))
+    finally:
+        shutdown_executor()
+    json.dump(results, sys.stdout, ensure_ascii=False, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+جایگزین محلی Bot API تلگرام برای بنچمارک و تست بار:
+getFile، دانلود فایل، sendMessage، editMessageText، sendDocument و getUpdates.
+
+ربات با TELEGRAM_API_BASE=http://127.0.0.1:PORT به این سرور وصل می‌شود.
+برای هر چت معلوم می‌کند کار کی تمام شده (ok یا error) تا load_test زمان را بسنجد.
+"""
+import re
+import json
+import time
+import asyncio
+import itertools
+
+from fastapi import FastAPI, Request
+from fastapi.responses import Response, JSONResponse
+
+# پیام «آماده شد» در حالت‌های خلاصه؛ پیام بعدی همان خلاصه است
+_SUMMARY_READY = "خلاصه آماده شد"
+# پیام‌های خطا/ناموفق هندلرها این ایموجی‌ها را دارند
+_ERROR_MARKERS = ("😔", "😕")
+
+_CHAT_ID = re.compile(rb'name="chat_id"\r\n\r\n(-?\d+)')
+_FILENAME = re.compile(rb'filename="([^"]*)"')
+
+
+class FakeTelegram:
+    def __init__(self):
+        self.app = FastAPI()
+        self.files = {}
+        self.calls = {}
+        self._ids = itertools.count(1)
+        self._waiters = {}
+        self._summary_ready = set()
+        # آپدیت‌هایی که با getUpdates تحویل داده می‌شوند (حالت polling)
+        self.updates = []
+        self._update_ids = itertools.count(1)
+        self._new_updates = None
+        self._routes()
+
+    def push_update(self, update: dict):
+        """
+        آپدیت را برای getUpdates صف می‌کند (update_id مثل تلگرام صعودی داده می‌شود).
+        """
+        update = dict(update, update_id=next(self._update_ids))
+        self.updates.append(update)
+        if self._new_updates is not None:
+            self._new_updates.set()
+
+    async def _get_updates(self, offset: int, limit: int, timeout: float) -> list:
+        # مثل تلگرام: آپدیت‌های قبل از offset تأییدشده حساب و حذف می‌شوند
+        if offset:
+            self.updates = [u for u in self.updates if u["update_id"] >= offset]
+        if not self.updates and timeout:
+            self._new_updates = asyncio.Event()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.updates[:limit]
+
+    def add_file(self, content: bytes) -> str:
+        file_id = f"file{next(self._ids)}"
+        self.files[file_id] = content
+        return file_id
+
+    def wait(self, chat_id: int) -> asyncio.Future:
+        """
+        Future ای که وقتی کار این چت تمام شد (status, زمان) را برمی‌گرداند.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[chat_id] = future
+        return future
+
+    def _finish(self, chat_id: int, status: str):
+        future = self._waiters.pop(chat_id, None)
+        if future is not None and not future.done():
+            future.set_result((status, time.perf_counter()))
+
+    def _on_message(self, chat_id: int, text: str):
+        if chat_id in self._summary_ready:
+            self._summary_ready.discard(chat_id)
+            self._finish(chat_id, "ok")
+        elif text.startswith(_SUMMARY_READY):
+            self._summary_ready.add(chat_id)
+        elif any(marker in text for marker in _ERROR_MARKERS):
+            self._finish(chat_id, "error")
+
+    def _on_document(self, chat_id: int, filename: str):
+        # فایل‌های جزئی (ocr_pages_1-10.docx) پایان کار نیستند
+        if "_pages_" not in filename:
+            self._finish(chat_id, "ok")
+
+    def _routes(self):
+        app = self.app
+
+        @app.post("/bot{token}/{method}")
+        async def bot_method(token: str, method: str, request: Request):
+            self.calls[method] = self.calls.get(method, 0) + 1
+            body = await request.body()
+
+            if method == "sendDocument":
+                chat_id = _CHAT_ID.search(body)
+                filename = _FILENAME.search(body)
+                if chat_id:
+                    self._on_document(
+                        int(chat_id.group(1)),
+                        filename.group(1).decode() if filename else "",
+                    )
+                return {"ok": True, "result": {"message_id": next(self._ids)}}
+
+            data = json.loads(body or b"{}")
+            if method == "getFile":
+                file_id = data.get("file_id")
+                if file_id not in self.files:
+                    return JSONResponse(
+                        {"ok": False, "error_code": 400, "description": "file not found"},
+                        status_code=400,
+                    )
+                return {"ok": True, "result": {
+                    "file_id": file_id,
+                    "file_path": file_id,
+                    "file_size": len(self.files[file_id]),
+                }}
+
+            if method == "getUpdates":
+                result = await self._get_updates(
+                    data.get("offset") or 0, data.get("limit", 100), data.get("timeout", 0)
+                )
+                return {"ok": True, "result": result}
+
+            if method == "sendMessage":
+                self._on_message(int(data.get("chat_id", 0)), data.get("text", ""))
+
+            return {"ok": True, "result": {"message_id": next(self._ids)}}
+
+        @app.get("/file/bot{token}/{file_path}")
+        async def file_download(token: str, file_path: str):
+            content = self.files.get(file_path)
+            if content is None:
+                return Response(status_code=404)
+            return Response(content, media_type="application/octet-stream")
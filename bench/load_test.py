@@ -0,0 +1,241 @@
+"""
+تست بار آفلاین: app.app با یک Bot API ساختگی (bench.fake_telegram) اجرا می‌شود
+و آپدیت‌های webhook با هم‌زمانی مشخص برایش فرستاده می‌شوند.
+
+    python -m bench.load_test [--modes WORD,SUMMARY_PDF,OCR_PDF] [--pages 1,10,50]
+                              [--requests 20] [--concurrency 8] [--out results.json]
+                              [--ingest webhook|polling]
+
+هر حالت در یک پروسس جدا اجرا می‌شود تا حداکثر حافظه (peak RSS) هر حالت جدا
+اندازه‌گیری شود. برای هر (حالت، تعداد صفحه): p50/p95/p99 تأخیر (از رسیدن webhook
+تا تحویل نتیجه به تلگرام)، throughput، تعداد خطاها و peak RSS به صورت JSON.
+با --ingest polling آپدیت‌ها به جای POST به /webhook در صف getUpdates سرور ساختگی
+گذاشته می‌شوند و UpdatePoller برنامه آن‌ها را می‌گیرد.
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import resource
+import tempfile
+import subprocess
+
+# هر حالت چه نوع PDFی لازم دارد
+MODE_INPUTS = {
+    "WORD": "text",
+    "SUMMARY_PDF": "text",
+    "SUMMARY_WORD": "docx",
+    "SUMMARY_TEXT": "message",
+    "OCR_PDF": "scanned",
+    "HYBRID_PDF": "mixed",
+}
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return None
+    values = sorted(values)
+    index = (len(values) - 1) * q
+    low = int(index)
+    high = min(low + 1, len(values) - 1)
+    return round(values[low] + (values[high] - values[low]) * (index - low), 4)
+
+
+def peak_rss_mb() -> dict:
+    # ru_maxrss در لینوکس کیلوبایت است؛ children یعنی پروسس‌های OCR و pdftoppm
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return {"self": round(own / 1024, 1), "children": round(children / 1024, 1)}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def make_input(kind: str, pages: int, seed: int):
+    from bench.pdfgen import GENERATORS, text_pdf
+    from modules.docx_writer import build_docx
+    from modules.extract import PyPDF2Backend
+
+    if kind == "docx":
+        pdf = text_pdf(pages, seed=seed)
+        return build_docx(PyPDF2Backend.pages(pdf, 0, pages))
+    if kind == "message":
+        rng = random.Random(seed)
+        words = "data system page model result memory speed process network".split()
+        return " ".join(rng.choice(words) for _ in range(pages * 300)) + "."
+    return GENERATORS[kind](pages, seed=seed)
+
+
+def update_for(chat_id: int, kind: str, file_id, size: int) -> dict:
+    message = {"chat": {"id": chat_id}, "from": {"id": chat_id}}
+    if kind == "message":
+        message["text"] = file_id
+    else:
+        message["document"] = {
+            "file_id": file_id,
+            # شناسه یکتا برای هر درخواست تا کش نتایج نتیجه را خراب نکند
+            "file_unique_id": f"bench-{chat_id}-{time.time_ns()}",
+            "mime_type": DOCX_MIME if kind == "docx" else "application/pdf",
+            "file_size": size,
+        }
+    return {"update_id": chat_id, "message": message}
+
+
+async def run_mode(mode: str, pages_list: list, requests: int, concurrency: int,
+                   timeout: float, ingest: str = "webhook") -> list:
+    import httpx
+    import uvicorn
+
+    from bench.fake_telegram import FakeTelegram
+
+    fake = FakeTelegram()
+    port = _free_port()
+    os.environ["TELEGRAM_API_BASE"] = f"http://127.0.0.1:{port}"
+
+    server = uvicorn.Server(uvicorn.Config(fake.app, port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    # app بعد از تنظیم متغیرهای محیطی import می‌شود (تنظیمات در سطح ماژول خوانده می‌شوند)
+    import app as bot
+
+    kind = MODE_INPUTS[mode]
+    results = []
+
+    transport = httpx.ASGITransport(app=bot.app)
+    async with bot.app.router.lifespan_context(bot.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bot") as client:
+            for pages in pages_list:
+                content = make_input(kind, pages, seed=pages)
+                file_ref = content if kind == "message" else fake.add_file(content)
+                size = len(content)
+                semaphore = asyncio.Semaphore(concurrency)
+                latencies, errors = [], 0
+
+                async def one(i: int):
+                    nonlocal errors
+                    chat_id = pages * 1_000_000 + i + 1
+                    await bot.storage.add_credit(chat_id, 1)
+                    await bot.storage.set_state(chat_id, mode)
+                    async with semaphore:
+                        done = fake.wait(chat_id)
+                        start = time.perf_counter()
+                        update = update_for(chat_id, kind, file_ref, size)
+                        if ingest == "polling":
+                            fake.push_update(update)
+                        else:
+                            await client.post("/webhook", json=update)
+                        try:
+                            status, finished = await asyncio.wait_for(done, timeout)
+                        except asyncio.TimeoutError:
+                            status, finished = "timeout", time.perf_counter()
+                        if status == "ok":
+                            latencies.append(finished - start)
+                        else:
+                            errors += 1
+
+                started = time.perf_counter()
+                await asyncio.gather(*(one(i) for i in range(requests)))
+                wall = time.perf_counter() - started
+
+                results.append({
+                    "mode": mode,
+                    "pages": pages,
+                    "input_bytes": size,
+                    "requests": requests,
+                    "concurrency": concurrency,
+                    "ingest": ingest,
+                    "ok": len(latencies),
+                    "errors": errors,
+                    "p50": percentile(latencies, 0.50),
+                    "p95": percentile(latencies, 0.95),
+                    "p99": percentile(latencies, 0.99),
+                    "throughput_per_second": round(len(latencies) / wall, 3) if wall else None,
+                    "wall_seconds": round(wall, 3),
+                })
+
+    server.should_exit = True
+    await server_task
+
+    rss = peak_rss_mb()
+    for row in results:
+        row["peak_rss_mb"] = rss
+    return results
+
+
+def _configure_env(cache_dir: str, ingest: str):
+    # محدودیت‌های تولید نباید نتیجه بنچمارک را خراب کنند
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "bench")
+    os.environ.setdefault("JOB_RATE_PER_MINUTE", "0")
+    os.environ.setdefault("JOB_USER_MAX_PENDING", "1000000")
+    os.environ.setdefault("JOB_QUEUE_MAXSIZE", "1000000")
+    os.environ.setdefault("PROGRESS_MIN_INTERVAL", "3600")
+    os.environ.setdefault("RESULT_CACHE_DIR", cache_dir)
+    os.environ["STORAGE_BACKEND"] = "memory"
+    os.environ["JOB_BROKER"] = ""
+    os.environ["UPDATE_MODE"] = ingest
+    os.environ.setdefault("POLLING_TIMEOUT", "1")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modes", default="WORD,SUMMARY_PDF,SUMMARY_WORD,SUMMARY_TEXT")
+    parser.add_argument("--pages", default="1,10,50")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--ingest", choices=("webhook", "polling"), default="webhook")
+    parser.add_argument("--out", help="فایل خروجی JSON (پیش‌فرض stdout)")
+    parser.add_argument("--single", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    pages = [int(p) for p in args.pages.split(",")]
+
+    if args.single:
+        with tempfile.TemporaryDirectory(prefix="bench-cache-") as cache_dir:
+            _configure_env(cache_dir, args.ingest)
+            results = asyncio.run(
+                run_mode(
+                    args.single, pages, args.requests, args.concurrency, args.timeout,
+                    args.ingest,
+                )
+            )
+        json.dump(results, sys.stdout)
+        return
+
+    results = []
+    for mode in args.modes.split(","):
+        command = [
+            sys.executable, "-m", "bench.load_test", "--single", mode,
+            "--pages", args.pages,
+            "--requests", str(args.requests),
+            "--concurrency", str(args.concurrency),
+            "--timeout", str(args.timeout),
+            "--ingest", args.ingest,
+        ]
+        proc = subprocess.run(command, capture_output=True, text=True)
+        if proc.returncode != 0:
+            results.append({"mode": mode, "error": proc.stderr.strip().splitlines()[-1:]})
+            continue
+        results.extend(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    output = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
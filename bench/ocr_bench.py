@@ -0,0 +1,124 @@
+"""
+اثر پروفایل‌های پیش‌پردازش (modules.ocr_preprocess) روی زمان و دقت OCR، صفحه به صفحه.
+
+    python -m bench.ocr_bench [--pages 5] [--dpi 200] [--skew 3] [--noise 0.01]
+                              [--blank-every 4] [--profiles off,fast,default,accurate]
+    python -m bench.ocr_bench --pdf scan.pdf [--truth scan.txt]
+
+بدون --pdf صفحات اسکن‌شده ساختگی (bench.pdfgen) با متن معلوم ساخته می‌شوند؛
+دقت = شباهت کلمه‌ای خروجی Tesseract با متن اصلی (0 تا 1).
+برای PDF واقعی، با --truth (متن صفحات جدا شده با form feed) دقت هم حساب می‌شود.
+خروجی JSON: برای هر (پروفایل، صفحه) زمان پیش‌پردازش، زمان OCR، سفید بودن و دقت
+و در آخر جمع هر پروفایل.
+"""
+import sys
+import json
+import time
+import argparse
+import difflib
+
+from modules.ocr_engine import ocr_page
+from modules.ocr_preprocess import PROFILES, preprocess
+from modules.ocr_cleaner import TESS_LANG
+
+
+def word_accuracy(truth: str, text: str):
+    if truth is None:
+        return None
+    truth_words, words = truth.split(), text.split()
+    if not truth_words:
+        return 1.0 if not words else 0.0
+    return round(difflib.SequenceMatcher(None, truth_words, words, autojunk=False).ratio(), 4)
+
+
+def load_pages(args):
+    """
+    (تصاویر صفحات، متن اصلی هر صفحه یا None)
+    """
+    if args.pdf:
+        from pdf2image import convert_from_path
+
+        images = convert_from_path(args.pdf, dpi=args.dpi, grayscale=True)
+        truths = [None] * len(images)
+        if args.truth:
+            with open(args.truth, encoding="utf-8") as f:
+                truths = f.read().split("\f")
+        return images, truths
+
+    from bench.pdfgen import scanned_images, scanned_lines
+
+    images = scanned_images(
+        args.pages, dpi=args.dpi, skew=args.skew, noise=args.noise,
+        blank_every=args.blank_every,
+    )
+    truths = ["\n".join(lines) for lines in scanned_lines(args.pages)]
+    if args.blank_every:
+        for i in range(args.blank_every - 1, args.pages, args.blank_every):
+            truths[i] = ""
+    return images, truths
+
+
+def run(images, truths, profiles, dpi: int, lang: str) -> list:
+    rows = []
+    for profile in profiles:
+        for number, (image, truth) in enumerate(zip(images, truths), start=1):
+            start = time.perf_counter()
+            prepared, prepared_dpi = preprocess(image, PROFILES[profile], dpi)
+            prep_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            text = "" if prepared is None else ocr_page(prepared, lang, prepared_dpi)
+            ocr_seconds = time.perf_counter() - start
+
+            rows.append({
+                "profile": profile,
+                "page": number,
+                "blank": prepared is None,
+                "preprocess_seconds": round(prep_seconds, 4),
+                "ocr_seconds": round(ocr_seconds, 4),
+                "accuracy": word_accuracy(truth, text),
+            })
+    return rows
+
+
+def summarize(rows: list) -> list:
+    totals = []
+    for profile in dict.fromkeys(row["profile"] for row in rows):
+        group = [row for row in rows if row["profile"] == profile]
+        scored = [row["accuracy"] for row in group if row["accuracy"] is not None]
+        totals.append({
+            "profile": profile,
+            "pages": len(group),
+            "blank_pages": sum(row["blank"] for row in group),
+            "preprocess_seconds": round(sum(row["preprocess_seconds"] for row in group), 3),
+            "ocr_seconds": round(sum(row["ocr_seconds"] for row in group), 3),
+            "mean_accuracy": round(sum(scored) / len(scored), 4) if scored else None,
+        })
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdf", help="PDF اسکن‌شده واقعی (به جای صفحات ساختگی)")
+    parser.add_argument("--truth", help="متن درست صفحات PDF، جدا شده با \\f")
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--skew", type=float, default=3.0, help="حداکثر کجی صفحات ساختگی (درجه)")
+    parser.add_argument("--noise", type=float, default=0.01)
+    parser.add_argument("--blank-every", type=int, default=4)
+    parser.add_argument("--profiles", default=",".join(PROFILES))
+    parser.add_argument("--lang", default=TESS_LANG)
+    args = parser.parse_args()
+
+    profiles = args.profiles.split(",")
+    unknown = [p for p in profiles if p not in PROFILES]
+    if unknown:
+        sys.exit(f"unknown profiles: {', '.join(unknown)}")
+
+    images, truths = load_pages(args)
+    rows = run(images, truths, profiles, args.dpi, args.lang)
+    print(json.dumps({"pages": rows, "profiles": summarize(rows)}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+ساخت PDFهای ساختگی برای بنچمارک: متنی، اسکن‌شده (فقط تصویر) و ترکیبی.
+
+    python -m bench.pdfgen out_dir [--pages 1,10,100] [--kinds text,scanned,mixed]
+"""
+import io
+import os
+import random
+import argparse
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+_WORDS = (
+    "data system page model result memory speed process network user file "
+    "document text table figure section report value method analysis time"
+).split()
+
+
+def _lines(rng: random.Random, count: int) -> list:
+    return [
+        " ".join(rng.choice(_WORDS) for _ in range(rng.randint(6, 12)))
+        for _ in range(count)
+    ]
+
+
+def text_pdf(pages: int, lines_per_page: int = 40, seed: int = 1) -> bytes:
+    """
+    PDF متنی (لایه متنی واقعی با فونت Helvetica) بدون هیچ وابستگی.
+    """
+    rng = random.Random(seed)
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(pages))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i in range(pages):
+        body = " ".join(f"({line}) Tj T*" for line in _lines(rng, lines_per_page))
+        stream = f"BT /F1 11 Tf 50 760 Td 16 TL {body} ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode()
+        )
+        objects.append(
+            f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream".encode()
+        )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + obj + b"\nendobj\n"
+
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n"
+    ).encode()
+    return bytes(out)
+
+
+def scanned_lines(pages: int, lines_per_page: int = 40, seed: int = 1) -> list:
+    """
+    خطوط متن هر صفحه scanned_pdf با همین seed (برای سنجش دقت OCR).
+    """
+    rng = random.Random(seed)
+    return [_lines(rng, lines_per_page) for _ in range(pages)]
+
+
+def scanned_images(pages: int, dpi: int = 100, lines_per_page: int = 40, seed: int = 1,
+                   skew: float = 0.0, noise: float = 0.0, blank_every: int = 0) -> list:
+    """
+    تصویر صفحات اسکن‌شده (متن خطوط همان scanned_lines است).
+    skew (درجه)، noise (نسبت پیکسل‌های نقطه‌نقطه) و blank_every (هر چند صفحه
+    یک صفحه سفید) اسکن واقعی را شبیه‌سازی می‌کنند.
+    """
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    width, height = int(8.5 * dpi), int(11 * dpi)
+    images = []
+    for number, lines in enumerate(scanned_lines(pages, lines_per_page, seed), start=1):
+        image = Image.new("L", (width, height), 255)
+        if not (blank_every and number % blank_every == 0):
+            draw = ImageDraw.Draw(image)
+            y = dpi // 2
+            for line in lines:
+                draw.text((dpi // 2, y), line, fill=0)
+                y += (height - dpi) // lines_per_page
+        if skew:
+            image = image.rotate(rng.uniform(-skew, skew), fillcolor=255)
+        if noise:
+            pixels = np.array(image)
+            pixels[np_rng.random(pixels.shape) < noise] = 0
+            image = Image.fromarray(pixels)
+        images.append(image)
+    return images
+
+
+def scanned_pdf(pages: int, dpi: int = 100, lines_per_page: int = 40, seed: int = 1,
+                **kwargs) -> bytes:
+    """
+    PDF اسکن‌شده: هر صفحه فقط یک تصویر از متن است (بدون لایه متنی).
+    """
+    images = scanned_images(pages, dpi, lines_per_page, seed, **kwargs)
+    buffer = io.BytesIO()
+    images[0].save(
+        buffer, "PDF", resolution=dpi, save_all=True, append_images=images[1:]
+    )
+    return buffer.getvalue()
+
+
+def mixed_pdf(pages: int, scanned_every: int = 3, seed: int = 1) -> bytes:
+    """
+    PDF ترکیبی: از هر scanned_every صفحه یکی اسکن‌شده است.
+    """
+    from PyPDF2 import PdfReader, PdfWriter
+
+    text_pages = PdfReader(io.BytesIO(text_pdf(pages, seed=seed))).pages
+    scanned_pages = PdfReader(io.BytesIO(scanned_pdf(pages, seed=seed))).pages
+
+    writer = PdfWriter()
+    for i in range(pages):
+        source = scanned_pages if i % scanned_every == scanned_every - 1 else text_pages
+        writer.add_page(source[i])
+
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+GENERATORS = {
+    "text": text_pdf,
+    "scanned": scanned_pdf,
+    "mixed": mixed_pdf,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("out_dir")
+    parser.add_argument("--pages", default="1,10,100")
+    parser.add_argument("--kinds", default=",".join(GENERATORS))
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    for kind in args.kinds.split(","):
+        for pages in [int(p) for p in args.pages.split(",")]:
+            path = os.path.join(args.out_dir, f"{kind}-{pages}.pdf")
+            with open(path, "wb") as f:
+                f.write(GENERATORS[kind](pages))
+            print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+هزینه مسیریابی هر آپدیت در جدول مسیرهای app (modules.router): ساختن UpdateContext
+و پیدا کردن هندلر، بدون اجرای آن و بدون شبکه.
+
+    python -m bench.router_bench [--iterations 200000] [--extra 0,100,1000]
+
+برای هر نوع آپدیت (دستور، دکمه منو، فایل در هر حالت، متن خلاصه، متن ناشناخته)
+نانوثانیه به ازای هر آپدیت چاپ می‌شود. با --extra به تعداد داده‌شده دستور، دکمه
+و حالت ساختگی به جدول اضافه می‌شود تا معلوم شود هزینه با تعداد مسیرها زیاد نمی‌شود.
+"""
+import os
+import json
+import time
+import argparse
+
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "bench")
+
+from modules.router import UpdateContext, PDF_MIME, DOCX_MIME  # noqa: E402
+
+
+def message(text=None, mime=None) -> dict:
+    msg = {"chat": {"id": 1}, "from": {"id": 1}}
+    if text is not None:
+        msg["text"] = text
+    if mime is not None:
+        msg["document"] = {
+            "file_id": "f", "file_unique_id": "u", "mime_type": mime, "file_size": 1000,
+        }
+    return msg
+
+
+CASES = [
+    ("command /start", None, message("/start")),
+    ("command /credit", None, message("/credit 1 2")),
+    ("menu label", None, message("🧩 PDF ترکیبی (متن + اسکن)")),
+    ("pdf WORD", "WORD", message(mime=PDF_MIME)),
+    ("pdf OCR_PDF", "OCR_PDF", message(mime=PDF_MIME)),
+    ("docx SUMMARY_WORD", "SUMMARY_WORD", message(mime=DOCX_MIME)),
+    ("text SUMMARY_TEXT", "SUMMARY_TEXT", message("some long text to summarize")),
+    ("pdf without mode", None, message(mime=PDF_MIME)),
+    ("unknown text", None, message("hello")),
+]
+
+
+def add_synthetic_routes(router, start: int, stop: int):
+    async def noop(*args):
+        pass
+
+    for i in range(start, stop):
+        router.command(f"/extra{i}")(noop)
+        router.menu_item(f"extra {i}", f"EXTRA_{i}", "", row=100 + i)
+        router.job(f"EXTRA_{i}", PDF_MIME, noop)
+
+
+def measure(router, mode, msg, iterations: int) -> float:
+    resolve = router.resolve
+    start = time.perf_counter()
+    for _ in range(iterations):
+        ctx = UpdateContext(msg)
+        # در dispatch این را load_mode از storage پر می‌کند
+        ctx.mode = mode
+        resolve(ctx)
+    return (time.perf_counter() - start) / iterations * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--extra", default="0,100,1000")
+    args = parser.parse_args()
+
+    import app as bot
+
+    router = bot.router
+    results = []
+    added = 0
+    for extra in (int(x) for x in args.extra.split(",")):
+        add_synthetic_routes(router, added, extra)
+        added = extra
+        for name, mode, msg in CASES:
+            results.append({
+                "case": name,
+                "extra_routes": extra,
+                "ns_per_update": round(measure(router, mode, msg, args.iterations), 1),
+            })
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
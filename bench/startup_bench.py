@@ -0,0 +1,100 @@
+"""
+هزینه شروع پروسس: زمان import app / worker، حافظه (RSS) و کتابخانه‌های سنگینی
+که بار شده‌اند، و هزینه import ماژول هر هندلر (modules.handlers).
+
+    python -m bench.startup_bench [--repeat 5] [--targets app,worker]
+                                  [--warmup "",all]
+
+هر اندازه‌گیری در یک پروسس پایتون تازه انجام می‌شود تا کش import اثری نداشته باشد.
+برای هر هدف و هر مقدار WARMUP_HANDLERS، میانه زمان import، بیشترین RSS (مگابایت)
+و کتابخانه‌های سنگین بارشده چاپ می‌شود؛ بعد برای هر هندلر جدا، زمان و RSS اضافه‌ای
+که اولین اجرای آن کار به پروسس وب تحمیل می‌کند.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# کتابخانه‌هایی که پروسس وب نباید بدون نیاز بار کند
+HEAVY_MODULES = (
+    "PyPDF2", "docx", "lxml", "numpy", "PIL", "pytesseract", "pdf2image", "tesserocr",
+)
+
+# در پروسس فرزند اجرا می‌شود: import هدف، بعد (اختیاری) warm_up و بار کردن یک هندلر
+_PROBE = """
+import sys, time, json, resource
+start = time.perf_counter()
+import {target}
+imported = time.perf_counter() - start
+from modules.handlers import HANDLERS, warm_up
+rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+warm_up({warmup!r})
+if {handler!r}:
+    HANDLERS[{handler!r}].load()
+loaded = time.perf_counter() - start
+print(json.dumps({{
+    "import_seconds": imported,
+    "load_seconds": loaded,
+    "rss_before_kb": rss_before,
+    "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "heavy": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def probe(target: str, warmup: str = "", handler: str = "") -> dict:
+    env = dict(os.environ)
+    env.setdefault("TELEGRAM_BOT_TOKEN", "bench")
+    code = _PROBE.format(target=target, warmup=warmup, handler=handler, heavy=HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure(repeat: int, **kwargs) -> dict:
+    runs = [probe(**kwargs) for _ in range(repeat)]
+    return {
+        "import_seconds": round(statistics.median(r["import_seconds"] for r in runs), 4),
+        "load_seconds": round(statistics.median(r["load_seconds"] for r in runs), 4),
+        "rss_mb": round(statistics.median(r["rss_kb"] for r in runs) / 1024, 1),
+        "extra_rss_mb": round(
+            statistics.median(r["rss_kb"] - r["rss_before_kb"] for r in runs) / 1024, 1
+        ),
+        "heavy_modules": runs[-1]["heavy"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--targets", default="app,worker")
+    parser.add_argument("--warmup", default=",all",
+                        help='مقدارهای WARMUP_HANDLERS با کاما ("" یعنی بدون warm-up)')
+    args = parser.parse_args()
+
+    from modules.handlers import HANDLERS
+
+    results = {"startup": [], "handlers": []}
+    for target in args.targets.split(","):
+        for warmup in args.warmup.split(","):
+            results["startup"].append({
+                "target": target,
+                "warmup": warmup,
+                **measure(args.repeat, target=target, warmup=warmup),
+            })
+
+    for name in HANDLERS:
+        results["handlers"].append({
+            "handler": name,
+            **measure(args.repeat, target="app", handler=name),
+        })
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
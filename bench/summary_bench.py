@@ -0,0 +1,77 @@
+"""
+زمان خلاصه‌سازی روی متن‌های بزرگ (واقعی یا ساختگی).
+
+    python -m bench.summary_bench [--pages 10,100,1000] [--file book.txt] [--method textrank,tfidf]
+
+با --file متن همان فایل چند بار پشت سر هم تکرار می‌شود تا به تعداد صفحات برسد؛
+بدون آن متن ساختگی فارسی/انگلیسی ساخته می‌شود. خروجی JSON است.
+"""
+import sys
+import json
+import time
+import random
+import argparse
+
+from modules.summarizer import split_sentences, summarize
+
+_WORDS = (
+    "سیستم داده پردازش کاربر فایل متن سرعت حافظه نتیجه روش مدل شبکه "
+    "document page text model result memory speed process network user "
+).split()
+
+# تقریباً تعداد جمله‌های یک صفحه معمولی
+SENTENCES_PER_PAGE = 30
+
+
+def synthetic_text(pages: int, seed: int = 1) -> str:
+    rng = random.Random(seed)
+    sentences = []
+    for _ in range(pages * SENTENCES_PER_PAGE):
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(6, 20))]
+        sentences.append(" ".join(words) + ".")
+    return " ".join(sentences)
+
+
+def repeated_text(path: str, pages: int) -> str:
+    with open(path, encoding="utf-8") as f:
+        base = f.read()
+    needed = pages * SENTENCES_PER_PAGE
+    count = max(1, len(split_sentences(base)))
+    return "\n\n".join([base] * max(1, -(-needed // count)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", default="10,100,1000")
+    parser.add_argument("--file", help="فایل متنی نمونه (UTF-8)")
+    parser.add_argument("--method", default="textrank,tfidf")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    results = []
+    for pages in [int(p) for p in args.pages.split(",")]:
+        text = repeated_text(args.file, pages) if args.file else synthetic_text(pages)
+        sentences = len(split_sentences(text))
+
+        for method in args.method.split(","):
+            times = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                summary = summarize(text, method=method)
+                times.append(time.perf_counter() - start)
+
+            results.append({
+                "pages": pages,
+                "sentences": sentences,
+                "method": method,
+                "best_seconds": round(min(times), 4),
+                "sentences_per_second": round(sentences / min(times)) if min(times) else None,
+                "summary_chars": len(summary),
+            })
+
+    json.dump(results, sys.stdout, ensure_ascii=False, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+مقایسه تأخیر هر صفحه بین موتورهای OCR (modules.ocr_engine.ENGINES):
+pytesseract (یک پروسس tesseract برای هر صفحه) و tesserocr (libtesseract ماندگار).
+
+    python -m bench.tesseract_bench [--pages 10] [--dpi 200] [--pdf scan.pdf]
+                                    [--engines tesserocr,pytesseract] [--lang eng]
+
+برای هر موتور صفحات به ترتیب در همین پروسس OCR می‌شوند؛ صفحه اول جدا
+(cold: شامل بارگذاری مدل زبان در tesserocr) و بقیه با p50/p95/میانگین گزارش می‌شوند.
+"""
+import sys
+import json
+import time
+import argparse
+
+from modules.ocr_engine import ENGINES, available_engines, ocr_page
+from modules.ocr_cleaner import TESS_LANG
+from bench.load_test import percentile
+
+
+def load_images(args) -> list:
+    if args.pdf:
+        from pdf2image import convert_from_path
+
+        return convert_from_path(args.pdf, dpi=args.dpi, grayscale=True)[:args.pages]
+
+    from bench.pdfgen import scanned_images
+
+    return scanned_images(args.pages, dpi=args.dpi)
+
+
+def measure(engine: str, images: list, lang: str, dpi: int) -> dict:
+    latencies = []
+    chars = 0
+    for image in images:
+        start = time.perf_counter()
+        chars += len(ocr_page(image, lang, dpi, engine=engine))
+        latencies.append(time.perf_counter() - start)
+
+    warm = latencies[1:] or latencies
+    return {
+        "engine": engine,
+        "pages": len(latencies),
+        "chars": chars,
+        "cold_seconds": round(latencies[0], 4),
+        "p50": percentile(warm, 0.50),
+        "p95": percentile(warm, 0.95),
+        "mean": round(sum(warm) / len(warm), 4),
+        "pages_per_second": round(len(latencies) / sum(latencies), 2) if sum(latencies) else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdf", help="PDF اسکن‌شده واقعی (به جای صفحات ساختگی)")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--engines", default=",".join(available_engines()))
+    parser.add_argument("--lang", default=TESS_LANG)
+    args = parser.parse_args()
+
+    engines = args.engines.split(",")
+    missing = [name for name in engines if name not in ENGINES or not ENGINES[name].available()]
+    if missing:
+        sys.exit(f"not available: {', '.join(missing)} (installed: {', '.join(available_engines())})")
+
+    images = load_images(args)
+    results = [measure(engine, images, args.lang, args.dpi) for engine in engines]
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+import io
+import os
+import asyncio
+import zipfile
+
+from modules.telegram_api import send_message
+from modules.delivery import deliver_text, deliver_document
+from modules.downloader import download
+from modules.extract import extract_pages, extract_pdf_text
+from modules.docx_writer import DocxStreamWriter, build_docx
+from modules.progress import ProgressMessage
+from modules.metrics import set_mode, timed, count_error, pages_total
+from modules.router import PDF_MIME, DOCX_MIME
+
+# حداکثر تعداد فایل در یک دسته
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "10"))
+
+# فایل‌های یک آلبوم (media group) جدا جدا می‌رسند؛
+# اگر این مدت (ثانیه) فایل تازه‌ای نیامد، آلبوم کامل حساب می‌شود
+MEDIA_GROUP_WAIT = float(os.getenv("MEDIA_GROUP_WAIT", "2"))
+
+# خروجی دسته: "merged" (یک فایل Word) یا "zip" (یک Word برای هر فایل داخل zip)
+BATCH_OUTPUT = os.getenv("BATCH_OUTPUT", "merged")
+
+# app فقط BatchCollector را لازم دارد؛ ماژول‌های OCR و خلاصه (pytesseract، pdf2image،
+# python-docx، numpy) داخل تابع‌ها import می‌شوند تا وب بدون آن‌ها بالا بیاید (modules.handlers).
+
+# حالت‌هایی که دسته‌ای اجرا می‌شوند و نوع فایلی که هر کدام لازم دارد
+BATCH_MODES = {
+    "WORD": PDF_MIME,
+    "OCR_PDF": PDF_MIME,
+    "HYBRID_PDF": PDF_MIME,
+    "SUMMARY_PDF": PDF_MIME,
+    "SUMMARY_WORD": DOCX_MIME,
+}
+
+
+class BatchCollector:
+    """
+    فایل‌های یک دسته را قبل از رفتن به صف جمع می‌کند:
+    - آلبوم‌ها با media_group_id (بعد از MEDIA_GROUP_WAIT ثانیه سکوت خودکار بسته می‌شوند)
+    - دسته‌های دستی بین /batch و /done
+    فقط در حافظه همین پروسس نگه داشته می‌شود.
+    """
+
+    def __init__(self, wait: float = MEDIA_GROUP_WAIT, max_files: int = BATCH_MAX_FILES):
+        self.wait = wait
+        self.max_files = max_files
+        # {key: {"chat_id", "user_id", "mode", "files": [...], "cost", "timer"}}
+        self._batches = {}
+        # ارجاع به flushهای در حال اجرا تا garbage collector وسط کار جمعشان نکند
+        self._tasks = set()
+
+    @staticmethod
+    def _new(chat_id: int, user_id: int, mode: str) -> dict:
+        return {
+            "chat_id": chat_id, "user_id": user_id, "mode": mode,
+            "files": [], "cost": 0, "timer": None,
+        }
+
+    def get(self, chat_id: int):
+        """
+        دسته دستی باز این چت (بین /batch و /done) یا None.
+        """
+        return self._batches.get(("chat", chat_id))
+
+    def is_open(self, chat_id: int) -> bool:
+        return ("chat", chat_id) in self._batches
+
+    def open(self, chat_id: int, user_id: int, mode: str):
+        self._batches[("chat", chat_id)] = self._new(chat_id, user_id, mode)
+
+    def close(self, chat_id: int):
+        return self._batches.pop(("chat", chat_id), None)
+
+    def add(self, chat_id: int, user_id: int, mode: str, file: list, cost: int = 1,
+            media_group_id: str = None, on_ready=None) -> bool:
+        """
+        فایل را به دسته باز این چت (یا آلبومش) اضافه می‌کند.
+        اگر دسته پر باشد False برمی‌گرداند.
+        """
+        if media_group_id and not self.is_open(chat_id):
+            key = ("group", media_group_id)
+            batch = self._batches.setdefault(key, self._new(chat_id, user_id, mode))
+            # با هر فایل تازه، مهلت بسته شدن آلبوم از نو شروع می‌شود
+            if batch["timer"] is not None:
+                batch["timer"].cancel()
+            batch["timer"] = asyncio.get_running_loop().call_later(
+                self.wait, self._schedule_flush, key, on_ready
+            )
+        else:
+            batch = self._batches[("chat", chat_id)]
+
+        if len(batch["files"]) >= self.max_files:
+            return False
+        batch["files"].append(file)
+        batch["cost"] += cost
+        return True
+
+    def _schedule_flush(self, key, on_ready):
+        task = asyncio.create_task(self._flush(key, on_ready))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, key, on_ready):
+        batch = self._batches.pop(key, None)
+        if batch and batch["files"] and on_ready is not None:
+            try:
+                await on_ready(batch)
+            except Exception as e:
+                print("ERROR in BatchCollector flush:", e)
+
+
+# دسته‌های در حال جمع‌آوری (مشترک بین webhookهای همین پروسس)
+batches = BatchCollector()
+
+
+async def file_pages(mode: str, file_id: str) -> list:
+    """
+    متن صفحات یک فایل از دسته در حالت داده‌شده.
+    """
+    from modules.ocr_engine import iter_ocr_bytes
+    from modules.ocr_cleaner import TESS_LANG
+    from modules.hybrid import analyze_pages
+
+    pdf_bytes = await download(file_id, "pdf")
+
+    if mode == "WORD":
+        with timed("parse"):
+            pages = await extract_pages(pdf_bytes)
+        pages_total.inc(len(pages), mode=mode, method="text")
+        return pages
+
+    if mode == "OCR_PDF":
+        texts = [text async for _, text in iter_ocr_bytes(pdf_bytes, TESS_LANG)]
+        pages_total.inc(len(texts), mode=mode, method="ocr")
+        return texts
+
+    # HYBRID_PDF
+    with timed("parse"):
+        pages = await asyncio.to_thread(analyze_pages, pdf_bytes)
+    texts = [text if kind == "text" else "" for text, kind in pages]
+    ocr_numbers = [i for i, (_, kind) in enumerate(pages, start=1) if kind == "ocr"]
+    if ocr_numbers:
+        async for number, text in iter_ocr_bytes(
+            pdf_bytes, TESS_LANG, page_numbers=ocr_numbers
+        ):
+            texts[number - 1] = text
+    pages_total.inc(len(pages) - len(ocr_numbers), mode=mode, method="text")
+    pages_total.inc(len(ocr_numbers), mode=mode, method="ocr")
+    return texts
+
+
+async def file_text(mode: str, file_id: str) -> str:
+    if mode == "SUMMARY_WORD":
+        from modules.summary import extract_docx_text
+
+        doc_bytes = await download(file_id, "docx")
+        with timed("parse"):
+            return await asyncio.to_thread(extract_docx_text, doc_bytes)
+
+    pdf_bytes = await download(file_id, "pdf")
+    with timed("parse"):
+        return await extract_pdf_text(pdf_bytes)
+
+
+def write_file(writer, title: str, pages: list, markers: bool):
+    # ساخت XML و فشرده‌سازی zip؛ در ترد جدا اجرا می‌شود تا event loop آزاد بماند
+    writer.add_paragraph(f"📄 {title}")
+    for page, text in enumerate(pages, start=1):
+        writer.add_page(page, text, marker=markers)
+
+
+async def handle_batch(chat_id: int, mode: str, files: list):
+    """
+    چند فایل در یک کار (و با یک اعتبار):
+    حالت‌های تبدیل یک Word ادغام‌شده (یا zip) می‌دهند و حالت‌های خلاصه یک خلاصه مشترک.
+    files: [[file_id, file_unique_id, file_name], ...]
+    """
+    set_mode(mode)
+    try:
+        progress = ProgressMessage(
+            chat_id, len(files), f"در حال پردازش {len(files)} فایل با هم... ⏳", unit="فایل"
+        )
+        await progress.start()
+
+        failed = []
+        summary_mode = mode.startswith("SUMMARY_")
+        parts = []
+        buffer = io.BytesIO()
+        archive = zipfile.ZipFile(buffer, "w") if BATCH_OUTPUT == "zip" else None
+        writer = None if summary_mode or archive else DocxStreamWriter(buffer)
+        markers = mode != "WORD"
+
+        for number, (file_id, _, file_name) in enumerate(files, start=1):
+            title = file_name or f"فایل {number}"
+            # خطای یک فایل کل دسته را خراب نمی‌کند
+            try:
+                if summary_mode:
+                    parts.append(await file_text(mode, file_id))
+                else:
+                    pages = await file_pages(mode, file_id)
+                    if archive is not None:
+                        with timed("docx_build"):
+                            doc_bytes = await asyncio.to_thread(build_docx, pages, markers)
+                        base = os.path.splitext(title)[0]
+                        archive.writestr(f"{number:02d}_{base}.docx", doc_bytes)
+                    else:
+                        with timed("docx_build"):
+                            await asyncio.to_thread(write_file, writer, title, pages, markers)
+            except Exception as e:
+                count_error(e)
+                print("ERROR in handle_batch file:", e)
+                failed.append(title)
+            await progress.update(number)
+
+        await progress.finish()
+
+        if failed:
+            await send_message(
+                chat_id,
+                "⚠️ این فایل‌ها خونده نشدن و کنار گذاشته شدن:\n" + "\n".join(failed),
+            )
+
+        if summary_mode:
+            full_text = "\n\n".join(parts)
+            if not full_text.strip():
+                # اعتبار مصرف شده؛ پس کاربر باید بداند چرا خلاصه‌ای نیامد
+                await send_message(
+                    chat_id,
+                    "داخل این فایل‌های Word متنی پیدا نکردم 😕" if mode == "SUMMARY_WORD" else
+                    "هیچ متن قابل خوندنی توی این PDFها پیدا نکردم 😕\n"
+                    "احتمالاً اسکن/عکس هستن.",
+                )
+                return
+            from modules.summarizer import summarize
+
+            with timed("summarize"):
+                summary = await asyncio.to_thread(summarize, full_text)
+            await send_message(chat_id, "خلاصه آماده شد ✅")
+            await deliver_text(chat_id, summary)
+            return
+
+        if archive is not None:
+            archive.close()
+            if len(failed) < len(files):
+                await deliver_document(chat_id, "batch_converted.zip", buffer.getvalue())
+            return
+
+        await asyncio.to_thread(writer.close)
+        if writer.chars:
+            await deliver_document(chat_id, "batch_converted.docx", buffer.getvalue())
+        else:
+            await send_message(chat_id, "متنی از این فایل‌ها نتونستم استخراج کنم 😕")
+
+    except Exception as e:
+        count_error(e)
+        print("ERROR in handle_batch:", e)
+        await send_message(
+            chat_id,
+            "در پردازش دسته‌ای فایل‌ها یه خطای غیرمنتظره پیش اومد 😔"
+        )
@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+
+from modules.jobs import JOB_QUEUE_MAXSIZE, JobQueue, QueueFullError
+
+# آدرس broker کارها:
+# ""                        -> بدون broker؛ کارها داخل همین پروسس اجرا می‌شوند (JobQueue)
+# "sqlite:///path/jobs.db"  -> صف مشترک روی یک فایل SQLite (چند پروسس روی یک ماشین)
+# "redis://host:6379/0"     -> صف مشترک روی Redis (یا هر سرور سازگار با Redis)
+JOB_BROKER = os.getenv("JOB_BROKER", "")
+
+# اگر worker در این مدت (ثانیه) خبری ندهد، کار دوباره به صف برمی‌گردد
+BROKER_VISIBILITY_TIMEOUT = int(os.getenv("BROKER_VISIBILITY_TIMEOUT", "300"))
+
+# بعد از این تعداد تحویل ناموفق، کار کنار گذاشته می‌شود
+BROKER_MAX_ATTEMPTS = int(os.getenv("BROKER_MAX_ATTEMPTS", "3"))
+
+
+class SQLiteBroker:
+    """
+    صف کار روی SQLite:
+    - reserve کار را برای مدت visibility timeout از دید بقیه پنهان می‌کند
+    - اگر ack نشود (مثلاً worker کرش کند) بعد از این مدت دوباره تحویل داده می‌شود
+    - تا وقتی یک کارِ چت در حال اجراست، کار بعدی همان چت تحویل داده نمی‌شود
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=10, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chat_id INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                visible_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_visible ON jobs (visible_at, id)"
+        )
+
+    def put(self, chat_id: int, payload: dict) -> str:
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO jobs (chat_id, payload, visible_at) VALUES (?, ?, ?)",
+                (chat_id, json.dumps(payload), time.time()),
+            )
+        return str(cur.lastrowid)
+
+    def reserve(self, visibility_timeout: int = BROKER_VISIBILITY_TIMEOUT):
+        """
+        قدیمی‌ترین کار آماده را برمی‌دارد: (job_id, payload, attempts) یا None
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id, payload, attempts FROM jobs "
+                    "WHERE visible_at <= ? AND chat_id NOT IN ("
+                    "  SELECT chat_id FROM jobs WHERE attempts > 0 AND visible_at > ?"
+                    ") ORDER BY id LIMIT 1",
+                    (now, now),
+                ).fetchone()
+                if row:
+                    conn.execute(
+                        "UPDATE jobs SET visible_at = ?, attempts = attempts + 1 WHERE id = ?",
+                        (now + visibility_timeout, row[0]),
+                    )
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+        if not row:
+            return None
+        return str(row[0]), json.loads(row[1]), row[2] + 1
+
+    def extend(self, job_id: str, visibility_timeout: int = BROKER_VISIBILITY_TIMEOUT):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET visible_at = ? WHERE id = ?",
+                (time.time() + visibility_timeout, int(job_id)),
+            )
+
+    def ack(self, job_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (int(job_id),))
+
+    def requeue_expired(self):
+        # در SQLite کار منقضی‌شده خودبه‌خود دوباره در reserve دیده می‌شود
+        pass
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# برداشتن کار و ثبت مهلتش باید یک قدم اتمی باشد؛ وگرنه اگر worker بین این دو
+# کرش کند، کار بدون مهلت در processing می‌ماند و هیچ‌وقت به صف برنمی‌گردد.
+# KEYS: ready, processing, deadlines, attempts, payload  ARGV: deadline
+_RESERVE_SCRIPT = """
+local job_id = redis.call('RPOPLPUSH', KEYS[1], KEYS[2])
+if not job_id then
+    return false
+end
+redis.call('ZADD', KEYS[3], ARGV[1], job_id)
+local attempts = redis.call('HINCRBY', KEYS[4], job_id, 1)
+return {job_id, attempts, redis.call('HGET', KEYS[5], job_id)}
+"""
+
+# برگرداندن کار منقضی‌شده به صف (فقط workerی که حذفش از processing موفق شود)
+# KEYS: processing, deadlines, ready  ARGV: job_id
+_REQUEUE_SCRIPT = """
+if redis.call('LREM', KEYS[1], 1, ARGV[1]) == 1 then
+    redis.call('ZREM', KEYS[2], ARGV[1])
+    redis.call('RPUSH', KEYS[3], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+
+class RedisBroker:
+    """
+    همان رابط SQLiteBroker روی Redis (یا هر سرور سازگار با EVAL):
+    - ready: لیست شناسه کارهای آماده
+    - processing: کارهای در حال اجرا، deadlines: مهلت هر کدام
+    جابه‌جایی کار بین این‌ها با اسکریپت Lua و به صورت اتمی انجام می‌شود.
+    ترتیب کارهای یک چت اینجا فقط تا حد ترتیب ورود به صف حفظ می‌شود.
+    """
+
+    def __init__(self, client, prefix: str = "bot:jobs"):
+        self.r = client
+        self.prefix = prefix
+        self._reserve = client.register_script(_RESERVE_SCRIPT)
+        self._requeue = client.register_script(_REQUEUE_SCRIPT)
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}:{name}"
+
+    def put(self, chat_id: int, payload: dict) -> str:
+        job_id = str(self.r.incr(self._key("seq")))
+        self.r.hset(self._key("payload"), job_id, json.dumps(payload))
+        self.r.lpush(self._key("ready"), job_id)
+        return job_id
+
+    def reserve(self, visibility_timeout: int = BROKER_VISIBILITY_TIMEOUT):
+        names = ("ready", "processing", "deadlines", "attempts", "payload")
+        result = self._reserve(
+            keys=[self._key(name) for name in names],
+            args=[time.time() + visibility_timeout],
+        )
+        if not result:
+            return None
+        # اگر payload نباشد Lua آن را از آخر لیست می‌اندازد
+        job_id, attempts, payload = (list(result) + [None])[:3]
+        if isinstance(job_id, bytes):
+            job_id = job_id.decode()
+        if payload is None:
+            self.ack(job_id)
+            return None
+        return job_id, json.loads(payload), int(attempts)
+
+    def extend(self, job_id: str, visibility_timeout: int = BROKER_VISIBILITY_TIMEOUT):
+        self.r.zadd(self._key("deadlines"), {job_id: time.time() + visibility_timeout})
+
+    def ack(self, job_id: str):
+        self.r.lrem(self._key("processing"), 0, job_id)
+        self.r.zrem(self._key("deadlines"), job_id)
+        self.r.hdel(self._key("payload"), job_id)
+        self.r.hdel(self._key("attempts"), job_id)
+
+    def requeue_expired(self):
+        expired = self.r.zrangebyscore(self._key("deadlines"), 0, time.time())
+        for job_id in expired:
+            if isinstance(job_id, bytes):
+                job_id = job_id.decode()
+            self._requeue(
+                keys=[self._key("processing"), self._key("deadlines"), self._key("ready")],
+                args=[job_id],
+            )
+
+    def size(self) -> int:
+        return self.r.llen(self._key("ready")) + self.r.llen(self._key("processing"))
+
+    def close(self):
+        self.r.close()
+
+
+def create_broker(url: str = JOB_BROKER):
+    if url.startswith("sqlite:///"):
+        return SQLiteBroker(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        import redis
+
+        return RedisBroker(redis.Redis.from_url(url))
+    raise ValueError(f"unknown JOB_BROKER: {url}")
+
+
+class BrokerQueue:
+    """
+    همان رابط JobQueue برای سمت وب: کار فقط در broker ثبت می‌شود
+    و پروسس‌های worker.py (روی همین ماشین یا ماشین دیگر) اجرایش می‌کنند.
+    """
+
+    def __init__(self, broker, maxsize: int = JOB_QUEUE_MAXSIZE):
+        self.broker = broker
+        self.maxsize = maxsize
+
+    def __len__(self):
+        return self.broker.size()
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        self.broker.close()
+
+    def submit(self, chat_id: int, func, *args, user_id: int = None, cost: float = 1) -> int:
+        # نوبت‌دهی منصفانه فقط در JobQueue است؛ broker کارها را به ترتیب ورود می‌دهد
+        ahead = self.broker.size()
+        if ahead >= self.maxsize:
+            raise QueueFullError()
+
+        self.broker.put(chat_id, {"handler": func.__name__, "args": list(args)})
+        return ahead
+
+    async def asubmit(self, chat_id: int, func, *args, user_id: int = None, cost: float = 1) -> int:
+        # size/put روی SQLite (با timeout قفل) یا شبکه Redis هستند؛ در ترد جدا تا event loop بلاک نشود
+        return await asyncio.to_thread(
+            self.submit, chat_id, func, *args, user_id=user_id, cost=cost
+        )
+
+
+def create_job_queue():
+    """
+    بدون JOB_BROKER کارها داخل همین پروسس اجرا می‌شوند؛
+    با JOB_BROKER فقط در broker ثبت می‌شوند.
+    """
+    if JOB_BROKER:
+        return BrokerQueue(create_broker())
+    return JobQueue()
@@ -0,0 +1,137 @@
+import os
+import time
+import asyncio
+import hashlib
+import threading
+import tempfile
+
+from modules.metrics import cache_lookups
+
+# پوشه کش نتایج روی دیسک
+RESULT_CACHE_DIR = os.getenv(
+    "RESULT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "bot-result-cache")
+)
+# حداکثر حجم کش (مگابایت)؛ با پر شدن، کم‌استفاده‌ترین‌ها حذف می‌شوند (LRU)
+RESULT_CACHE_MAX_MB = int(os.getenv("RESULT_CACHE_MAX_MB", "500"))
+# عمر هر نتیجه در کش (ثانیه)
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+def content_hash(data) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResultCache:
+    """
+    کش نتایج تبدیل‌ها روی دیسک:
+    - کلید: (file_unique_id یا هش محتوا، نوع عملیات، تنظیمات)
+    - حذف LRU بر اساس حجم، و انقضا با TTL
+    حالت کش فقط خود پوشه است (mtime = زمان ساخت، atime = آخرین استفاده)؛
+    پس چند پروسس (uvicorn --workers یا چند worker.py) نتایج هم را می‌بینند
+    و سقف حجم روی کل پوشه اعمال می‌شود نه جدا برای هر پروسس.
+    """
+
+    def __init__(
+        self,
+        directory: str = RESULT_CACHE_DIR,
+        max_bytes: int = RESULT_CACHE_MAX_MB * 1024 * 1024,
+        ttl: int = RESULT_CACHE_TTL,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(source_id: str, operation: str, **options) -> str:
+        parts = [source_id, operation]
+        parts += [f"{k}={options[k]}" for k in sorted(options)]
+        return content_hash("|".join(parts))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def _remove(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _entries(self) -> list:
+        """
+        فایل‌های کش به ترتیب آخرین استفاده (اولی کهنه‌ترین): [(key, size), ...]
+        """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".tmp"):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue  # پروسس دیگری همین الان حذفش کرد
+                entries.append((st.st_atime, entry.name, st.st_size))
+        entries.sort()
+        return [(name, size) for _, name, size in entries]
+
+    def get(self, key: str):
+        path = self._path(key)
+        with self._lock:
+            try:
+                if time.time() - os.path.getmtime(path) > self.ttl:
+                    self._remove(key)
+                    return None
+
+                with open(path, "rb") as f:
+                    data = f.read()
+
+                # فقط زمان دسترسی عوض می‌شود؛ mtime همان زمان ساخت می‌ماند (برای TTL)
+                os.utime(path, (time.time(), os.path.getmtime(path)))
+            except FileNotFoundError:
+                return None
+            return data
+
+    def contains(self, key: str) -> bool:
+        """
+        آیا نتیجه‌ای معتبر برای key هست؛ بدون خواندن فایل و بدون عوض کردن زمان استفاده.
+        """
+        try:
+            return time.time() - os.path.getmtime(self._path(key)) <= self.ttl
+        except FileNotFoundError:
+            return False
+
+    def put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        # اسم فایل موقت یکتاست تا دو پروسس که یک نتیجه را می‌نویسند روی هم ننویسند
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+            entries = self._entries()
+            size = sum(size for _, size in entries)
+            for name, entry_size in entries:
+                if size <= self.max_bytes:
+                    break
+                self._remove(name)
+                size -= entry_size
+
+    async def aget(self, key: str):
+        data = await asyncio.to_thread(self.get, key)
+        cache_lookups.inc(result="miss" if data is None else "hit")
+        return data
+
+    async def acontains(self, key: str) -> bool:
+        return await asyncio.to_thread(self.contains, key)
+
+    async def aput(self, key: str, data: bytes):
+        await asyncio.to_thread(self.put, key, data)
+
+
+result_cache = ResultCache()
@@ -0,0 +1,115 @@
+import io
+import os
+import re
+import asyncio
+import zipfile
+
+from modules.telegram_api import send_message, send_document
+from modules.docx_writer import split_docx
+
+# سقف‌های Bot API: متن هر پیام و حجم هر فایل ارسالی
+# (با Bot API server محلی سقف آپلود 2000 مگابایت است)
+TELEGRAM_MESSAGE_LIMIT = 4096
+TELEGRAM_UPLOAD_LIMIT_MB = int(os.getenv("TELEGRAM_UPLOAD_LIMIT_MB", "50"))
+
+# متنی که بیشتر از این تعداد پیام بشود به صورت فایل .txt فرستاده می‌شود
+DELIVERY_MAX_MESSAGES = int(os.getenv("DELIVERY_MAX_MESSAGES", "3"))
+
+# جای مناسب برای شکستن متن، به ترتیب اولویت: پاراگراف، خط، پایان جمله، فاصله
+_BREAKS = (
+    re.compile(r"\n\s*\n"),
+    re.compile(r"\n"),
+    re.compile(r"(?<=[.!?؟…])\s+"),
+    re.compile(r"\s+"),
+)
+
+
+def split_text(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> list:
+    """
+    متن را در مرز پاراگراف/جمله به تکه‌های حداکثر limit کاراکتری می‌شکند.
+    """
+    text = text.strip()
+    parts = []
+    while len(text) > limit:
+        cut = 0
+        for pattern in _BREAKS:
+            # آخرین جای شکستن که تکه را زیر سقف نگه دارد
+            for match in pattern.finditer(text, 0, limit + 1):
+                cut = match.start()
+            if cut:
+                break
+        if not cut:
+            cut = limit
+        parts.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    if text:
+        parts.append(text)
+    return parts
+
+
+async def deliver_text(chat_id: int, text: str, filename: str = "summary.txt"):
+    """
+    متن کوتاه در یک پیام، متن بلند در چند پیام پشت سر هم
+    و متن خیلی بلند به صورت فایل .txt فرستاده می‌شود.
+    """
+    parts = split_text(text)
+    if len(parts) <= DELIVERY_MAX_MESSAGES:
+        # به ترتیب فرستاده می‌شوند تا تکه‌ها جابه‌جا به دست کاربر نرسند
+        for part in parts:
+            await send_message(chat_id, part)
+        return
+
+    await send_message(chat_id, "متن طولانی بود؛ به صورت فایل فرستادم 📎")
+    await send_document(chat_id, filename, text.encode("utf-8"))
+
+
+def recompress(content: bytes) -> bytes:
+    """
+    فایل zip (مثل docx) را با بیشترین سطح فشرده‌سازی از نو می‌سازد؛ اگر zip نبود همان را برمی‌گرداند.
+    """
+    try:
+        source = zipfile.ZipFile(io.BytesIO(content))
+    except zipfile.BadZipFile:
+        return content
+
+    buffer = io.BytesIO()
+    with source, zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED, compresslevel=9) as target:
+        for info in source.infolist():
+            target.writestr(info.filename, source.read(info), compresslevel=9)
+    result = buffer.getvalue()
+    return result if len(result) < len(content) else content
+
+
+async def deliver_document(chat_id: int, filename: str, content: bytes,
+                           limit_mb: int = TELEGRAM_UPLOAD_LIMIT_MB):
+    """
+    فایل را با توجه به سقف آپلود تلگرام می‌فرستد:
+    اگر جا شد همان، وگرنه فشرده‌تر، و اگر باز هم بزرگ بود (برای docx) در چند فایل Word جدا
+    که هر کدام بخشی از صفحات است؛ اگر این هم نشد، پیام خطای روشن.
+    """
+    limit = limit_mb * 1024 * 1024
+    if len(content) <= limit:
+        return await send_document(chat_id, filename, content)
+
+    content = await asyncio.to_thread(recompress, content)
+    if len(content) <= limit:
+        return await send_document(chat_id, filename, content)
+
+    parts = await asyncio.to_thread(split_docx, content, limit)
+    if not parts:
+        await send_message(
+            chat_id,
+            f"فایل خروجی حتی بعد از فشرده‌سازی از سقف {limit_mb} مگابایتی تلگرام بزرگ‌تره "
+            "و نمی‌تونم بفرستمش 😕\n"
+            "لطفاً فایل رو در چند بخش کوچک‌تر (با صفحات کمتر) بفرست.",
+        )
+        return
+
+    await send_message(
+        chat_id,
+        f"فایل خروجی از سقف {limit_mb} مگابایتی تلگرام بزرگ‌تره 📦\n"
+        f"در {len(parts)} فایل Word جدا فرستاده می‌شه؛ هر فایل ادامه فایل قبلیه.",
+    )
+    stem, ext = os.path.splitext(filename)
+    for number, part in enumerate(parts, start=1):
+        await send_document(chat_id, f"{stem}_part{number}{ext}", part)
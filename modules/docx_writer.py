@@ -0,0 +1,244 @@
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+# فایل Word را بدون python-docx و بدون ساختن درخت lxml می‌سازیم:
+# بخش‌های OOXML مستقیم و تکه‌تکه داخل zip نوشته می‌شوند،
+# پس حافظه به تعداد صفحات بستگی ندارد.
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" '
+    'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    "</Types>"
+)
+
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    "</Relationships>"
+)
+
+_DOCUMENT_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+    "<w:body>"
+)
+
+_DOCUMENT_TAIL = "<w:sectPr/></w:body></w:document>"
+
+# کاراکترهای کنترلی که در XML مجاز نیستند (گاهی از استخراج PDF بیرون می‌آیند)
+_INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+# با کمتر از این تعداد خط، عرض صفحه معلوم نیست و هر خط پاراگراف جداست
+_MIN_WIDTH_LINES = 3
+_SENTENCE_END = (".", "!", "?", "؟", ":", "۔")
+# آیتم فهرست: «- »، «• »، «1. »، «۲) » ...
+_LIST_ITEM = re.compile(r"([-•*▪◦]|[\d۰-۹]+[.)])\s")
+
+_RTL_CHARS = re.compile("[\u0590-\u08ff\ufb1d-\ufdff\ufe70-\ufefc]")
+_LTR_CHARS = re.compile("[A-Za-z\u00c0-\u024f]")
+
+
+def is_rtl(text: str) -> bool:
+    """
+    متنی که حروف فارسی/عربی‌اش از حروف لاتین بیشتر است راست‌به‌چپ حساب می‌شود.
+    """
+    return len(_RTL_CHARS.findall(text)) > len(_LTR_CHARS.findall(text))
+
+
+def _line_width(lines) -> int:
+    """
+    عرض معمول خطوط پر یک صفحه (صدک ۹۰ طول خطوط)؛ 0 اگر خط کافی برای تخمین نباشد.
+    """
+    lengths = sorted(len(line) for line in lines if line)
+    if len(lengths) < _MIN_WIDTH_LINES:
+        return 0
+    return lengths[int(len(lengths) * 0.9)]
+
+
+def _is_wrapped(line: str, following: str, width: int) -> bool:
+    """
+    آیا line فقط به خاطر عرض صفحه شکسته شده و ادامه‌اش خط بعد است؟
+    فقط وقتی که اولین کلمه خط بعد در همین خط جا نمی‌شد؛ پس تیتر و خط‌های کوتاه،
+    خط تمام‌شده با علامت پایان جمله و خط قبل از یک آیتم فهرست پاراگراف جدا می‌مانند.
+    """
+    if not width or not following:
+        return False
+    if line.endswith(_SENTENCE_END) or _LIST_ITEM.match(following):
+        return False
+    return len(line) + 1 + len(following.split(None, 1)[0]) > width
+
+
+def page_marker(number: int) -> str:
+    return f"--- صفحه {number} ---"
+
+
+class DocxStreamWriter:
+    """
+    نوشتن تدریجی فایل docx:
+    - هر صفحه به محض آماده شدن اضافه می‌شود (add_page)
+    - خطوطی که فقط به خاطر عرض صفحه شکسته شده‌اند به هم وصل می‌شوند (_is_wrapped)؛
+      تیترها، آیتم‌های فهرست و ردیف‌های کوتاه خط جدا می‌مانند
+    - پاراگراف‌های فارسی راست‌به‌چپ (bidi) می‌شوند
+    """
+
+    def __init__(self, target):
+        self._zip = zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED)
+        self._zip.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        self._zip.writestr("_rels/.rels", _RELS)
+        self._document = self._zip.open("word/document.xml", "w")
+        self._document.write(_DOCUMENT_HEAD.encode("utf-8"))
+        self.paragraphs = 0
+        self.chars = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add_paragraph(self, text: str):
+        text = _INVALID_XML.sub("", text).strip()
+        if not text:
+            return
+
+        if is_rtl(text):
+            xml = (
+                '<w:p><w:pPr><w:bidi/></w:pPr><w:r><w:rPr><w:rtl/></w:rPr>'
+                f'<w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>'
+            )
+        else:
+            xml = f'<w:p><w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>'
+
+        self._document.write(xml.encode("utf-8"))
+        self.paragraphs += 1
+        self.chars += len(text)
+
+    def add_text(self, text: str):
+        """
+        متن خام (مثلاً یک صفحه) را به پاراگراف‌های واقعی تبدیل و اضافه می‌کند.
+        """
+        lines = [line.strip() for line in text.split("\n")]
+        width = _line_width(lines)
+        paragraph = []
+        for i, line in enumerate(lines):
+            if not line:
+                # خط خالی همیشه پاراگراف را تمام می‌کند
+                if paragraph:
+                    self.add_paragraph(" ".join(paragraph))
+                    paragraph = []
+                continue
+            paragraph.append(line)
+            following = lines[i + 1] if i + 1 < len(lines) else ""
+            if not _is_wrapped(line, following, width):
+                self.add_paragraph(" ".join(paragraph))
+                paragraph = []
+        if paragraph:
+            self.add_paragraph(" ".join(paragraph))
+
+    def add_page(self, number: int, text: str, marker: bool = True):
+        if not text.strip():
+            return
+        if marker:
+            self.add_paragraph(page_marker(number))
+        self.add_text(text)
+
+    def close(self):
+        if self._document is None:
+            return
+        self._document.write(_DOCUMENT_TAIL.encode("utf-8"))
+        self._document.close()
+        self._document = None
+        self._zip.close()
+
+
+def build_docx(texts, markers: bool = False, start: int = 1) -> bytes:
+    """
+    متن صفحات را (به ترتیب) به یک فایل docx در حافظه تبدیل می‌کند.
+    """
+    buffer = io.BytesIO()
+    with DocxStreamWriter(buffer) as writer:
+        for number, text in enumerate(texts, start=start):
+            writer.add_page(number, text, marker=markers)
+    return buffer.getvalue()
+
+
+# پاراگراف نشانگر صفحه (page_marker) داخل document.xml
+_PAGE_MARKER = re.compile(r">--- صفحه \d+ ---<")
+
+
+def _docx_from_paragraphs(paragraphs) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED, compresslevel=9) as target:
+        target.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        target.writestr("_rels/.rels", _RELS)
+        target.writestr("word/document.xml", _DOCUMENT_HEAD + "".join(paragraphs) + _DOCUMENT_TAIL)
+    return buffer.getvalue()
+
+
+def _pack(blocks, limit: int):
+    """
+    blocks (هر کدام لیست پاراگراف‌های یک صفحه) را به کمترین تکه‌های نزدیک به هم
+    تقسیم می‌کند که docx هر تکه زیر limit بایت باشد؛ اگر نشد None.
+    """
+    content = _docx_from_paragraphs(p for block in blocks for p in block)
+    if len(content) <= limit:
+        return [content]
+    if len(blocks) == 1:
+        # یک صفحه به‌تنهایی جا نشد؛ در مرز پاراگراف‌هایش شکسته می‌شود
+        if len(blocks[0]) == 1:
+            return None
+        blocks = [[paragraph] for paragraph in blocks[0]]
+
+    # جایی که نصف حجم متن قبلش است
+    sizes = [sum(len(p) for p in block) for block in blocks]
+    half, total, cut = sum(sizes) / 2, 0, 1
+    for cut, size in enumerate(sizes[:-1], start=1):
+        total += size
+        if total >= half:
+            break
+
+    first = _pack(blocks[:cut], limit)
+    second = _pack(blocks[cut:], limit) if first is not None else None
+    if second is None:
+        return None
+    return first + second
+
+
+def split_docx(content: bytes, limit: int):
+    """
+    docx ساخته‌شده با DocxStreamWriter را به چند docx معتبر (هر کدام حداکثر limit بایت) تقسیم می‌کند؛
+    اگر نشانگر صفحه دارد در مرز صفحات (صفحه‌ای که به‌تنهایی جا نشود در مرز پاراگراف‌هایش)، وگرنه در مرز پاراگراف‌ها.
+    برای فایلی که این ماژول نساخته یا یک پاراگرافش به‌تنهایی از سقف بزرگ‌تر است None برمی‌گرداند.
+    """
+    try:
+        with zipfile.ZipFile(io.BytesIO(content)) as source:
+            document = source.read("word/document.xml").decode("utf-8")
+    except (zipfile.BadZipFile, KeyError):
+        return None
+    if not (document.startswith(_DOCUMENT_HEAD) and document.endswith(_DOCUMENT_TAIL)):
+        return None
+
+    body = document[len(_DOCUMENT_HEAD):-len(_DOCUMENT_TAIL)]
+    blocks = []
+    for paragraph in body.split("</w:p>")[:-1]:
+        paragraph += "</w:p>"
+        if not blocks or _PAGE_MARKER.search(paragraph):
+            blocks.append([])
+        blocks[-1].append(paragraph)
+    if not blocks:
+        return None
+    if not _PAGE_MARKER.search(blocks[0][0]):
+        # بدون نشانگر صفحه هر پاراگراف یک واحد است
+        blocks = [[paragraph] for paragraph in blocks[0]]
+
+    return _pack(blocks, limit)
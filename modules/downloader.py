@@ -0,0 +1,140 @@
+import os
+import asyncio
+
+import httpx
+
+from modules.telegram_api import (
+    get_client,
+    get_file,
+    TELEGRAM_FILE_API,
+    TELEGRAM_MAX_RETRIES,
+    retry_delay,
+)
+from modules.metrics import timed, bytes_total, downloads_rejected
+
+# Bot API فایل‌های بزرگ‌تر از 20 مگابایت را با getFile نمی‌دهد
+MAX_DOWNLOAD_MB = int(os.getenv("MAX_DOWNLOAD_MB", "20"))
+MAX_DOWNLOAD_BYTES = MAX_DOWNLOAD_MB * 1024 * 1024
+
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("DOWNLOAD_CHUNK_SIZE", str(64 * 1024)))
+
+# امضای ابتدای فایل برای هر نوع؛ PDF طبق استاندارد می‌تواند «%PDF» را
+# تا 1024 بایت اول داشته باشد، docx هم یک فایل ZIP است.
+_MAGIC = {
+    "pdf": (b"%PDF", 1024),
+    "docx": (b"PK\x03\x04", 4),
+}
+
+
+class DownloadError(Exception):
+    """
+    خطای دانلود؛ متن آن مستقیم برای کاربر فرستاده می‌شود.
+    """
+
+
+class FileTooLargeError(DownloadError):
+    def __init__(self):
+        super().__init__(
+            f"حجم این فایل بیشتر از حد مجازه 😕\n"
+            f"حداکثر {MAX_DOWNLOAD_MB} مگابایت می‌تونم دریافت کنم."
+        )
+
+
+class InvalidFileError(DownloadError):
+    def __init__(self, kind: str):
+        super().__init__(
+            f"این فایل یک {kind.upper()} معتبر نیست 😕\n"
+            "لطفاً فایل درست رو بفرست."
+        )
+
+
+def _check_magic(head: bytes, kind: str, complete: bool) -> bool:
+    """
+    True یعنی بررسی انجام شد؛ False یعنی هنوز بایت کافی نرسیده.
+    """
+    magic, window = _MAGIC[kind]
+    if magic in head[:window]:
+        return True
+    if len(head) >= window or complete:
+        raise InvalidFileError(kind)
+    return False
+
+
+async def _stream(url: str, kind: str, max_bytes: int) -> bytearray:
+    buffer = bytearray()
+    checked = kind is None
+
+    async with get_client().stream("GET", url) as response:
+        response.raise_for_status()
+
+        length = response.headers.get("content-length")
+        if length and int(length) > max_bytes:
+            raise FileTooLargeError()
+
+        async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+            buffer += chunk
+            if len(buffer) > max_bytes:
+                raise FileTooLargeError()
+            if not checked:
+                checked = _check_magic(buffer, kind, complete=False)
+
+    if not checked:
+        _check_magic(buffer, kind, complete=True)
+    return buffer
+
+
+async def download(file_id: str, kind: str = None, max_bytes: int = MAX_DOWNLOAD_BYTES) -> bytes:
+    """
+    محتوای فایل؛ اگر modules.prefetch همان موقع رسیدن پیام دانلودش کرده باشد
+    از همان استفاده می‌شود، وگرنه با fetch دانلود می‌شود.
+    """
+    from modules.prefetch import prefetch_buffer
+
+    content = await prefetch_buffer.take(file_id)
+    if content is not None and len(content) <= max_bytes:
+        if kind is not None:
+            try:
+                _check_magic(content, kind, complete=True)
+            except DownloadError as e:
+                _count_rejected(e)
+                raise
+        return content
+    return await fetch(file_id, kind, max_bytes)
+
+
+async def fetch(file_id: str, kind: str = None, max_bytes: int = MAX_DOWNLOAD_BYTES) -> bytes:
+    """
+    getFile + دانلود تکه‌تکه با سقف حجم.
+    kind ("pdf" یا "docx") باعث می‌شود فایل نامعتبر از همان بایت‌های اول رد شود.
+    """
+    try:
+        with timed("download"):
+            file_info = await get_file(file_id)
+
+            file_size = file_info.get("file_size")
+            if file_size and file_size > max_bytes:
+                raise FileTooLargeError()
+
+            url = f"{TELEGRAM_FILE_API}/{file_info['file_path']}"
+            attempt = 0
+            while True:
+                try:
+                    buffer = await _stream(url, kind, max_bytes)
+                    break
+                except httpx.TransportError:
+                    if attempt >= TELEGRAM_MAX_RETRIES:
+                        raise
+                    await asyncio.sleep(retry_delay(attempt))
+                    attempt += 1
+
+    except DownloadError as e:
+        _count_rejected(e)
+        raise
+
+    bytes_total.inc(len(buffer), direction="download")
+    return bytes(buffer)
+
+
+def _count_rejected(error: DownloadError):
+    reason = "too_large" if isinstance(error, FileTooLargeError) else "invalid"
+    downloads_rejected.inc(reason=reason)
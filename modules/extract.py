@@ -0,0 +1,181 @@
+import io
+import os
+import asyncio
+
+from modules.pool import OCR_WORKERS, run_in_pool
+
+# موتور استخراج متن از PDF: "pypdf2" (پیش‌فرض) | "pdfminer" | "pdfium"
+# (دو تای آخر فقط اگر pdfminer.six یا pypdfium2 نصب باشند)
+PDF_TEXT_BACKEND = os.getenv("PDF_TEXT_BACKEND", "pypdf2")
+
+# PDFهای کوچک‌تر از این در یک پروسس خوانده می‌شوند؛
+# برای بزرگ‌ترها صفحات بین پروسس‌ها تقسیم می‌شوند.
+EXTRACT_PARALLEL_MIN_PAGES = int(os.getenv("EXTRACT_PARALLEL_MIN_PAGES", "32"))
+
+
+class PdfTextError(Exception):
+    """
+    PDF خراب است یا موتور استخراج نمی‌تواند بازش کند.
+    """
+
+
+class PyPDF2Backend:
+    name = "pypdf2"
+
+    @staticmethod
+    def available() -> bool:
+        try:
+            import PyPDF2  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    @staticmethod
+    def page_count(pdf_bytes: bytes) -> int:
+        from PyPDF2 import PdfReader
+
+        return len(PdfReader(io.BytesIO(pdf_bytes)).pages)
+
+    @staticmethod
+    def pages(pdf_bytes: bytes, start: int, stop: int) -> list:
+        from PyPDF2 import PdfReader
+
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        texts = []
+        for i in range(start, stop):
+            try:
+                texts.append(reader.pages[i].extract_text() or "")
+            except Exception as e:
+                print("ERROR in PyPDF2 extract_text:", e)
+                texts.append("")
+        return texts
+
+
+class PdfMinerBackend:
+    name = "pdfminer"
+
+    @staticmethod
+    def available() -> bool:
+        try:
+            import pdfminer.high_level  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    @staticmethod
+    def page_count(pdf_bytes: bytes) -> int:
+        from pdfminer.pdfpage import PDFPage
+
+        return sum(1 for _ in PDFPage.get_pages(io.BytesIO(pdf_bytes)))
+
+    @staticmethod
+    def pages(pdf_bytes: bytes, start: int, stop: int) -> list:
+        from pdfminer.high_level import extract_text
+
+        texts = []
+        for i in range(start, stop):
+            try:
+                texts.append(extract_text(io.BytesIO(pdf_bytes), page_numbers=[i]))
+            except Exception as e:
+                print("ERROR in pdfminer extract_text:", e)
+                texts.append("")
+        return texts
+
+
+class PdfiumBackend:
+    name = "pdfium"
+
+    @staticmethod
+    def available() -> bool:
+        try:
+            import pypdfium2  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    @staticmethod
+    def page_count(pdf_bytes: bytes) -> int:
+        import pypdfium2
+
+        return len(pypdfium2.PdfDocument(pdf_bytes))
+
+    @staticmethod
+    def pages(pdf_bytes: bytes, start: int, stop: int) -> list:
+        import pypdfium2
+
+        doc = pypdfium2.PdfDocument(pdf_bytes)
+        texts = []
+        for i in range(start, stop):
+            try:
+                texts.append(doc[i].get_textpage().get_text_range())
+            except Exception as e:
+                print("ERROR in pdfium get_text_range:", e)
+                texts.append("")
+        return texts
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (PyPDF2Backend, PdfMinerBackend, PdfiumBackend)
+}
+
+
+def available_backends() -> list:
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+
+def get_backend(name: str = PDF_TEXT_BACKEND):
+    backend = BACKENDS.get(name)
+    if backend is None or not backend.available():
+        # اگر موتور خواسته‌شده نصب نبود، به PyPDF2 برمی‌گردیم
+        return PyPDF2Backend
+    return backend
+
+
+def _extract_range(backend_name: str, pdf_bytes: bytes, start: int, stop: int) -> list:
+    return BACKENDS[backend_name].pages(pdf_bytes, start, stop)
+
+
+async def extract_pages(
+    pdf_bytes: bytes,
+    backend_name: str = PDF_TEXT_BACKEND,
+    parallel_min_pages: int = EXTRACT_PARALLEL_MIN_PAGES,
+) -> list:
+    """
+    متن هر صفحه را جدا برمی‌گرداند (به ترتیب صفحات).
+    در PDFهای بزرگ، بازه‌های صفحات در استخر پروسس‌ها موازی خوانده می‌شوند.
+    """
+    backend = get_backend(backend_name)
+
+    try:
+        page_count = await asyncio.to_thread(backend.page_count, pdf_bytes)
+    except Exception as e:
+        raise PdfTextError(str(e)) from e
+
+    if page_count < parallel_min_pages or OCR_WORKERS <= 1:
+        return await asyncio.to_thread(
+            _extract_range, backend.name, pdf_bytes, 0, page_count
+        )
+
+    chunk = -(-page_count // OCR_WORKERS)
+    futures = [
+        run_in_pool(
+            _extract_range, backend.name, pdf_bytes,
+            start, min(start + chunk, page_count),
+        )
+        for start in range(0, page_count, chunk)
+    ]
+
+    texts = []
+    for part in await asyncio.gather(*futures):
+        texts.extend(part)
+    return texts
+
+
+def join_text(texts) -> str:
+    # یک بار join به جای += روی هر صفحه (که روی کتاب‌های بزرگ درجه دو می‌شود)
+    return "".join(text + "\n\n" for text in texts)
+
+
+async def extract_pdf_text(pdf_bytes: bytes, backend_name: str = PDF_TEXT_BACKEND) -> str:
+    return join_text(await extract_pages(pdf_bytes, backend_name))
@@ -0,0 +1,117 @@
+import os
+import time
+import importlib
+
+# هندلرهای کارها: اسم -> "ماژول:تابع".
+# ماژول هر هندلر (و کتابخانه‌های سنگینش مثل PyPDF2، python-docx، pytesseract،
+# pdf2image و PIL) فقط اولین باری که کاری از آن نوع اجرا شود import می‌شود؛
+# پروسسی که فقط /، /me یا /credit جواب می‌دهد (یا وبِ حالت JOB_BROKER) هیچ‌وقت آن‌ها را بار نمی‌کند.
+HANDLER_PATHS = {
+    "handle_pdf_to_word": "modules.pdf_to_word:handle_pdf_to_word",
+    "handle_summary_pdf": "modules.summary:handle_summary_pdf",
+    "handle_summary_word": "modules.summary:handle_summary_word",
+    "handle_summary_text": "modules.summary:handle_summary_text",
+    "handle_ocr_pdf": "modules.ocr_cleaner:handle_ocr_pdf",
+    "handle_hybrid_pdf": "modules.hybrid:handle_hybrid_pdf",
+    "handle_batch": "modules.batch:handle_batch",
+}
+
+# کلید کش نتیجه هر هندلر فایل برای file_unique_id: اسم هندلر -> "ماژول:تابع".
+# وب قبل از پیش‌دریافت فایل با آن می‌بیند نتیجه از قبل در کش هست یا نه.
+CACHE_KEY_PATHS = {
+    "handle_pdf_to_word": "modules.pdf_to_word:word_cache_key",
+    "handle_summary_pdf": "modules.summary:summary_pdf_cache_key",
+    "handle_summary_word": "modules.summary:summary_word_cache_key",
+    "handle_ocr_pdf": "modules.ocr_cleaner:ocr_cache_key",
+    "handle_hybrid_pdf": "modules.hybrid:hybrid_cache_key",
+}
+
+# هندلرهایی که موقع شروع از قبل بار می‌شوند تا اولین کار منتظر import نماند:
+# "" (هیچ‌کدام؛ پیش‌فرض)، "all" یا اسم هندلرها با کاما
+WARMUP_HANDLERS = os.getenv("WARMUP_HANDLERS", "")
+
+
+class LazyHandler:
+    """
+    به جای تابع هندلر در جدول مسیرها و صف قرار می‌گیرد و اولین صدا زدن ماژولش را import می‌کند.
+    __name__ همان اسم هندلر است تا broker کار را با همین اسم ثبت کند.
+    """
+
+    def __init__(self, name: str, path: str, key_path: str = None):
+        self.__name__ = name
+        self.path = path
+        self.key_path = key_path
+        self._func = None
+        self._key_func = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._func is not None
+
+    def load(self):
+        if self._func is None:
+            module_name, attr = self.path.split(":", 1)
+            self._func = getattr(importlib.import_module(module_name), attr)
+        return self._func
+
+    def cache_key(self, file_unique_id: str):
+        """
+        کلید کش نتیجه این هندلر برای فایل، یا None اگر هندلر کلید کش ثبت‌شده ندارد.
+        (ماژول هندلر را import می‌کند؛ همان ماژولی که کار این فایل کمی بعد لازم دارد.)
+        """
+        if self.key_path is None:
+            return None
+        if self._key_func is None:
+            module_name, attr = self.key_path.split(":", 1)
+            self._key_func = getattr(importlib.import_module(module_name), attr)
+        return self._key_func(file_unique_id)
+
+    async def __call__(self, *args):
+        return await self.load()(*args)
+
+    def __repr__(self):
+        return f"<LazyHandler {self.__name__} ({self.path})>"
+
+
+HANDLERS = {}
+
+
+def register(name: str, path: str, key_path: str = None) -> LazyHandler:
+    """
+    هندلر تازه (مثلاً از یک ماژول جدا) را بدون import کردنش ثبت می‌کند.
+    """
+    HANDLERS[name] = LazyHandler(name, path, key_path)
+    return HANDLERS[name]
+
+
+for _name, _path in HANDLER_PATHS.items():
+    register(_name, _path, CACHE_KEY_PATHS.get(_name))
+
+
+def get_handler(name: str) -> LazyHandler:
+    return HANDLERS[name]
+
+
+def warm_up(names: str = WARMUP_HANDLERS) -> dict:
+    """
+    ماژول هندلرهای خواسته‌شده را از قبل import می‌کند و زمان هر کدام (ثانیه) را برمی‌گرداند.
+    """
+    if names.strip() == "all":
+        selected = list(HANDLERS)
+    else:
+        selected = [name.strip() for name in names.split(",") if name.strip()]
+
+    timings = {}
+    for name in selected:
+        handler = HANDLERS.get(name)
+        if handler is None:
+            print("ERROR in warm_up: unknown handler", name)
+            continue
+        start = time.perf_counter()
+        try:
+            handler.load()
+        except Exception as e:
+            print(f"ERROR in warm_up {name}:", e)
+            continue
+        timings[name] = round(time.perf_counter() - start, 4)
+    return timings
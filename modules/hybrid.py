@@ -0,0 +1,207 @@
+import io
+import os
+import asyncio
+
+from PyPDF2 import PdfReader
+from PyPDF2.errors import PdfReadError
+from PyPDF2.generic import ContentStream
+
+from modules.telegram_api import send_message
+from modules.delivery import deliver_document
+from modules.downloader import download, DownloadError
+from modules.cache import result_cache, content_hash
+from modules.ocr_engine import iter_ocr_bytes, OCR_DPI, OCR_GRAYSCALE
+from modules.ocr_preprocess import OCR_PREPROCESS
+from modules.ocr_cleaner import TESS_LANG
+from modules.docx_writer import build_docx
+from modules.progress import ProgressMessage
+from modules.metrics import set_mode, timed, count_error, pages_total
+
+# صفحه‌ای که لایه متنی‌اش حداقل این تعداد کاراکتر دارد، صفحه متنی حساب می‌شود
+HYBRID_TEXT_CHARS = int(os.getenv("HYBRID_TEXT_CHARS", "200"))
+
+# صفحه‌ای که متن کمی دارد ولی حداقل این نسبت از سطحش را تصویر گرفته، OCR می‌شود
+HYBRID_IMAGE_COVERAGE = float(os.getenv("HYBRID_IMAGE_COVERAGE", "0.3"))
+
+
+def _multiply(m, n):
+    # ضرب ماتریس‌های تبدیل PDF به شکل [a b c d e f]
+    return [
+        m[0] * n[0] + m[1] * n[2],
+        m[0] * n[1] + m[1] * n[3],
+        m[2] * n[0] + m[3] * n[2],
+        m[2] * n[1] + m[3] * n[3],
+        m[4] * n[0] + m[5] * n[2] + n[4],
+        m[4] * n[1] + m[5] * n[3] + n[5],
+    ]
+
+
+def image_coverage(page, reader) -> float:
+    """
+    چه نسبتی از سطح صفحه را تصاویر (XObject از نوع Image) پوشانده‌اند.
+    """
+    resources = page.get("/Resources")
+    if not resources:
+        return 0.0
+    xobjects = resources.get_object().get("/XObject")
+    if not xobjects:
+        return 0.0
+
+    xobjects = xobjects.get_object()
+    images = {
+        name for name in xobjects
+        if xobjects[name].get_object().get("/Subtype") == "/Image"
+    }
+    if not images:
+        return 0.0
+
+    contents = page.get_contents()
+    if contents is None:
+        return 0.0
+
+    page_area = float(page.mediabox.width) * float(page.mediabox.height)
+    if page_area <= 0:
+        return 0.0
+
+    # تصویر در مربع واحد کشیده می‌شود؛ مساحتش = دترمینان ماتریس CTM
+    ctm = [1, 0, 0, 1, 0, 0]
+    stack = []
+    covered = 0.0
+    for operands, operator in ContentStream(contents, reader).operations:
+        if operator == b"q":
+            stack.append(ctm)
+        elif operator == b"Q" and stack:
+            ctm = stack.pop()
+        elif operator == b"cm" and len(operands) == 6:
+            ctm = _multiply([float(x) for x in operands], ctm)
+        elif operator == b"Do" and operands and operands[0] in images:
+            covered += abs(ctm[0] * ctm[3] - ctm[1] * ctm[2])
+
+    return min(1.0, covered / page_area)
+
+
+def classify(chars: int, coverage: float) -> str:
+    """
+    "text": لایه متنی کافی دارد، "ocr": صفحه اسکن/عکس است، "empty": چیزی برای خواندن ندارد
+    """
+    if chars >= HYBRID_TEXT_CHARS:
+        return "text"
+    if coverage >= HYBRID_IMAGE_COVERAGE:
+        return "ocr"
+    if chars:
+        return "text"
+    return "empty"
+
+
+def analyze_pages(pdf_bytes: bytes) -> list:
+    """
+    برای هر صفحه (متن لایه متنی، نوع صفحه) را برمی‌گرداند.
+    """
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    result = []
+    for page in reader.pages:
+        try:
+            text = page.extract_text() or ""
+        except Exception as e:
+            print("ERROR in PyPDF2 extract_text:", e)
+            text = ""
+        try:
+            coverage = image_coverage(page, reader)
+        except Exception as e:
+            print("ERROR in image_coverage:", e)
+            coverage = 1.0
+
+        result.append((text, classify(len(text.strip()), coverage)))
+    return result
+
+
+def hybrid_cache_key(file_unique_id: str) -> str:
+    return result_cache.make_key(
+        file_unique_id, "HYBRID_PDF",
+        lang=TESS_LANG, dpi=OCR_DPI, grayscale=OCR_GRAYSCALE, preprocess=OCR_PREPROCESS,
+        text_chars=HYBRID_TEXT_CHARS, image_coverage=HYBRID_IMAGE_COVERAGE,
+    )
+
+
+async def handle_hybrid_pdf(chat_id: int, file_id: str, file_unique_id: str = None):
+    """
+    PDF ترکیبی (بعضی صفحات متنی، بعضی اسکن):
+    صفحات متنی مستقیم خوانده می‌شوند و فقط صفحات تصویری OCR می‌شوند.
+    """
+    set_mode("HYBRID_PDF")
+    try:
+        pdf_bytes = None
+        if not file_unique_id:
+            pdf_bytes = await download(file_id, "pdf")
+            file_unique_id = content_hash(pdf_bytes)
+
+        cache_key = hybrid_cache_key(file_unique_id)
+        cached = await result_cache.aget(cache_key)
+        if cached is not None:
+            await deliver_document(chat_id, "converted.docx", cached)
+            return
+
+        if pdf_bytes is None:
+            pdf_bytes = await download(file_id, "pdf")
+
+        # 1) تشخیص نوع هر صفحه
+        with timed("parse"):
+            pages = await asyncio.to_thread(analyze_pages, pdf_bytes)
+        texts = [text if kind == "text" else "" for text, kind in pages]
+        ocr_numbers = [i for i, (_, kind) in enumerate(pages, start=1) if kind == "ocr"]
+        pages_total.inc(len(pages) - len(ocr_numbers), mode="HYBRID_PDF", method="text")
+        pages_total.inc(len(ocr_numbers), mode="HYBRID_PDF", method="ocr")
+
+        await send_message(
+            chat_id,
+            f"از {len(pages)} صفحه، {len(pages) - len(ocr_numbers)} صفحه متن داشت "
+            f"و {len(ocr_numbers)} صفحه باید OCR بشه... ⏳",
+        )
+
+        # 2) OCR فقط روی صفحات تصویری
+        if ocr_numbers:
+            progress = ProgressMessage(
+                chat_id, len(ocr_numbers), "در حال OCR صفحات اسکن‌شده... ⏳"
+            )
+            await progress.start()
+            done = 0
+            async for number, text in iter_ocr_bytes(
+                pdf_bytes, TESS_LANG, page_numbers=ocr_numbers
+            ):
+                texts[number - 1] = text
+                done += 1
+                await progress.update(done)
+            await progress.finish()
+
+        # 3) ادغام به ترتیب صفحات
+        if not any(text.strip() for text in texts):
+            await send_message(
+                chat_id,
+                "متنی نتونستم از این PDF استخراج کنم 😕"
+            )
+            return
+
+        with timed("docx_build"):
+            doc_bytes = await asyncio.to_thread(build_docx, texts, True)
+        await deliver_document(chat_id, "converted.docx", doc_bytes)
+        await result_cache.aput(cache_key, doc_bytes)
+
+    except DownloadError as e:
+        count_error(e)
+        await send_message(chat_id, str(e))
+
+    except PdfReadError as e:
+        count_error(e)
+        await send_message(
+            chat_id,
+            "نتونستم این PDF رو بخونم 😕\n"
+            "یا خراب شده، یا فرمتش عجیبه. لطفاً یک فایل دیگه امتحان کن."
+        )
+
+    except Exception as e:
+        count_error(e)
+        print("ERROR in handle_hybrid_pdf:", e)
+        await send_message(
+            chat_id,
+            "در تبدیل PDF ترکیبی یه خطای غیرمنتظره پیش اومد 😔"
+        )
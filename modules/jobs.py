@@ -0,0 +1,189 @@
+import os
+import asyncio
+from collections import deque
+
+# تعداد کارهایی که هم‌زمان اجرا می‌شوند
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+# حداکثر تعداد کارهای منتظر در صف (برای همه چت‌ها روی هم)
+JOB_QUEUE_MAXSIZE = int(os.getenv("JOB_QUEUE_MAXSIZE", "100"))
+
+# حداکثر کار هم‌زمانِ در حال اجرا و حداکثر کار منتظر برای هر کاربر
+JOB_USER_MAX_RUNNING = int(os.getenv("JOB_USER_MAX_RUNNING", "1"))
+JOB_USER_MAX_PENDING = int(os.getenv("JOB_USER_MAX_PENDING", "5"))
+
+# وزن هر حالت برای تخمین هزینه کار (نسبت به تبدیل ساده PDF → Word)
+MODE_COST = {
+    "WORD": 1,
+    "SUMMARY_PDF": 1,
+    "SUMMARY_WORD": 1,
+    "SUMMARY_TEXT": 1,
+    "HYBRID_PDF": 5,
+    "OCR_PDF": 10,
+}
+
+# قبل از دانلود تعداد صفحات را نمی‌دانیم؛ از حجم فایل تخمینش می‌زنیم
+JOB_COST_PAGE_KB = int(os.getenv("JOB_COST_PAGE_KB", "100"))
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class UserQueueFullError(QueueFullError):
+    """
+    صف کلی جا دارد ولی همین کاربر بیش از حد کار منتظر دارد.
+    """
+
+
+def estimate_cost(mode: str, file_size: int = None) -> float:
+    """
+    هزینه تقریبی کار = وزن حالت × تعداد تخمینی صفحات
+    """
+    pages = max(1.0, (file_size or 0) / (JOB_COST_PAGE_KB * 1024))
+    return MODE_COST.get(mode, 1) * pages
+
+
+class JobQueue:
+    """
+    صف کارهای سنگین (تبدیل، خلاصه، OCR):
+    - ظرفیت محدود دارد و اگر پر باشد QueueFullError می‌دهد
+    - چند worker هم‌زمان کارها را اجرا می‌کنند
+    - کارهای یک چت همیشه به ترتیب و پشت سر هم اجرا می‌شوند
+    - نوبت‌دهی بین کاربرها منصفانه و وزن‌دار است (weighted fair queueing):
+      هر کار برچسب پایانی = max(زمان مجازی، برچسب کار قبلی همان کاربر) + هزینه
+      می‌گیرد و کار با کوچک‌ترین برچسب زودتر اجرا می‌شود؛ پس کارهای کوتاه جلو
+      می‌افتند و کسی که ده OCR سنگین فرستاده بقیه را پشت سر خودش نگه نمی‌دارد
+    - هر کاربر حداکثر user_max_running کار هم‌زمان دارد
+    """
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        maxsize: int = JOB_QUEUE_MAXSIZE,
+        user_max_running: int = JOB_USER_MAX_RUNNING,
+        user_max_pending: int = JOB_USER_MAX_PENDING,
+    ):
+        self.workers = max(1, workers)
+        self.maxsize = maxsize
+        self.user_max_running = max(1, user_max_running)
+        self.user_max_pending = user_max_pending
+
+        # {chat_id: deque([(start, finish, user_id, func, args), ...])}
+        self._pending = {}
+        # چت‌هایی که الان یک کارشان در حال اجراست
+        self._busy_chats = set()
+        # {user_id: تعداد کار در حال اجرا} و {user_id: تعداد کار منتظر}
+        self._running = {}
+        self._waiting = {}
+        # {user_id: برچسب پایانی آخرین کار ثبت‌شده}
+        self._last_finish = {}
+        self._virtual_time = 0.0
+        self._changed = None
+        self._tasks = []
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    async def start(self):
+        self._changed = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(i)) for i in range(self.workers)
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, chat_id: int, func, *args, user_id: int = None, cost: float = 1) -> int:
+        """
+        یک کار جدید به صف اضافه می‌کند و تعداد کارهایی را که قبل از آن
+        اجرا می‌شوند (بر اساس نوبت منصفانه) برمی‌گرداند.
+        """
+        if self._size >= self.maxsize:
+            raise QueueFullError()
+
+        if user_id is None:
+            user_id = chat_id
+        if self._waiting.get(user_id, 0) >= self.user_max_pending:
+            raise UserQueueFullError()
+
+        start = max(self._virtual_time, self._last_finish.get(user_id, 0.0))
+        finish = start + cost
+        self._last_finish[user_id] = finish
+
+        ahead = sum(
+            1
+            for jobs in self._pending.values()
+            for job in jobs
+            if job[1] <= finish
+        )
+
+        self._pending.setdefault(chat_id, deque()).append(
+            (start, finish, user_id, func, args)
+        )
+        self._waiting[user_id] = self._waiting.get(user_id, 0) + 1
+        self._size += 1
+        self._changed.set()
+        return ahead
+
+    async def asubmit(self, chat_id: int, func, *args, user_id: int = None, cost: float = 1) -> int:
+        """
+        همان submit با رابط async مشترک با BrokerQueue (اینجا چیزی بلاک نمی‌شود).
+        """
+        return self.submit(chat_id, func, *args, user_id=user_id, cost=cost)
+
+    def _pick(self):
+        """
+        از بین چت‌های بیکار که کاربرشان به سقف کار هم‌زمان نرسیده،
+        کاری را که کوچک‌ترین برچسب پایانی دارد انتخاب می‌کند.
+        """
+        best = None
+        for chat_id, jobs in self._pending.items():
+            if chat_id in self._busy_chats:
+                continue
+            job = jobs[0]
+            if self._running.get(job[2], 0) >= self.user_max_running:
+                continue
+            if best is None or job[1] < best[1][1]:
+                best = (chat_id, job)
+        return best
+
+    async def _worker(self, index: int):
+        while True:
+            # همه چیز در یک event loop است؛ بین _pick و برداشتن کار await نداریم
+            picked = self._pick()
+            while picked is None:
+                self._changed.clear()
+                await self._changed.wait()
+                picked = self._pick()
+
+            chat_id, (start, _, user_id, func, args) = picked
+            jobs = self._pending[chat_id]
+            jobs.popleft()
+            if not jobs:
+                del self._pending[chat_id]
+            self._busy_chats.add(chat_id)
+            self._running[user_id] = self._running.get(user_id, 0) + 1
+            self._waiting[user_id] -= 1
+            self._virtual_time = max(self._virtual_time, start)
+
+            try:
+                await func(*args)
+            except Exception as e:
+                print(f"ERROR in job worker {index}:", e)
+            finally:
+                self._size -= 1
+                self._busy_chats.discard(chat_id)
+                self._running[user_id] -= 1
+                if not self._running[user_id]:
+                    del self._running[user_id]
+                if not self._waiting.get(user_id) and user_id not in self._running:
+                    # کاربری که نه کار منتظر دارد نه در حال اجرا، سابقه‌اش پاک می‌شود
+                    self._waiting.pop(user_id, None)
+                    self._last_finish.pop(user_id, None)
+                # ممکن است کار بعدی همین چت/کاربر حالا قابل اجرا شده باشد
+                self._changed.set()
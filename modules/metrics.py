@@ -0,0 +1,215 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# متریک‌ها به فرمت متنی Prometheus (بدون وابستگی به prometheus_client).
+# هر پروسس متریک‌های خودش را دارد؛ در حالت broker هر worker.py جدا حساب می‌کند.
+
+# بازه‌های histogram (ثانیه)؛ از یک صفحه متنی تا OCR یک کتاب
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# حالت کار جاری ("WORD", "OCR_PDF", ...)؛ هندلرها تنظیمش می‌کنند
+# و چون asyncio.to_thread هم context را کپی می‌کند، مرحله‌های داخل ترد هم برچسب می‌گیرند
+current_mode = contextvars.ContextVar("current_mode", default="")
+
+_lock = threading.Lock()
+_metrics = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        with _lock:
+            _metrics.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self) -> list:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines += self._samples()
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with _lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """
+    مقدار لحظه‌ای؛ با set_function هنگام خواندن /metrics محاسبه می‌شود.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels=()):
+        super().__init__(name, documentation, labels)
+        self._function = None
+
+    def set(self, value: float, **labels):
+        with _lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, function):
+        self._function = function
+
+    def _samples(self):
+        if self._function is not None:
+            try:
+                self.set(self._function())
+            except Exception as e:
+                print("ERROR in metrics gauge:", e)
+        with _lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with _lock:
+            # [تعداد در هر bucket، جمع، تعداد کل]
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def _samples(self):
+        with _lock:
+            items = sorted((key, [list(e[0]), e[1], e[2]]) for key, e in self._values.items())
+
+        lines = []
+        for key, (buckets, total, count) in items:
+            for bound, bucket_count in zip(self.buckets, buckets):
+                labels = _format_labels(self.labels, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            labels = _format_labels(self.labels, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def render() -> str:
+    with _lock:
+        metrics = list(_metrics)
+    lines = []
+    for metric in metrics:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+# ---------- متریک‌های ربات ----------
+
+stage_seconds = Histogram(
+    "bot_stage_seconds",
+    "Duration of each processing stage (download, parse, rasterize, docx_build, upload, ...)",
+    ("stage", "mode"),
+)
+ocr_page_seconds = Histogram(
+    "bot_ocr_page_seconds",
+    "Tesseract time for a single page",
+    ("mode",),
+)
+errors_total = Counter("bot_errors_total", "Errors by exception type", ("mode", "type"))
+bytes_total = Counter(
+    "bot_bytes_total", "Bytes downloaded from / uploaded to Telegram", ("direction",)
+)
+pages_total = Counter("bot_pages_total", "Processed PDF pages", ("mode", "method"))
+cache_lookups = Counter("bot_cache_lookups_total", "Result cache lookups", ("result",))
+downloads_rejected = Counter(
+    "bot_downloads_rejected_total", "Downloads refused (too large / wrong file type)", ("reason",)
+)
+updates_total = Counter(
+    "bot_updates_total", "Telegram updates received (webhook / polling)", ("source",)
+)
+queue_depth = Gauge("bot_job_queue_depth", "Jobs waiting or running")
+
+
+def set_mode(mode: str):
+    current_mode.set(mode)
+
+
+@contextmanager
+def timed(stage: str, mode: str = None):
+    """
+    مدت یک مرحله را در bot_stage_seconds ثبت می‌کند (حتی اگر مرحله خطا بدهد).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.observe(
+            time.perf_counter() - start,
+            stage=stage, mode=mode if mode is not None else current_mode.get(),
+        )
+
+
+class StageTimer:
+    """
+    برای مرحله‌هایی که تکه‌تکه انجام می‌شوند (مثلاً نوشتن تدریجی docx):
+    زمان همه تکه‌ها جمع و در آخر با observe یک بار ثبت می‌شود.
+    """
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.seconds = 0.0
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds += time.perf_counter() - self._start
+
+    def observe(self):
+        stage_seconds.observe(self.seconds, stage=self.stage, mode=current_mode.get())
+
+
+def count_error(error: Exception):
+    errors_total.inc(mode=current_mode.get(), type=type(error).__name__)
@@ -1,95 +1,116 @@
+import io
 import os
-import requests
-import pytesseract
-from pdf2image import convert_from_bytes
-from docx import Document
-
-BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-TELEGRAM_API = f"https://api.telegram.org/bot{BOT_TOKEN}"
+import asyncio
+
+from modules.telegram_api import send_message
+from modules.delivery import deliver_document
+from modules.downloader import download, DownloadError
+from modules.ocr_engine import iter_ocr_pdf, pdf_page_info, OCR_DPI, OCR_GRAYSCALE
+from modules.ocr_preprocess import OCR_PREPROCESS
+from modules.docx_writer import DocxStreamWriter
+from modules.progress import ProgressMessage, PartialResults
+from modules.metrics import set_mode, timed, count_error, pages_total, StageTimer
+from modules.cache import result_cache, content_hash
+from modules.workspace import job_workspace, spill
 
 # زبان OCR (مثلاً "eng" یا "fas" یا "fas+eng")
 TESS_LANG = os.getenv("TESSERACT_LANG", "eng")
 
 
-def send_message(chat_id, text):
-    requests.post(f"{TELEGRAM_API}/sendMessage", json={
-        "chat_id": chat_id,
-        "text": text
-    })
+def ocr_cache_key(file_unique_id: str) -> str:
+    # همین فایل با تنظیمات OCR دیگر نتیجه دیگری است
+    return result_cache.make_key(
+        file_unique_id, "OCR_PDF",
+        lang=TESS_LANG, dpi=OCR_DPI, grayscale=OCR_GRAYSCALE, preprocess=OCR_PREPROCESS,
+    )
 
 
-async def handle_ocr_pdf(chat_id: int, file_id: str):
+async def handle_ocr_pdf(chat_id: int, file_id: str, file_unique_id: str = None):
     """
     یک PDF اسکن‌شده (یا عکس‌دار) می‌گیرد،
     متن را با Tesseract استخراج می‌کند
     و خروجی را به صورت Word برای کاربر می‌فرستد.
     """
+    set_mode("OCR_PDF")
     try:
-        # 1) گرفتن لینک فایل از تلگرام
-        file_info = requests.get(
-            f"{TELEGRAM_API}/getFile",
-            params={"file_id": file_id}
-        ).json()
-
-        file_path = file_info["result"]["file_path"]
-        file_url = f"https://api.telegram.org/file/bot{BOT_TOKEN}/{file_path}"
-
-        pdf_bytes = requests.get(file_url).content
-
-        send_message(chat_id, "در حال تبدیل صفحات PDF به تصویر هستم... ⏳")
-
-        # 2) تبدیل PDF به تصاویر
-        pages = convert_from_bytes(pdf_bytes)
-
-        if not pages:
-            send_message(
-                chat_id,
-                "نتونستم هیچ صفحه‌ای از این PDF بخونم 😕"
-            )
+        pdf_bytes = None
+        if not file_unique_id:
+            pdf_bytes = await download(file_id, "pdf")
+            file_unique_id = content_hash(pdf_bytes)
+
+        # 0) اگر همین فایل با همین تنظیمات قبلاً OCR شده، نتیجه را از کش می‌فرستیم
+        cache_key = ocr_cache_key(file_unique_id)
+        cached = await result_cache.aget(cache_key)
+        if cached is not None:
+            await deliver_document(chat_id, "ocr_converted.docx", cached)
             return
 
-        send_message(chat_id, "در حال خواندن متن از روی تصاویر (OCR)... ⏳")
+        # 1) دانلود فایل از تلگرام
+        if pdf_bytes is None:
+            pdf_bytes = await download(file_id, "pdf")
 
-        full_text = ""
+        # pdftoppm فقط از روی فایل می‌خواند؛ پس PDF در پوشه اختصاصی همین کار نوشته می‌شود
+        with job_workspace("ocr-") as workspace:
+            pdf_path = spill(workspace, "input.pdf", pdf_bytes)
+            del pdf_bytes
 
-        for i, img in enumerate(pages, start=1):
-            try:
-                text = pytesseract.image_to_string(img, lang=TESS_LANG)
-            except Exception as e:
-                print("ERROR in pytesseract:", e)
-                text = ""
+            # 2) تعداد صفحات
+            with timed("parse"):
+                page_count, page_size = await asyncio.to_thread(pdf_page_info, pdf_path)
 
-            if text.strip():
-                full_text += f"\n\n--- صفحه {i} ---\n\n"
-                full_text += text
+            if not page_count:
+                await send_message(
+                    chat_id,
+                    "نتونستم هیچ صفحه‌ای از این PDF بخونم 😕"
+                )
+                return
 
-        if not full_text.strip():
-            send_message(
+            progress = ProgressMessage(
+                chat_id, page_count, "در حال خواندن متن از روی تصاویر (OCR)... ⏳"
+            )
+            await progress.start()
+            partial = PartialResults(chat_id, "ocr", page_count)
+
+            # صفحات پنجره به پنجره به تصویر تبدیل و موازی OCR می‌شوند
+            # و هر صفحه همان لحظه به فایل Word اضافه می‌شود
+            buffer = io.BytesIO()
+            docx_timer = StageTimer("docx_build")
+            with DocxStreamWriter(buffer) as writer:
+                done = 0
+                async for number, text in iter_ocr_pdf(
+                    pdf_path, TESS_LANG, page_count, page_size
+                ):
+                    with docx_timer:
+                        writer.add_page(number, text)
+                    done += 1
+                    await progress.update(done)
+                    await partial.add(number, text)
+
+            docx_timer.observe()
+            pages_total.inc(done, mode="OCR_PDF", method="ocr")
+            await progress.finish()
+
+        if not writer.chars:
+            await send_message(
                 chat_id,
                 "متنی نتونستم از این PDF اسکن‌شده استخراج کنم 😕\n"
                 "ممکنه کیفیت اسکن پایین باشه یا Tesseract روی سرور درست نصب نشده باشه."
             )
             return
 
-        # 3) ساخت Word
-        doc = Document()
-        for line in full_text.split("\n"):
-            doc.add_paragraph(line)
+        # 3) ارسال Word به کاربر
+        doc_bytes = buffer.getvalue()
+        await deliver_document(chat_id, "ocr_converted.docx", doc_bytes)
+        await result_cache.aput(cache_key, doc_bytes)
 
-        filename = "ocr_converted.docx"
-        doc.save(filename)
-
-        # 4) ارسال Word به کاربر
-        with open(filename, "rb") as f:
-            requests.post(
-                f"{TELEGRAM_API}/sendDocument",
-                data={"chat_id": chat_id},
-                files={"document": ("ocr_converted.docx", f)},
-            )
+    except DownloadError as e:
+        count_error(e)
+        await send_message(chat_id, str(e))
 
     except Exception as e:
+        count_error(e)
         print("ERROR in handle_ocr_pdf:", e)
-        send_message(
+        await send_message(
             chat_id,
             "در تبدیل اسکن به متن تایپی یه خطای غیرمنتظره پیش اومد 😔\n"
             "ممکنه نیاز باشه Tesseract روی سرور درست نصب/تنظیم بشه."
@@ -0,0 +1,274 @@
+import os
+import re
+import time
+import asyncio
+
+import pytesseract
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+from modules.pool import OCR_WORKERS, run_in_pool
+from modules.metrics import timed, ocr_page_seconds, stage_seconds, current_mode
+from modules.ocr_preprocess import preprocess, get_profile, peak_bytes, OCR_PREPROCESS
+from modules.workspace import job_workspace, spill
+
+# تنظیمات تبدیل صفحه به تصویر
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+OCR_GRAYSCALE = os.getenv("OCR_GRAYSCALE", "1") == "1"
+
+# سقف حافظه تصاویر یک کار (مگابایت) و سقف تعداد صفحه در هر پنجره
+OCR_MEMORY_BUDGET_MB = int(os.getenv("OCR_MEMORY_BUDGET_MB", "512"))
+OCR_WINDOW_PAGES = int(os.getenv("OCR_WINDOW_PAGES", "0")) or OCR_WORKERS * 2
+
+# موتور OCR: "auto" (tesserocr اگر نصب باشد و API آن ساخته شود، وگرنه pytesseract) | "tesserocr" | "pytesseract"
+OCR_ENGINE = os.getenv("OCR_ENGINE", "auto")
+
+# اندازه پیش‌فرض صفحه (A4 به point) وقتی pdfinfo اندازه را نمی‌دهد
+_DEFAULT_PAGE_SIZE = (595.0, 842.0)
+
+
+class PytesseractEngine:
+    """
+    برای هر صفحه یک پروسس tesseract جدا اجرا می‌کند
+    (تصویر در فایل موقت نوشته و مدل زبان هر بار از دیسک خوانده می‌شود).
+    """
+
+    name = "pytesseract"
+
+    @staticmethod
+    def available(lang: str = None) -> bool:
+        return True
+
+    @staticmethod
+    def image_to_string(image, lang: str, dpi: int) -> str:
+        # تصاویر pdf2image اطلاعات DPI ندارند و Tesseract بدون آن حدس می‌زند
+        return pytesseract.image_to_string(image, lang=lang, config=f"--dpi {dpi}")
+
+
+class TesserocrEngine:
+    """
+    libtesseract داخل همین پروسس OCR (بدون پروسس و فایل موقت برای هر صفحه)؛
+    برای هر زبان یک API باز می‌ماند تا مدل زبان فقط یک بار بارگذاری شود.
+    """
+
+    name = "tesserocr"
+
+    # {lang: PyTessBaseAPI} در هر پروسس استخر OCR
+    _apis = {}
+
+    @classmethod
+    def available(cls, lang: str = None) -> bool:
+        """
+        با lang ساختن PyTessBaseAPI همان زبان هم امتحان می‌شود
+        (مثلاً traineddata یا TESSDATA_PREFIX درست نیست) و API ساخته‌شده باز می‌ماند.
+        """
+        try:
+            import tesserocr  # noqa: F401
+        except ImportError:
+            return False
+        if lang is not None:
+            try:
+                cls.api(lang)
+            except Exception as e:
+                print("ERROR in tesserocr init:", e)
+                return False
+        return True
+
+    @classmethod
+    def api(cls, lang: str):
+        api = cls._apis.get(lang)
+        if api is None:
+            import tesserocr
+
+            api = cls._apis[lang] = tesserocr.PyTessBaseAPI(lang=lang)
+        return api
+
+    @classmethod
+    def image_to_string(cls, image, lang: str, dpi: int) -> str:
+        api = cls.api(lang)
+        api.SetImage(image)
+        api.SetSourceResolution(dpi)
+        return api.GetUTF8Text()
+
+
+ENGINES = {
+    engine.name: engine
+    for engine in (TesserocrEngine, PytesseractEngine)
+}
+
+
+def available_engines() -> list:
+    return [name for name, engine in ENGINES.items() if engine.available()]
+
+
+# {(name, lang): موتور}؛ هر موتور در هر پروسس فقط یک بار امتحان می‌شود
+_selected = {}
+
+
+def get_engine(name: str = OCR_ENGINE, lang: str = "eng"):
+    key = (name, lang)
+    engine = _selected.get(key)
+    if engine is None:
+        candidates = list(ENGINES.values()) if name == "auto" else [ENGINES.get(name)]
+        engine = next(
+            (engine for engine in candidates if engine is not None and engine.available(lang)),
+            # اگر tesserocr نصب نبود یا راه نیفتاد، به pytesseract برمی‌گردیم
+            PytesseractEngine,
+        )
+        _selected[key] = engine
+    return engine
+
+
+def ocr_page(image, lang: str, dpi: int = OCR_DPI, engine: str = OCR_ENGINE) -> str:
+    """
+    OCR یک صفحه؛ خطای هر صفحه فقط همان صفحه را خالی می‌کند.
+    """
+    engine = get_engine(engine, lang)
+    try:
+        return engine.image_to_string(image, lang, dpi)
+    except Exception as e:
+        print(f"ERROR in {engine.name}:", e)
+        return ""
+
+
+def _timed_ocr_page(image, lang: str, dpi: int, profile: str):
+    # داخل پروسس OCR اجرا می‌شود؛ زمان‌ها را برمی‌گرداند تا پروسس اصلی ثبتشان کند
+    start = time.perf_counter()
+    try:
+        image, dpi = preprocess(image, get_profile(profile), dpi)
+    except Exception as e:
+        # خطای پیش‌پردازش (مثلاً MemoryError) فقط همین صفحه را به OCR تصویر خام برمی‌گرداند
+        print("ERROR in preprocess:", e)
+    prepared = time.perf_counter()
+
+    # صفحه سفید اصلاً به Tesseract نمی‌رود
+    text = "" if image is None else ocr_page(image, lang, dpi)
+    return text, prepared - start, time.perf_counter() - prepared
+
+
+async def ocr_images(images, lang: str, dpi: int = OCR_DPI, profile: str = OCR_PREPROCESS) -> list:
+    """
+    صفحات را موازی روی استخر پروسس‌ها پیش‌پردازش و OCR می‌کند
+    و متن‌ها را به همان ترتیب صفحات برمی‌گرداند.
+    """
+    futures = [
+        run_in_pool(_timed_ocr_page, image, lang, dpi, profile)
+        for image in images
+    ]
+
+    texts = []
+    mode = current_mode.get()
+    for text, prep_seconds, ocr_seconds in await asyncio.gather(*futures):
+        stage_seconds.observe(prep_seconds, stage="preprocess", mode=mode)
+        ocr_page_seconds.observe(ocr_seconds, mode=mode)
+        texts.append(text)
+    return texts
+
+
+def pdf_page_info(pdf_path: str):
+    """
+    تعداد صفحات و اندازه صفحه (به point) را با pdfinfo برمی‌گرداند.
+    """
+    info = pdfinfo_from_path(pdf_path)
+    pages = int(info.get("Pages", 0))
+
+    size = _DEFAULT_PAGE_SIZE
+    match = re.match(r"\s*([\d.]+)\s*x\s*([\d.]+)", info.get("Page size", ""))
+    if match:
+        size = (float(match.group(1)), float(match.group(2)))
+
+    return pages, size
+
+
+def window_size(page_size, dpi: int, grayscale: bool, memory_budget_mb: int,
+                profile: str = OCR_PREPROCESS) -> int:
+    """
+    چند صفحه را می‌شود هم‌زمان در حافظه نگه داشت تا از سقف حافظه رد نشویم.
+    """
+    width = page_size[0] / 72 * dpi
+    height = page_size[1] / 72 * dpi
+    channels = 1 if grayscale else 3
+    # تصویر یک بار در پروسس اصلی و یک بار در پروسس OCR در حافظه است
+    page_bytes = width * height * channels * 2
+    # و هر پروسس OCR موقع پیش‌پردازش یک صفحه آرایه‌های موقت خودش را دارد
+    preprocess_bytes = OCR_WORKERS * peak_bytes(width, height, dpi, profile)
+
+    fit = int((memory_budget_mb * 1024 * 1024 - preprocess_bytes) // page_bytes)
+    return max(1, min(OCR_WINDOW_PAGES, fit))
+
+
+def _runs(numbers):
+    """
+    شماره صفحات را به بازه‌های پشت سر هم (first, last) تبدیل می‌کند.
+    """
+    runs = []
+    for n in numbers:
+        if runs and runs[-1][1] == n - 1:
+            runs[-1][1] = n
+        else:
+            runs.append([n, n])
+    return runs
+
+
+async def iter_ocr_pdf(
+    pdf_path: str,
+    lang: str,
+    page_count: int = None,
+    page_size=_DEFAULT_PAGE_SIZE,
+    dpi: int = OCR_DPI,
+    grayscale: bool = OCR_GRAYSCALE,
+    memory_budget_mb: int = OCR_MEMORY_BUDGET_MB,
+    page_numbers=None,
+    profile: str = OCR_PREPROCESS,
+):
+    """
+    PDF را پنجره به پنجره (first_page/last_page) به تصویر تبدیل و OCR می‌کند
+    و تصاویر هر پنجره را قبل از رفتن سراغ پنجره بعد آزاد می‌کند؛
+    پس حافظه به اندازه پنجره بستگی دارد نه تعداد صفحات.
+    با page_numbers فقط همان صفحات (شماره از 1) OCR می‌شوند.
+    profile پروفایل پیش‌پردازش تصویر است (modules.ocr_preprocess.PROFILES).
+    به محض آماده شدن هر پنجره، (شماره صفحه، متن) صفحاتش را yield می‌کند.
+    """
+    if page_count is None:
+        page_count, page_size = await asyncio.to_thread(pdf_page_info, pdf_path)
+    if page_numbers is None:
+        page_numbers = range(1, page_count + 1)
+    page_numbers = list(page_numbers)
+
+    window = window_size(page_size, dpi, grayscale, memory_budget_mb, profile)
+
+    for i in range(0, len(page_numbers), window):
+        numbers = page_numbers[i:i + window]
+        images = []
+        for first, last in _runs(numbers):
+            with timed("rasterize"):
+                images += await asyncio.to_thread(
+                    convert_from_path,
+                    pdf_path,
+                    dpi=dpi,
+                    first_page=first,
+                    last_page=last,
+                    grayscale=grayscale,
+                )
+        texts = await ocr_images(images, lang, dpi, profile)
+        del images
+
+        for number, text in zip(numbers, texts):
+            yield number, text
+
+
+async def iter_ocr_bytes(pdf_bytes: bytes, lang: str, page_numbers=None, **kwargs):
+    """
+    مثل iter_ocr_pdf برای PDFی که در حافظه است؛
+    pdftoppm فقط از روی فایل می‌خواند، پس PDF در یک پوشه کار موقت نوشته می‌شود.
+    """
+    with job_workspace("ocr-") as workspace:
+        pdf_path = spill(workspace, "input.pdf", pdf_bytes)
+        async for item in iter_ocr_pdf(pdf_path, lang, page_numbers=page_numbers, **kwargs):
+            yield item
+
+
+async def ocr_pdf(pdf_path: str, lang: str, *args, **kwargs) -> list:
+    """
+    مثل iter_ocr_pdf ولی متن همه صفحات را یکجا (به ترتیب) برمی‌گرداند.
+    """
+    return [text async for _, text in iter_ocr_pdf(pdf_path, lang, *args, **kwargs)]
@@ -0,0 +1,278 @@
+import os
+
+import numpy as np
+from PIL import Image
+
+# پیش‌پردازش تصویر صفحه قبل از Tesseract:
+# خاکستری، باینری‌سازی (سراسری یا تطبیقی)، حذف نقطه‌های نویز، صاف کردن کجی، بریدن حاشیه،
+# یکسان‌سازی DPI و تشخیص صفحه سفید (که اصلاً OCR نمی‌شود).
+# داخل پروسس‌های OCR اجرا می‌شود؛ پروفایل با اسمش (رشته) فرستاده می‌شود.
+
+PROFILES = {
+    # بدون پیش‌پردازش (رفتار قبلی)
+    "off": None,
+    # ارزان: آستانه سراسری Otsu، بدون صاف کردن کجی
+    "fast": {
+        "binarize": "otsu",
+        "deskew": 0,
+        "despeckle": True,
+        "crop": True,
+        "blank_ratio": 0.001,
+        "dpi": None,
+    },
+    # پیش‌فرض: آستانه تطبیقی (Sauvola) و صاف کردن کجی تا ۵ درجه
+    "default": {
+        "binarize": "sauvola",
+        "deskew": 5,
+        "deskew_step": 0.5,
+        "despeckle": True,
+        "crop": True,
+        "blank_ratio": 0.001,
+        "dpi": None,
+    },
+    # دقیق‌تر و کندتر: کجی تا ۱۰ درجه و بزرگ کردن تصویر تا ۳۰۰ DPI
+    "accurate": {
+        "binarize": "sauvola",
+        "deskew": 10,
+        "deskew_step": 0.25,
+        "despeckle": True,
+        "crop": True,
+        "blank_ratio": 0.0005,
+        "dpi": 300,
+    },
+}
+
+# پروفایل پیش‌فرض (off / fast / default / accurate)
+OCR_PREPROCESS = os.getenv("OCR_PREPROCESS", "default")
+
+# پارامترهای Sauvola
+SAUVOLA_K = 0.2
+SAUVOLA_R = 128.0
+
+# آمار محلی آستانه تطبیقی و تخمین کجی روی تصویر کوچک‌شده حساب می‌شوند
+_STATS_SCALE = 4
+_DESKEW_WIDTH = 800
+_DESKEW_MAX_POINTS = 50_000
+# زاویه‌ها چند تا چند تا امتحان می‌شوند تا آرایه (زاویه × نقطه) کوچک بماند
+_DESKEW_CHUNK = 8
+
+# بیشترین حافظه موقت پیش‌پردازش به ازای هر پیکسل صفحه ورودی و هر پیکسل تصویر
+# بزرگ‌شده (بایت)؛ اندازه‌گیری‌شده روی صفحه پرمتن ۲۰۰ و ۳۰۰ DPI با کمی حاشیه اطمینان
+# (ocr_engine.window_size آن را از بودجه حافظه کم می‌کند)
+_PEAK_BYTES_PER_PIXEL = 7
+_RESIZED_BYTES_PER_PIXEL = 2
+
+# سطر/ستونی که بیش از این نسبت سیاه باشد سایه لبه اسکنر است نه متن
+_BORDER_RATIO = 0.5
+# حداقل پیکسل جوهر یک سطر/ستون تا جزو محتوا حساب شود
+_MIN_LINE_INK = 3
+
+
+def get_profile(name: str):
+    if name not in PROFILES:
+        raise ValueError(f"unknown OCR preprocess profile: {name}")
+    return PROFILES[name]
+
+
+def peak_bytes(width: int, height: int, dpi: int, profile_name: str) -> int:
+    """
+    تخمین بیشترین حافظه موقتی که پیش‌پردازش یک صفحه width×height (به پیکسل) لازم دارد.
+    """
+    profile = get_profile(profile_name)
+    if profile is None:
+        return 0
+    pixels = width * height
+    total = pixels * _PEAK_BYTES_PER_PIXEL
+    if profile.get("dpi") and profile["dpi"] > dpi:
+        total += pixels * (profile["dpi"] / dpi) ** 2 * _RESIZED_BYTES_PER_PIXEL
+    return int(total)
+
+
+def to_gray(image: Image.Image) -> np.ndarray:
+    if image.mode != "L":
+        image = image.convert("L")
+    return np.asarray(image, dtype=np.uint8)
+
+
+def normalize_dpi(image: Image.Image, source_dpi: int, target_dpi: int) -> Image.Image:
+    """
+    تصویر را به DPI هدف تغییر اندازه می‌دهد (Tesseract با حدود ۳۰۰ DPI بهتر کار می‌کند).
+    آخر کار روی تصویر تمیزشده انجام می‌شود تا مراحل قبل روی تصویر کوچک‌تر اجرا شوند
+    و نقطه‌های نویز قبل از بزرگ شدن حذف شده باشند.
+    """
+    if not target_dpi or not source_dpi or target_dpi == source_dpi:
+        return image
+    scale = target_dpi / source_dpi
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return image.resize(size, Image.LANCZOS)
+
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    # هیستوگرام PIL؛ np.bincount ورودی را به int64 (۸ بایت برای هر پیکسل) تبدیل می‌کند
+    hist = np.asarray(Image.fromarray(gray).histogram(), dtype=np.float64)
+    omega = np.cumsum(hist) / gray.size
+    mu = np.cumsum(hist * np.arange(256)) / gray.size
+    with np.errstate(divide="ignore", invalid="ignore"):
+        between = (mu[-1] * omega - mu) ** 2 / (omega * (1 - omega))
+    between[~np.isfinite(between)] = 0
+    return int(np.argmax(between))
+
+
+def _box_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    میانگین پنجره window×window دور هر پیکسل با تصویر انتگرالی.
+    """
+    pad = window // 2
+    padded = np.pad(values, ((pad, window - 1 - pad), (pad, window - 1 - pad)), mode="edge")
+    integral = np.zeros((padded.shape[0] + 1, padded.shape[1] + 1))
+    integral[1:, 1:] = padded.cumsum(0).cumsum(1)
+    sums = (
+        integral[window:, window:] - integral[:-window, window:]
+        - integral[window:, :-window] + integral[:-window, :-window]
+    )
+    return sums / (window * window)
+
+
+def sauvola_threshold(gray: np.ndarray, dpi: int) -> np.ndarray:
+    """
+    نقشه آستانه Sauvola؛ روی تصویر کوچک‌شده حساب و به اندازه اصلی برگردانده می‌شود
+    (به صورت uint8 تا نقشه اندازه کامل فقط یک بایت برای هر پیکسل جا بگیرد).
+    """
+    height, width = gray.shape
+    small = Image.fromarray(gray).reduce(_STATS_SCALE)
+    values = np.asarray(small, dtype=np.float64)
+
+    # پنجره حدود ۳ میلی‌متر (چند برابر ارتفاع حرف)
+    window = max(3, int(dpi / 8 / _STATS_SCALE) | 1)
+    mean = _box_mean(values, window)
+    std = np.sqrt(np.maximum(_box_mean(values * values, window) - mean * mean, 0))
+    threshold = mean * (1 + SAUVOLA_K * (std / SAUVOLA_R - 1))
+
+    # gray < t برای عدد صحیح gray همان gray < ceil(t) است
+    threshold = Image.fromarray(np.clip(np.ceil(threshold), 0, 255).astype(np.uint8))
+    return np.asarray(threshold.resize((width, height), Image.BILINEAR))
+
+
+def binarize(gray: np.ndarray, method: str, dpi: int) -> np.ndarray:
+    """
+    آرایه bool که True یعنی جوهر (پیکسل تیره).
+    """
+    if method == "sauvola":
+        return gray < sauvola_threshold(gray, dpi)
+    return gray <= otsu_threshold(gray)
+
+
+def despeckle(ink: np.ndarray) -> np.ndarray:
+    """
+    نقطه‌های تنها (نویز اسکن) را حذف می‌کند: پیکسل جوهری که کمتر از ۲ همسایه
+    جوهری (از ۸ همسایه) دارد. با جابه‌جایی آرایه، بدون حلقه روی پیکسل‌ها.
+    """
+    padded = np.pad(ink, 1).astype(np.uint8)
+    height, width = ink.shape
+    neighbours = np.zeros(ink.shape, dtype=np.uint8)
+    for dy in (0, 1, 2):
+        for dx in (0, 1, 2):
+            if dy != 1 or dx != 1:
+                neighbours += padded[dy:dy + height, dx:dx + width]
+    return ink & (neighbours >= 2)
+
+
+def content_box(ink: np.ndarray, margin: int):
+    """
+    کادر محتوای صفحه (بدون نوارهای سیاه لبه اسکنر) یا None اگر جوهری نباشد.
+    اگر همه سطرها (یا ستون‌های) جوهری «لبه» باشند، مثل صفحه سفید روی سیاه یا
+    صفحه تمام سیاه، آن محور اصلاً بریده نمی‌شود.
+    """
+    height, width = ink.shape
+    rows = ink.sum(axis=1)
+    cols = ink.sum(axis=0)
+    # چند پیکسل پراکنده باقی‌مانده از نویز هنوز محتوا حساب نمی‌شود
+    row_ink = rows >= _MIN_LINE_INK
+    col_ink = cols >= _MIN_LINE_INK
+    if not row_ink.any() or not col_ink.any():
+        return None
+
+    row_ok = row_ink & (rows < _BORDER_RATIO * width)
+    col_ok = col_ink & (cols < _BORDER_RATIO * height)
+    if not row_ok.any() or not col_ok.any():
+        return 0, 0, width, height
+
+    top, bottom = np.flatnonzero(row_ok)[[0, -1]]
+    left, right = np.flatnonzero(col_ok)[[0, -1]]
+    return (
+        max(0, left - margin), max(0, top - margin),
+        min(width, right + margin + 1), min(height, bottom + margin + 1),
+    )
+
+
+def estimate_skew(ink: np.ndarray, max_angle: float, step: float) -> float:
+    """
+    زاویه کجی خطوط (درجه) با پروفایل افقی: به ازای هر زاویه، جوهر روی سطرهای
+    کج‌شده شمرده می‌شود و زاویه‌ای که تیزترین پروفایل را بدهد برنده است.
+    زاویه‌ها _DESKEW_CHUNK تا _DESKEW_CHUNK و برداری حساب می‌شوند.
+    """
+    factor = max(1, ink.shape[1] // _DESKEW_WIDTH)
+    small = ink[::factor, ::factor]
+    ys, xs = np.nonzero(small)
+    if len(ys) < 100:
+        return 0.0
+    if len(ys) > _DESKEW_MAX_POINTS:
+        pick = np.random.default_rng(0).choice(len(ys), _DESKEW_MAX_POINTS, replace=False)
+        ys, xs = ys[pick], xs[pick]
+
+    angles = np.arange(-max_angle, max_angle + step / 2, step)
+    scores = np.empty(len(angles))
+    for i in range(0, len(angles), _DESKEW_CHUNK):
+        chunk = angles[i:i + _DESKEW_CHUNK]
+        shifts = np.tan(np.radians(chunk))[:, None] * xs[None, :]
+        rows = np.rint(ys[None, :] - shifts).astype(np.int32)
+        # امتیاز به جابه‌جایی پروفایل بستگی ندارد؛ پس هر زاویه از صفر شروع می‌شود
+        rows -= rows.min(axis=1, keepdims=True)
+        span = int(rows.max()) + 1
+
+        rows += np.arange(len(chunk), dtype=np.int32)[:, None] * span
+        profiles = np.bincount(rows.ravel(), minlength=len(chunk) * span)
+        scores[i:i + len(chunk)] = (
+            profiles.reshape(len(chunk), span).astype(np.float64) ** 2
+        ).sum(axis=1)
+    return float(angles[int(np.argmax(scores))])
+
+
+def preprocess(image: Image.Image, profile, dpi: int):
+    """
+    تصویر آماده OCR و DPI آن را برمی‌گرداند؛ اگر صفحه سفید باشد (None, dpi).
+    """
+    if profile is None:
+        return image, dpi
+
+    gray = to_gray(image)
+    ink = binarize(gray, profile["binarize"], dpi)
+    if profile.get("despeckle"):
+        ink = despeckle(ink)
+
+    box = content_box(ink, margin=dpi // 10)
+    if box is None:
+        return None, dpi
+    left, top, right, bottom = box
+    if ink[top:bottom, left:right].mean() < profile["blank_ratio"]:
+        return None, dpi
+
+    if profile.get("crop"):
+        ink = ink[top:bottom, left:right]
+
+    # جوهر سیاه (0) روی زمینه سفید (255)، مستقیم به صورت uint8
+    result = Image.fromarray(np.uint8(255) * ~ink)
+
+    if profile.get("deskew"):
+        angle = estimate_skew(ink, profile["deskew"], profile.get("deskew_step", 0.5))
+        if abs(angle) >= 0.1:
+            # rotate مثبت یعنی پادساعتگرد؛ همان زاویه تخمینی کجی را برمی‌گرداند
+            result = result.rotate(
+                angle, resample=Image.BILINEAR, expand=True, fillcolor=255,
+            ).point(lambda v: 0 if v < 128 else 255)
+
+    if profile.get("dpi"):
+        result = normalize_dpi(result, dpi, profile["dpi"])
+        dpi = profile["dpi"]
+
+    return result, dpi
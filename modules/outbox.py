@@ -0,0 +1,49 @@
+import asyncio
+from collections import deque
+
+from modules.telegram_api import send_message
+
+
+class Outbox:
+    """
+    صف ارسال جواب‌های کوتاه webhook (منو، خطای دسترسی، راهنما...):
+    هندلر فقط پیام را در صف می‌گذارد و برمی‌گردد، پس اگر تلگرام با 429 بگوید
+    چند ثانیه صبر کن، این انتظار بیرون از درخواست webhook اتفاق می‌افتد.
+    پیام‌های هر چت به همان ترتیب فرستاده می‌شوند و چت‌های مختلف منتظر هم نمی‌مانند.
+    """
+
+    def __init__(self):
+        # {chat_id: deque([(text, reply_markup), ...])}
+        self._pending = {}
+        # {chat_id: Task} برای هر چتی که پیام در صف دارد یک task فرستنده
+        self._tasks = {}
+
+    def send(self, chat_id: int, text: str, reply_markup: dict = None):
+        self._pending.setdefault(chat_id, deque()).append((text, reply_markup))
+        if chat_id not in self._tasks:
+            self._tasks[chat_id] = asyncio.create_task(self._drain(chat_id))
+
+    async def _drain(self, chat_id: int):
+        queue = self._pending[chat_id]
+        try:
+            while queue:
+                text, reply_markup = queue.popleft()
+                await send_message(chat_id, text, reply_markup)
+        finally:
+            del self._pending[chat_id]
+            del self._tasks[chat_id]
+
+    def __len__(self):
+        return sum(len(queue) for queue in self._pending.values())
+
+    async def flush(self, timeout: float = 10):
+        """
+        تا timeout ثانیه منتظر می‌ماند پیام‌های در صف فرستاده شوند (موقع خاموش شدن).
+        """
+        tasks = list(self._tasks.values())
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+
+
+# صف مشترک جواب‌های همین پروسس
+outbox = Outbox()
@@ -1,81 +1,81 @@
-import os
-import requests
-from PyPDF2 import PdfReader
-from PyPDF2.errors import PdfReadError
-from docx import Document
+import asyncio
 
-BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-TELEGRAM_API = f"https://api.telegram.org/bot{BOT_TOKEN}"
+from modules.telegram_api import send_message
+from modules.delivery import deliver_document
+from modules.downloader import download, DownloadError
+from modules.extract import extract_pages, PdfTextError, PDF_TEXT_BACKEND
+from modules.docx_writer import build_docx
+from modules.cache import result_cache, content_hash
+from modules.metrics import set_mode, timed, count_error, pages_total
 
 
-def send_message(chat_id, text):
-    requests.post(f"{TELEGRAM_API}/sendMessage", json={
-        "chat_id": chat_id,
-        "text": text
-    })
+def word_cache_key(file_unique_id: str) -> str:
+    return result_cache.make_key(file_unique_id, "WORD", backend=PDF_TEXT_BACKEND)
 
 
-async def handle_pdf_to_word(chat_id: int, file_id: str):
+async def handle_pdf_to_word(chat_id: int, file_id: str, file_unique_id: str = None):
+    set_mode("WORD")
     try:
-        # 1) گرفتن لینک فایل از تلگرام
-        file_info = requests.get(
-            f"{TELEGRAM_API}/getFile",
-            params={"file_id": file_id}
-        ).json()
+        pdf_bytes = None
+        if not file_unique_id:
+            pdf_bytes = await download(file_id, "pdf")
+            file_unique_id = content_hash(pdf_bytes)
 
-        file_path = file_info["result"]["file_path"]
-        file_url = f"https://api.telegram.org/file/bot{BOT_TOKEN}/{file_path}"
+        # 0) اگر همین فایل قبلاً تبدیل شده، نتیجه را از کش می‌فرستیم
+        cache_key = word_cache_key(file_unique_id)
+        cached = await result_cache.aget(cache_key)
+        if cached is not None:
+            await deliver_document(chat_id, "converted.docx", cached)
+            return
+
+        await send_message(
+            chat_id,
+            "در حال تبدیل PDF به Word هستم، چند لحظه صبر کن... ⏳",
+        )
 
-        # 2) دانلود PDF
-        pdf_bytes = requests.get(file_url).content
-        pdf_filename = "input.pdf"
-        with open(pdf_filename, "wb") as f:
-            f.write(pdf_bytes)
+        # 1) دانلود PDF از تلگرام
+        if pdf_bytes is None:
+            pdf_bytes = await download(file_id, "pdf")
 
-        # 3) خواندن PDF
+        # 2) استخراج متن مستقیم از حافظه (در ترد/پروسس جدا تا event loop بلاک نشود)
         try:
-            reader = PdfReader(pdf_filename)
-        except PdfReadError:
-            send_message(
+            with timed("parse"):
+                pages = await extract_pages(pdf_bytes)
+        except PdfTextError as e:
+            count_error(e)
+            await send_message(
                 chat_id,
                 "نتونستم این PDF رو بخونم 😕\n"
                 "یا خراب شده، یا فرمتش عجیبه. لطفاً یک فایل دیگه امتحان کن."
             )
             return
 
-        full_text = ""
-        for page in reader.pages:
-            text = page.extract_text() or ""
-            full_text += text + "\n\n"
-
-        if not full_text.strip():
-            send_message(
+        if not any(text.strip() for text in pages):
+            await send_message(
                 chat_id,
                 "متنی داخل این PDF پیدا نکردم 😕\n"
                 "احتمالاً اسکن/عکس هست. می‌تونی از گزینه «تبدیل اسکن به متن» استفاده کنی."
             )
             return
 
-        # 4) ساخت Word
-        doc = Document()
-        for line in full_text.split("\n"):
-            if line.strip():
-                doc.add_paragraph(line)
+        pages_total.inc(len(pages), mode="WORD", method="text")
 
-        doc_filename = "converted.docx"
-        doc.save(doc_filename)
+        # 3) ساخت Word
+        with timed("docx_build"):
+            doc_bytes = await asyncio.to_thread(build_docx, pages)
 
-        # 5) ارسال Word به کاربر
-        with open(doc_filename, "rb") as f:
-            requests.post(
-                f"{TELEGRAM_API}/sendDocument",
-                data={"chat_id": chat_id},
-                files={"document": ("converted.docx", f)},
-            )
+        # 4) ارسال Word به کاربر
+        await deliver_document(chat_id, "converted.docx", doc_bytes)
+        await result_cache.aput(cache_key, doc_bytes)
+
+    except DownloadError as e:
+        count_error(e)
+        await send_message(chat_id, str(e))
 
     except Exception as e:
+        count_error(e)
         print("ERROR in handle_pdf_to_word:", e)
-        send_message(
+        await send_message(
             chat_id,
             "یه خطای غیرمنتظره پیش اومد 😔\n"
             "یه کم بعد دوباره امتحان کن یا یک PDF دیگه بفرست."
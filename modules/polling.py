@@ -0,0 +1,118 @@
+import os
+import asyncio
+from collections import deque
+
+from modules.telegram_api import get_updates, delete_webhook
+from modules.metrics import updates_total
+
+# روش دریافت آپدیت‌ها: "webhook" (پیش‌فرض) یا "polling" (getUpdates؛ پشت NAT و در staging)
+UPDATE_MODE = os.getenv("UPDATE_MODE", "webhook")
+
+# حداکثر آپدیت در هر getUpdates و مدت long polling (ثانیه؛ کمتر از TELEGRAM_TIMEOUT)
+POLLING_BATCH_SIZE = int(os.getenv("POLLING_BATCH_SIZE", "100"))
+POLLING_TIMEOUT = int(os.getenv("POLLING_TIMEOUT", "30"))
+
+# حداکثر چند چت هم‌زمان پردازش شوند
+POLLING_CONCURRENCY = int(os.getenv("POLLING_CONCURRENCY", "16"))
+
+# فاصله پایه و سقف صبر بعد از خطای getUpdates (ثانیه)
+POLLING_BACKOFF = float(os.getenv("POLLING_BACKOFF", "1"))
+POLLING_MAX_BACKOFF = float(os.getenv("POLLING_MAX_BACKOFF", "30"))
+
+# تعداد update_idهای اخیر که برای حذف تکراری‌ها نگه داشته می‌شوند
+_SEEN_SIZE = 10000
+
+OFFSET_KEY = "polling_offset"
+
+
+def update_chat_id(update: dict):
+    message = update.get("message") or update.get("edited_message") or {}
+    return (message.get("chat") or {}).get("id")
+
+
+class UpdatePoller:
+    """
+    آپدیت‌ها را دسته‌ای با getUpdates می‌گیرد و به همان مسیر webhook (handler) می‌دهد:
+    - update_id تکراری دوباره پردازش نمی‌شود
+    - آپدیت‌های یک چت به ترتیب و چت‌های مختلف هم‌زمان (حداکثر concurrency) اجرا می‌شوند
+    - offset بعد از پردازش هر دسته در storage ذخیره می‌شود تا بعد از ری‌استارت ادامه بدهد
+    """
+
+    def __init__(self, handler, storage, batch_size: int = POLLING_BATCH_SIZE,
+                 timeout: int = POLLING_TIMEOUT, concurrency: int = POLLING_CONCURRENCY):
+        self.handler = handler
+        self.storage = storage
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._seen = set()
+        self._seen_order = deque()
+        self._task = None
+
+    def _is_new(self, update_id: int) -> bool:
+        if update_id in self._seen:
+            return False
+        self._seen.add(update_id)
+        self._seen_order.append(update_id)
+        if len(self._seen_order) > _SEEN_SIZE:
+            self._seen.discard(self._seen_order.popleft())
+        return True
+
+    async def _run_chat(self, updates: list):
+        async with self._semaphore:
+            for update in updates:
+                try:
+                    await self.handler(update)
+                except Exception as e:
+                    print("ERROR in polling handler:", e)
+
+    async def dispatch(self, updates: list):
+        """
+        یک دسته آپدیت را پردازش می‌کند و offset بعدی را برمی‌گرداند.
+        """
+        chats = {}
+        for update in sorted(updates, key=lambda u: u["update_id"]):
+            if self._is_new(update["update_id"]):
+                chats.setdefault(update_chat_id(update), []).append(update)
+
+        updates_total.inc(sum(len(u) for u in chats.values()), source="polling")
+        await asyncio.gather(*(self._run_chat(u) for u in chats.values()))
+        return max(u["update_id"] for u in updates) + 1
+
+    async def run(self):
+        offset = await self.storage.get_value(OFFSET_KEY)
+        webhook_deleted = False
+        failures = 0
+
+        while True:
+            try:
+                if not webhook_deleted:
+                    await delete_webhook()
+                    webhook_deleted = True
+                updates = await get_updates(offset, self.batch_size, self.timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print("ERROR in UpdatePoller:", e)
+                failures += 1
+                await asyncio.sleep(min(POLLING_MAX_BACKOFF, POLLING_BACKOFF * 2 ** (failures - 1)))
+                continue
+
+            failures = 0
+            if not updates:
+                continue
+
+            offset = await self.dispatch(updates)
+            await self.storage.set_value(OFFSET_KEY, offset)
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
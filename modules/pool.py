@@ -0,0 +1,63 @@
+import os
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# تعداد پروسس‌های کارهای سنگین CPU مثل OCR و استخراج متن
+# (پیش‌فرض: تعداد هسته‌های CPU)
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "0")) or os.cpu_count() or 1
+
+_executor = None
+
+
+def _init_worker():
+    # هر صفحه در پروسس خودش پردازش می‌شود؛ اگر خود Tesseract هم چند ترد بگیرد
+    # هسته‌ها بیش از حد اشغال می‌شوند و مقیاس‌پذیری خطی از بین می‌رود.
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """
+    استخر پروسس مشترک؛ OCR و استخراج متن هر دو از همین استخر استفاده می‌کنند
+    تا روی هم بیشتر از تعداد هسته‌ها پروسس نسازند.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=OCR_WORKERS,
+            initializer=_init_worker,
+        )
+    return _executor
+
+
+def reset_executor(broken: ProcessPoolExecutor):
+    """
+    استخر شکسته را کنار می‌گذارد تا get_executor بعدی استخر تازه بسازد
+    (اگر کار دیگری زودتر عوضش کرده باشد، به استخر تازه دست نمی‌زند).
+    """
+    global _executor
+    if _executor is broken:
+        _executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_in_pool(func, *args):
+    """
+    func(*args) را در استخر اجرا می‌کند. اگر یکی از پروسس‌ها کشته شده باشد (مثلاً OOM)
+    کل استخر BrokenProcessPool می‌شود؛ آن وقت استخر از نو ساخته و کار یک بار دیگر امتحان می‌شود.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    try:
+        return await loop.run_in_executor(executor, func, *args)
+    except BrokenProcessPool as e:
+        print("ERROR in process pool:", e)
+        reset_executor(executor)
+        return await loop.run_in_executor(get_executor(), func, *args)
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,233 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+
+from modules.broker import JOB_BROKER
+from modules.downloader import fetch
+from modules.extract import PyPDF2Backend
+from modules.router import PDF_MIME, DOCX_MIME
+
+# هر فایلی که می‌رسد همان لحظه (قبل از مشخص شدن حالت و قبل از نوبتش در صف)
+# دانلود و سریع بررسی می‌شود. سقف حجم کل (مگابایت؛ 0 یعنی خاموش)،
+# مدت نگهداری (ثانیه) و حداکثر تعداد فایل‌های نگه‌داشته.
+# با JOB_BROKER کارها در پروسس‌های worker اجرا می‌شوند و این بایت‌ها را نمی‌بینند،
+# پس پیش‌فرض آنجا خاموش است.
+PREFETCH_MAX_MB = int(os.getenv("PREFETCH_MAX_MB", "0" if JOB_BROKER else "256"))
+PREFETCH_TTL = int(os.getenv("PREFETCH_TTL", "600"))
+PREFETCH_MAX_FILES = int(os.getenv("PREFETCH_MAX_FILES", "100"))
+
+# بررسی سریع فقط روی چند صفحه اول انجام می‌شود
+PREFETCH_SAMPLE_PAGES = 3
+
+# صفحه‌ای با کمتر از این تعداد کاراکتر لایه متنی حساب نمی‌شود (مثل HYBRID_TEXT_CHARS)
+PREFETCH_TEXT_CHARS = int(os.getenv("HYBRID_TEXT_CHARS", "200"))
+
+_KINDS = {PDF_MIME: "pdf", DOCX_MIME: "docx"}
+
+
+def preparse(content: bytes, mime: str) -> dict:
+    """
+    بررسی ارزان: تعداد صفحات PDF و اینکه لایه متنی دارد یا اسکن‌شده است.
+    """
+    if mime != PDF_MIME:
+        return {}
+    pages = PyPDF2Backend.page_count(content)
+    sample = min(pages, PREFETCH_SAMPLE_PAGES)
+    texts = PyPDF2Backend.pages(content, 0, sample)
+    text_pages = sum(1 for text in texts if len(text.strip()) >= PREFETCH_TEXT_CHARS)
+    return {"pages": pages, "has_text": bool(sample) and text_pages * 2 >= sample}
+
+
+class PrefetchEntry:
+    __slots__ = ("message", "chat_id", "file_id", "mime", "size", "task", "created", "refs")
+
+    def __init__(self, message: dict):
+        document = message["document"]
+        self.message = message
+        self.chat_id = message["chat"]["id"]
+        self.file_id = document["file_id"]
+        self.mime = document.get("mime_type", "")
+        self.size = document.get("file_size") or 0
+        self.task = None
+        self.created = time.monotonic()
+        # چند پیام (کار یا فایل منتظر) هنوز ممکن است این بایت‌ها را بخواهند
+        self.refs = 1
+
+
+class PrefetchBuffer:
+    """
+    فایل‌های پیش‌دریافت‌شده با سقف حجم/تعداد و انقضای زمانی (قدیمی‌ترها اول بیرون می‌روند).
+    برای هر چت آخرین فایلی که بدون حالت رسیده نگه داشته می‌شود تا انتخاب بعدی
+    از منو همان را پردازش کند و کاربر لازم نباشد فایل را دوباره بفرستد.
+    بایت‌ها با اولین take (دانلود واقعی کار) یا پایان کاری که دانلود نکرد از بافر بیرون می‌روند.
+    """
+
+    def __init__(self, max_mb: int = PREFETCH_MAX_MB, ttl: float = PREFETCH_TTL,
+                 max_files: int = PREFETCH_MAX_FILES):
+        self.max_bytes = max_mb * 1024 * 1024
+        self.ttl = ttl
+        self.max_files = max_files
+        # {file_id: PrefetchEntry} به ترتیب رسیدن
+        self._entries = OrderedDict()
+        # {chat_id: PrefetchEntry} فایلی که منتظر انتخاب حالت است
+        self._waiting = {}
+
+    def _expired(self, entry: PrefetchEntry) -> bool:
+        return time.monotonic() - entry.created > self.ttl
+
+    def _drop(self, file_id: str):
+        entry = self._entries.pop(file_id)
+        if entry.task is not None and not entry.task.done():
+            entry.task.cancel()
+
+    def _evict_waiting(self):
+        for chat_id, entry in list(self._waiting.items()):
+            if self._expired(entry):
+                del self._waiting[chat_id]
+                self.discard(entry.file_id)
+        # قدیمی‌ترین‌ها اول (دیکشنری به ترتیب hold است)
+        while len(self._waiting) > self.max_files:
+            entry = self._waiting.pop(next(iter(self._waiting)))
+            self.discard(entry.file_id)
+
+    def _evict(self):
+        for file_id, entry in list(self._entries.items()):
+            if self._expired(entry):
+                self._drop(file_id)
+        self._evict_waiting()
+
+        total = sum(entry.size for entry in self._entries.values())
+        while self._entries and (len(self._entries) > self.max_files or total > self.max_bytes):
+            file_id = next(iter(self._entries))
+            total -= self._entries[file_id].size
+            self._drop(file_id)
+
+    def start(self, message: dict, fetch: bool = True):
+        """
+        دانلود و بررسی سریع فایل پیام را در پس‌زمینه شروع می‌کند؛
+        برای نوع فایل‌های پشتیبانی‌نشده None برمی‌گرداند.
+        با fetch=False (مثلاً کاربر بدون اعتبار) فقط مشخصات فایل برمی‌گردد.
+        """
+        document = message["document"]
+        if document.get("mime_type", "") not in _KINDS:
+            return None
+        if document["file_id"] in self._entries:
+            self._entries.move_to_end(document["file_id"])
+            entry = self._entries[document["file_id"]]
+            entry.refs += 1
+            return entry
+
+        entry = PrefetchEntry(message)
+        # اگر خاموش باشد یا فایل از کل بودجه بزرگ‌تر باشد، فقط مشخصات فایل نگه داشته می‌شود
+        if fetch and self.max_bytes and entry.size <= self.max_bytes:
+            entry.task = asyncio.create_task(self._fetch(entry))
+            self._entries[entry.file_id] = entry
+            self._evict()
+        return entry
+
+    def lookup(self, message: dict) -> PrefetchEntry:
+        """
+        ورودی فایل پیامی که start قبلاً برایش صدا زده شده، بدون شروع دانلود و بدون شمردن دوباره.
+        """
+        entry = self._entries.get(message["document"]["file_id"])
+        return entry if entry is not None else PrefetchEntry(message)
+
+    async def _fetch(self, entry: PrefetchEntry):
+        try:
+            content = await fetch(entry.file_id, _KINDS[entry.mime])
+            info = await asyncio.to_thread(preparse, content, entry.mime)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # خطا را همان هندلر اصلی موقع دانلود دوباره می‌گیرد و به کاربر می‌گوید
+            print("ERROR in prefetch:", e)
+            return None, {}
+        entry.size = len(content)
+        return content, info
+
+    async def _result(self, entry: PrefetchEntry, timeout: float = None):
+        try:
+            return await asyncio.wait_for(asyncio.shield(entry.task), timeout)
+        except asyncio.TimeoutError:
+            return None, {}
+        except asyncio.CancelledError:
+            # فقط اگر خود پیش‌دریافت لغو شده باشد (بیرون رفتن از بافر)؛ لغو کار صدازننده را رد نمی‌کنیم
+            if entry.task.cancelled():
+                return None, {}
+            raise
+
+    async def take(self, file_id: str):
+        """
+        بایت‌های فایل اگر پیش‌دریافت شده (یا در حال دانلود) باشد، وگرنه None.
+        فایل همین‌جا از بافر بیرون می‌رود تا جا برای فایل‌های بعدی باز شود.
+        """
+        entry = self._entries.pop(file_id, None)
+        if entry is None or self._expired(entry):
+            return None
+        content, _ = await self._result(entry)
+        return content
+
+    async def info(self, entry: PrefetchEntry, timeout: float) -> dict:
+        """
+        نتیجه بررسی سریع اگر تا timeout ثانیه آماده شود.
+        """
+        if entry.task is None:
+            return {}
+        _, info = await self._result(entry, timeout)
+        return info
+
+    def discard(self, *file_ids):
+        """
+        پیش‌دریافت فایل‌هایی که کارشان بدون دانلود تمام شد (مثلاً نتیجه از کش آمد)
+        یا اصلاً به صف نرسید را، اگر پیام دیگری منتظرش نباشد، از بافر بیرون می‌برد.
+        """
+        for file_id in file_ids:
+            entry = self._entries.get(file_id)
+            if entry is None:
+                continue
+            entry.refs -= 1
+            if entry.refs <= 0:
+                self._drop(file_id)
+
+    def releasing(self, handler, file_ids):
+        """
+        هندلر را طوری می‌پیچد که بعد از پایان کار، پیش‌دریافتِ برداشته‌نشده فایل‌هایش آزاد شود.
+        __name__ همان هندلر می‌ماند تا broker کار را با همین اسم ثبت کند.
+        """
+        async def job(*args):
+            try:
+                return await handler(*args)
+            finally:
+                self.discard(*file_ids)
+
+        job.__name__ = handler.__name__
+        return job
+
+    def close(self):
+        for file_id in list(self._entries):
+            self._drop(file_id)
+        self._waiting.clear()
+
+    def hold(self, chat_id: int, entry: PrefetchEntry):
+        # فایل قبلی همین چت دیگر پردازش نمی‌شود
+        previous = self._waiting.pop(chat_id, None)
+        if previous is not None and previous is not entry:
+            self.discard(previous.file_id)
+        self._waiting[chat_id] = entry
+        # انقضا و سقف همین‌جا هم اعمال می‌شود؛ وقتی پیش‌دریافت خاموش است
+        # (مثل حالت JOB_BROKER) _evict هیچ‌وقت صدا زده نمی‌شود
+        self._evict_waiting()
+
+    def is_waiting(self, chat_id: int, entry: PrefetchEntry) -> bool:
+        return self._waiting.get(chat_id) is entry and not self._expired(entry)
+
+    def take_waiting(self, chat_id: int):
+        entry = self._waiting.pop(chat_id, None)
+        if entry is None or self._expired(entry):
+            return None
+        return entry
+
+
+# بافر مشترک پروسس وب
+prefetch_buffer = PrefetchBuffer()
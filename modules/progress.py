@@ -0,0 +1,135 @@
+import io
+import os
+import time
+import asyncio
+
+from modules.telegram_api import send_message, send_document, edit_message_text
+from modules.docx_writer import DocxStreamWriter
+
+# حداقل فاصله (ثانیه) بین دو ویرایش پیام وضعیت؛
+# تلگرام برای هر چت حدود یک پیام در ثانیه اجازه می‌دهد
+PROGRESS_MIN_INTERVAL = float(os.getenv("PROGRESS_MIN_INTERVAL", "3"))
+
+# اگر بیشتر از صفر باشد، بعد از هر این تعداد صفحه یک فایل Word جزئی
+# (فقط همان صفحات) فرستاده می‌شود؛ فایل کامل در آخر جداگانه می‌آید
+PARTIAL_RESULT_PAGES = int(os.getenv("PARTIAL_RESULT_PAGES", "0"))
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds} ثانیه"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes} دقیقه و {seconds} ثانیه"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours} ساعت و {minutes} دقیقه"
+
+
+class ProgressMessage:
+    """
+    یک پیام وضعیت که با editMessageText به‌روز می‌شود
+    (تعداد صفحات انجام‌شده، سرعت و زمان باقی‌مانده).
+    ویرایش‌ها حداکثر هر min_interval ثانیه یک بار فرستاده می‌شوند.
+    """
+
+    def __init__(self, chat_id: int, total: int, title: str,
+                 min_interval: float = PROGRESS_MIN_INTERVAL, unit: str = "صفحه"):
+        self.chat_id = chat_id
+        self.total = total
+        self.title = title
+        self.unit = unit
+        self.min_interval = min_interval
+        self.done = 0
+        self.message_id = None
+        self._started = time.monotonic()
+        self._last_edit = 0.0
+        self._last_text = None
+
+    def render(self) -> str:
+        lines = [self.title]
+        percent = self.done * 100 // self.total if self.total else 0
+        lines.append(f"{self.unit} {self.done} از {self.total} ({percent}٪)")
+
+        elapsed = time.monotonic() - self._started
+        if self.done and elapsed > 0:
+            rate = self.done / elapsed
+            lines.append(f"سرعت: {rate:.1f} {self.unit} در ثانیه")
+            if self.done < self.total:
+                eta = (self.total - self.done) / rate
+                lines.append(f"زمان باقی‌مانده: حدود {format_duration(eta)}")
+        return "\n".join(lines)
+
+    async def start(self):
+        self._started = time.monotonic()
+        self._last_text = self.render()
+        result = await send_message(self.chat_id, self._last_text)
+        self._last_edit = time.monotonic()
+        if result:
+            self.message_id = result.get("message_id")
+
+    async def update(self, done: int, force: bool = False):
+        self.done = done
+        now = time.monotonic()
+        if not force and now - self._last_edit < self.min_interval:
+            return
+        await self._edit(self.render())
+
+    async def finish(self, text: str = None):
+        if text is None:
+            elapsed = format_duration(time.monotonic() - self._started)
+            text = f"✅ {self.done} {self.unit} در {elapsed} انجام شد."
+        await self._edit(text)
+
+    async def _edit(self, text: str):
+        if self.message_id is None or text == self._last_text:
+            return
+        self._last_text = text
+        self._last_edit = time.monotonic()
+        await edit_message_text(self.chat_id, self.message_id, text)
+
+
+def _pages_docx(pages) -> bytes:
+    # شماره صفحات لزوماً پشت سر هم نیستند (مثلاً در حالت ترکیبی)
+    buffer = io.BytesIO()
+    with DocxStreamWriter(buffer) as writer:
+        for number, text in pages:
+            writer.add_page(number, text)
+    return buffer.getvalue()
+
+
+class PartialResults:
+    """
+    صفحات آماده را جمع می‌کند و هر every صفحه
+    یک فایل Word از همان صفحات برای کاربر می‌فرستد.
+    اگر کل کار از every صفحه کمتر باشد چیزی جدا فرستاده نمی‌شود.
+    """
+
+    def __init__(self, chat_id: int, prefix: str, total: int,
+                 every: int = PARTIAL_RESULT_PAGES):
+        self.chat_id = chat_id
+        self.prefix = prefix
+        self.every = every if total > every else 0
+        self._pages = []
+
+    async def add(self, number: int, text: str):
+        if self.every <= 0:
+            return
+        self._pages.append((number, text))
+        if len(self._pages) >= self.every:
+            await self.flush()
+
+    async def flush(self):
+        pages, self._pages = self._pages, []
+        if not any(text.strip() for _, text in pages):
+            return
+
+        first, last = pages[0][0], pages[-1][0]
+        doc_bytes = await asyncio.to_thread(_pages_docx, pages)
+        try:
+            await send_document(
+                self.chat_id, f"{self.prefix}_pages_{first}-{last}.docx", doc_bytes
+            )
+        except Exception as e:
+            # فایل جزئی نباید کل کار را خراب کند؛ فایل کامل در آخر می‌آید
+            print("ERROR in PartialResults.flush:", e)
@@ -0,0 +1,67 @@
+import os
+import time
+import threading
+
+# هر کاربر به طور متوسط چند کار در دقیقه می‌تواند ثبت کند و چند تا پشت سر هم
+JOB_RATE_PER_MINUTE = float(os.getenv("JOB_RATE_PER_MINUTE", "6"))
+JOB_RATE_BURST = int(os.getenv("JOB_RATE_BURST", "3"))
+
+# وقتی تعداد سطل‌ها از این بیشتر شد، سطل‌های پرشده پاک می‌شوند
+RATE_LIMIT_MAX_BUCKETS = 10000
+
+
+class RateLimiter:
+    """
+    محدودیت نرخ با token bucket برای هر کاربر:
+    سطل هر کاربر حداکثر burst توکن دارد و با سرعت rate_per_minute پر می‌شود؛
+    هر کار یک توکن برمی‌دارد.
+    """
+
+    def __init__(self, rate_per_minute: float = JOB_RATE_PER_MINUTE,
+                 burst: int = JOB_RATE_BURST, clock=time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(1, burst)
+        self.clock = clock
+        self._lock = threading.Lock()
+        # {user_id: (tokens, updated_at)}
+        self._buckets = {}
+
+    def take(self, user_id: int, tokens: float = 1.0) -> float:
+        """
+        اگر توکن کافی باشد برمی‌دارد و 0 برمی‌گرداند؛
+        وگرنه چیزی برنمی‌دارد و تعداد ثانیه‌هایی که باید صبر کرد را برمی‌گرداند.
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        if len(self._buckets) > RATE_LIMIT_MAX_BUCKETS:
+            self.prune()
+
+        now = self.clock()
+        with self._lock:
+            available, updated = self._buckets.get(user_id, (self.burst, now))
+            available = min(self.burst, available + (now - updated) * self.rate)
+
+            if available >= tokens:
+                self._buckets[user_id] = (available - tokens, now)
+                return 0.0
+
+            self._buckets[user_id] = (available, now)
+            return (tokens - available) / self.rate
+
+    def refund(self, user_id: int, tokens: float = 1.0):
+        with self._lock:
+            if user_id in self._buckets:
+                available, updated = self._buckets[user_id]
+                self._buckets[user_id] = (min(self.burst, available + tokens), updated)
+
+    def prune(self):
+        """
+        سطل‌هایی که دوباره پر شده‌اند فرقی با سطل تازه ندارند و حذف می‌شوند.
+        """
+        now = self.clock()
+        full_after = self.burst / self.rate if self.rate > 0 else 0
+        with self._lock:
+            for user_id, (_, updated) in list(self._buckets.items()):
+                if now - updated >= full_after:
+                    del self._buckets[user_id]
@@ -0,0 +1,191 @@
+PDF_MIME = "application/pdf"
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# مسیریابی آپدیت‌ها با جدول (دیکشنری) به جای زنجیره if:
+# - دستورها ("/start"، "/credit" ...) با اولین کلمه متن
+# - دکمه‌های منو با متن دکمه
+# - کارها با (حالت، mime) و برای پیام متنی (حالت، None)
+# هر آپدیت با چند جستجوی O(1) به هندلرش می‌رسد، هر چقدر هم حالت اضافه شود.
+
+_UNSET = object()
+
+
+class UpdateContext:
+    """
+    فیلدهای پرکاربرد یک پیام تلگرام؛ یک بار استخراج و بین هندلرها دست‌به‌دست می‌شود.
+    """
+
+    __slots__ = (
+        "message", "chat_id", "user_id", "text", "document", "media_group_id", "mode",
+    )
+
+    def __init__(self, message: dict):
+        self.message = message
+        self.chat_id = message["chat"]["id"]
+        self.user_id = (message.get("from") or {}).get("id", self.chat_id)
+        self.text = message.get("text")
+        self.document = message.get("document")
+        self.media_group_id = message.get("media_group_id")
+        # حالت کاربر فقط وقتی لازم شد از storage خوانده می‌شود
+        self.mode = _UNSET
+
+    @property
+    def command(self):
+        """
+        "/credit@MyBot 1 2" -> "/credit"؛ برای متن‌های غیر دستوری None.
+        """
+        if not self.text or not self.text.startswith("/"):
+            return None
+        return self.text.split(maxsplit=1)[0].split("@", 1)[0]
+
+    @property
+    def mime(self) -> str:
+        return self.document.get("mime_type", "") if self.document else ""
+
+    @property
+    def file_size(self) -> int:
+        return (self.document.get("file_size") or 0) if self.document else 0
+
+
+class MenuItem:
+    __slots__ = ("label", "mode", "reply", "row")
+
+    def __init__(self, label: str, mode: str, reply: str, row: int):
+        self.label = label
+        self.mode = mode
+        self.reply = reply
+        self.row = row
+
+
+class Router:
+    """
+    رجیستری مسیرها. هندلرهای عمومی (بررسی دسترسی و صف، انتخاب حالت، جواب پیش‌فرض)
+    یک بار با on_job / on_menu / on_text ثبت می‌شوند و بین همه مسیرها مشترک‌اند.
+    """
+
+    def __init__(self, get_mode):
+        self.get_mode = get_mode
+        # {"/start": handler(ctx)}
+        self.commands = {}
+        # {label: MenuItem}
+        self.menu = {}
+        # {(mode, mime یا None): هندلر کار}
+        self.jobs = {}
+        # {mime: handler(ctx)}؛ کلید None برای بقیه نوع فایل‌ها
+        self.fallbacks = {}
+        # handler(ctx) -> True اگر فایل را خودش گرفت (مثلاً سقف حجم یا حالت دسته‌ای)
+        self.document_filters = []
+        self.job_runner = None
+        self.menu_handler = None
+        self.text_handler = None
+
+    # ---------- ثبت ----------
+
+    def command(self, name: str):
+        def register(handler):
+            self.commands[name] = handler
+            return handler
+        return register
+
+    def menu_item(self, label: str, mode: str, reply: str, row: int):
+        self.menu[label] = MenuItem(label, mode, reply, row)
+
+    def job(self, mode: str, mime, handler):
+        self.jobs[(mode, mime)] = handler
+
+    def fallback(self, mime=None):
+        def register(handler):
+            self.fallbacks[mime] = handler
+            return handler
+        return register
+
+    def document_filter(self, handler):
+        self.document_filters.append(handler)
+        return handler
+
+    def on_job(self, handler):
+        self.job_runner = handler
+        return handler
+
+    def on_menu(self, handler):
+        self.menu_handler = handler
+        return handler
+
+    def on_text(self, handler):
+        self.text_handler = handler
+        return handler
+
+    def keyboard(self) -> dict:
+        rows = {}
+        for item in self.menu.values():
+            rows.setdefault(item.row, []).append({"text": item.label})
+        return {
+            "keyboard": [rows[row] for row in sorted(rows)],
+            "resize_keyboard": True,
+        }
+
+    # ---------- مسیریابی ----------
+
+    async def load_mode(self, ctx: UpdateContext):
+        # get_mode async است (storage)؛ resolve_mode فقط ctx.mode بارشده را می‌خواند
+        if ctx.mode is _UNSET:
+            ctx.mode = await self.get_mode(ctx.chat_id)
+        return ctx.mode
+
+    def resolve_text(self, ctx: UpdateContext):
+        """
+        دستورها و دکمه‌های منو (بدون نیاز به حالت کاربر).
+        """
+        if ctx.text is None:
+            return None, ()
+        handler = self.commands.get(ctx.command)
+        if handler is not None:
+            return handler, (ctx,)
+        item = self.menu.get(ctx.text)
+        if item is not None:
+            return self.menu_handler, (ctx, item)
+        return None, ()
+
+    def resolve_mode(self, ctx: UpdateContext):
+        """
+        فایل‌ها و متن‌ها بر اساس حالت کاربر (ctx.mode باید قبلاً با load_mode بار شده باشد).
+        """
+        mode = ctx.mode
+
+        if ctx.document is not None:
+            mime = ctx.mime
+            handler = self.jobs.get((mode, mime))
+            if handler is not None:
+                document = ctx.document
+                return self.job_runner, (
+                    ctx, handler, document["file_id"], document.get("file_unique_id"),
+                )
+            fallback = self.fallbacks.get(mime) or self.fallbacks.get(None)
+            return fallback, (ctx,)
+
+        if ctx.text and not ctx.text.startswith("/"):
+            handler = self.jobs.get((mode, None))
+            if handler is not None:
+                return self.job_runner, (ctx, handler, ctx.text)
+
+        if ctx.text:
+            return self.text_handler, (ctx,)
+        return None, ()
+
+    def resolve(self, ctx: UpdateContext):
+        handler, args = self.resolve_text(ctx)
+        if handler is None:
+            handler, args = self.resolve_mode(ctx)
+        return handler, args
+
+    async def dispatch(self, ctx: UpdateContext):
+        handler, args = self.resolve_text(ctx)
+        if handler is None:
+            await self.load_mode(ctx)
+            if ctx.document is not None:
+                for check in self.document_filters:
+                    if await check(ctx):
+                        return
+            handler, args = self.resolve_mode(ctx)
+        if handler is not None:
+            await handler(*args)
@@ -0,0 +1,322 @@
+import os
+import json
+import asyncio
+import sqlite3
+import threading
+
+# "memory" (فقط داخل همین پروسس) یا "sqlite" (مشترک بین workerها و ماندگار بعد از ری‌استارت)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "memory")
+STORAGE_PATH = os.getenv("STORAGE_PATH", "bot.db")
+
+
+def _default_access() -> dict:
+    return {"free_used": False, "paid_remaining": 0}
+
+
+class MemoryStorage:
+    """
+    حالت کاربر و اعتبارها در دیکشنری‌های همین پروسس.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # {chat_id: "WORD" | "SUMMARY_PDF" | ... | None}
+        self._state = {}
+        # {user_id: {"free_used": bool, "paid_remaining": int}}
+        self._access = {}
+        # مقدارهای داخلی ربات، مثل offset آپدیت‌ها در حالت polling
+        self._meta = {}
+
+    def get_state(self, chat_id: int):
+        return self._state.get(chat_id)
+
+    def set_state(self, chat_id: int, mode):
+        self.set_states({chat_id: mode})
+
+    def set_states(self, states: dict):
+        with self._lock:
+            self._state.update(states)
+
+    def get_access(self, user_id: int) -> dict:
+        return dict(self._access.get(user_id) or _default_access())
+
+    def add_credit(self, user_id: int, count: int):
+        with self._lock:
+            info = self._access.setdefault(user_id, _default_access())
+            info["paid_remaining"] += count
+            info["free_used"] = True  # یعنی رایگانش را مصرف شده فرض می‌کنیم
+
+    def consume_credit(self, user_id: int):
+        """
+        بررسی و کم کردن اعتبار در یک قدم اتمی.
+        برمی‌گرداند: 'FREE' | 'PAID' | None
+        """
+        with self._lock:
+            info = self._access.setdefault(user_id, _default_access())
+
+            if not info["free_used"]:
+                info["free_used"] = True
+                return "FREE"
+
+            if info["paid_remaining"] > 0:
+                info["paid_remaining"] -= 1
+                return "PAID"
+
+            return None
+
+    def refund_credit(self, user_id: int, source: str):
+        with self._lock:
+            info = self._access.setdefault(user_id, _default_access())
+            if source == "FREE":
+                info["free_used"] = False
+            elif source == "PAID":
+                info["paid_remaining"] += 1
+
+    def get_value(self, key: str, default=None):
+        return self._meta.get(key, default)
+
+    def set_value(self, key: str, value):
+        with self._lock:
+            self._meta[key] = value
+
+    def close(self):
+        pass
+
+
+class SQLiteStorage:
+    """
+    همان رابط MemoryStorage روی SQLite در حالت WAL؛
+    چند پروسس uvicorn می‌توانند هم‌زمان از یک فایل استفاده کنند.
+    """
+
+    def __init__(self, path: str = STORAGE_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path,
+            timeout=10,
+            isolation_level=None,  # تراکنش‌ها را خودمان با BEGIN شروع می‌کنیم
+            check_same_thread=False,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS user_state (
+                chat_id INTEGER PRIMARY KEY,
+                mode TEXT
+            );
+            CREATE TABLE IF NOT EXISTS user_access (
+                user_id INTEGER PRIMARY KEY,
+                free_used INTEGER NOT NULL DEFAULT 0,
+                paid_remaining INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS bot_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            """
+        )
+
+    def _write(self, sql: str, params: tuple):
+        with self._lock:
+            self._conn.execute(sql, params)
+
+    def _write_many(self, sql: str, rows):
+        # همه ردیف‌ها در یک تراکنش (و یک fsync) نوشته می‌شوند
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(sql, rows)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def get_state(self, chat_id: int):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT mode FROM user_state WHERE chat_id = ?", (chat_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, chat_id: int, mode):
+        self.set_states({chat_id: mode})
+
+    def set_states(self, states: dict):
+        self._write_many(
+            "INSERT INTO user_state (chat_id, mode) VALUES (?, ?) "
+            "ON CONFLICT(chat_id) DO UPDATE SET mode = excluded.mode",
+            list(states.items()),
+        )
+
+    def get_access(self, user_id: int) -> dict:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT free_used, paid_remaining FROM user_access WHERE user_id = ?",
+                (user_id,),
+            ).fetchone()
+        if not row:
+            return _default_access()
+        return {"free_used": bool(row[0]), "paid_remaining": row[1]}
+
+    def add_credit(self, user_id: int, count: int):
+        self._write(
+            "INSERT INTO user_access (user_id, free_used, paid_remaining) VALUES (?, 1, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET "
+            "free_used = 1, paid_remaining = paid_remaining + excluded.paid_remaining",
+            (user_id, count),
+        )
+
+    def consume_credit(self, user_id: int):
+        """
+        بررسی و کم کردن اعتبار در یک تراکنش IMMEDIATE؛
+        دو درخواست هم‌زمان (حتی از دو پروسس) نمی‌توانند یک اعتبار را دو بار خرج کنند.
+        """
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT free_used, paid_remaining FROM user_access WHERE user_id = ?",
+                    (user_id,),
+                ).fetchone()
+
+                source = None
+                if not row or not row[0]:
+                    conn.execute(
+                        "INSERT INTO user_access (user_id, free_used) VALUES (?, 1) "
+                        "ON CONFLICT(user_id) DO UPDATE SET free_used = 1",
+                        (user_id,),
+                    )
+                    source = "FREE"
+                elif row[1] > 0:
+                    conn.execute(
+                        "UPDATE user_access SET paid_remaining = paid_remaining - 1 "
+                        "WHERE user_id = ?",
+                        (user_id,),
+                    )
+                    source = "PAID"
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        return source
+
+    def refund_credit(self, user_id: int, source: str):
+        if source == "FREE":
+            sql = "UPDATE user_access SET free_used = 0 WHERE user_id = ?"
+        elif source == "PAID":
+            sql = "UPDATE user_access SET paid_remaining = paid_remaining + 1 WHERE user_id = ?"
+        else:
+            return
+        self._write(sql, (user_id,))
+
+    def get_value(self, key: str, default=None):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM bot_meta WHERE key = ?", (key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_value(self, key: str, value):
+        self._write(
+            "INSERT INTO bot_meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, json.dumps(value)),
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class AsyncStorage:
+    """
+    رابط async برای کد event loop (webhook، polling، هندلرها).
+    فراخوانی‌های SQLite در ترد جدا اجرا می‌شوند تا انتظار برای قفل فایل
+    (BEGIN IMMEDIATE با timeout=10 در consume_credit) کل سرور را متوقف نکند؛
+    MemoryStorage مستقیم صدا زده می‌شود چون چیزی برای انتظار ندارد.
+    set_stateهایی که هم‌زمان می‌رسند (مثلاً یک دسته getUpdates از چند چت)
+    با هم و در یک تراکنش set_states نوشته می‌شوند.
+    """
+
+    def __init__(self, storage):
+        self.sync = storage
+        self._threaded = isinstance(storage, SQLiteStorage)
+        # {chat_id: mode} منتظر نوشتن، و Future ای که بعد از نوشتنشان کامل می‌شود
+        self._states = {}
+        self._states_written = None
+        # دسته‌ای که الان در ترد نوشته می‌شود
+        self._writing = {}
+        self._writer = None
+
+    async def _run(self, method, *args):
+        if self._threaded:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def get_state(self, chat_id: int):
+        # حالتی که هنوز نوشته نشده از همین‌جا خوانده می‌شود
+        for pending in (self._states, self._writing):
+            if chat_id in pending:
+                return pending[chat_id]
+        return await self._run(self.sync.get_state, chat_id)
+
+    async def set_state(self, chat_id: int, mode):
+        """
+        بعد از ثبت شدن در storage برمی‌گردد؛ ولی اگر نوشتن دسته قبلی در جریان باشد
+        به دسته بعدی اضافه می‌شود به جای اینکه تراکنش خودش را بگیرد.
+        """
+        if not self._threaded:
+            self.sync.set_state(chat_id, mode)
+            return
+        self._states[chat_id] = mode
+        if self._states_written is None:
+            self._states_written = asyncio.get_running_loop().create_future()
+        written = self._states_written
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._write_states())
+        # لغو شدن یک هندلر نباید نوشتن دسته را برای بقیه لغو کند
+        await asyncio.shield(written)
+
+    async def _write_states(self):
+        while self._states:
+            self._writing, self._states = self._states, {}
+            written, self._states_written = self._states_written, None
+            try:
+                await asyncio.to_thread(self.sync.set_states, self._writing)
+            except Exception as e:
+                written.set_exception(e)
+            else:
+                written.set_result(None)
+            finally:
+                self._writing = {}
+
+    async def get_access(self, user_id: int) -> dict:
+        return await self._run(self.sync.get_access, user_id)
+
+    async def add_credit(self, user_id: int, count: int):
+        await self._run(self.sync.add_credit, user_id, count)
+
+    async def consume_credit(self, user_id: int):
+        return await self._run(self.sync.consume_credit, user_id)
+
+    async def refund_credit(self, user_id: int, source: str):
+        await self._run(self.sync.refund_credit, user_id, source)
+
+    async def get_value(self, key: str, default=None):
+        return await self._run(self.sync.get_value, key, default)
+
+    async def set_value(self, key: str, value):
+        await self._run(self.sync.set_value, key, value)
+
+    def close(self):
+        self.sync.close()
+
+
+def create_storage(backend: str = STORAGE_BACKEND):
+    if backend == "sqlite":
+        return SQLiteStorage()
+    if backend == "memory":
+        return MemoryStorage()
+    raise ValueError(f"unknown STORAGE_BACKEND: {backend}")
@@ -0,0 +1,206 @@
+import os
+import re
+import math
+from collections import Counter
+
+import numpy as np
+
+# خلاصه‌ساز استخراجی (بدون مدل و بدون شبکه):
+# جمله‌ها با TF-IDF برداری می‌شوند و با TextRank (یا شباهت به مرکز متن)
+# امتیاز می‌گیرند؛ جمله‌های برتر به ترتیب اصلی متن کنار هم گذاشته می‌شوند.
+
+# روش امتیازدهی: "textrank" (پیش‌فرض) یا "tfidf" (شباهت به مرکز متن؛ سریع‌تر)
+SUMMARY_METHOD = os.getenv("SUMMARY_METHOD", "textrank")
+
+# طول خلاصه: حداکثر تعداد جمله و حداکثر کاراکتر (پیام تلگرام حداکثر 4096 کاراکتر است)
+SUMMARY_SENTENCES = int(os.getenv("SUMMARY_SENTENCES", "8"))
+SUMMARY_MAX_CHARS = int(os.getenv("SUMMARY_MAX_CHARS", "3500"))
+
+# متن‌های بلندتر از این تعداد جمله تکه‌تکه خلاصه می‌شوند (map-reduce)؛
+# ماتریس شباهت فقط داخل هر تکه ساخته می‌شود، پس زمان تقریباً خطی می‌ماند
+SUMMARY_CHUNK_SENTENCES = int(os.getenv("SUMMARY_CHUNK_SENTENCES", "400"))
+
+# جمله‌های کوتاه‌تر از این تعداد کلمه (تیتر، شماره صفحه، ...) کاندید نمی‌شوند
+SUMMARY_MIN_WORDS = 4
+
+_ARABIC_TO_PERSIAN = str.maketrans({
+    "\u064a": "\u06cc",  # ي -> ی
+    "\u0649": "\u06cc",  # ى -> ی
+    "\u0643": "\u06a9",  # ك -> ک
+    "\u0629": "\u0647",  # ة -> ه
+})
+# اعراب و کشیده
+_DIACRITICS = re.compile("[\u064b-\u065f\u0670\u0640]")
+
+# پایان جمله: . ! ? ؟ … و نقطه اردو/فارسی (۔)، یا خط خالی (پایان پاراگراف)
+_SENTENCE_END = re.compile("(?<=[.!?\u061f\u06d4\u2026])\\s+|\n\\s*\n")
+# کلمه: حروف/اعداد، با نیم‌فاصله داخل کلمه (می‌خواهم، کتاب‌ها)
+_WORD = re.compile("\\w+(?:\u200c\\w+)*")
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by for from has have he her his i if in into is it
+its of on or our she so that the their them there these they this to was we were
+what when which who will with would you your not no can may also than then such
+و در به از که این آن با را برای است بود شد شده می‌شود می‌کند کرد کند شود هم یا
+تا اما اگر پس نیز هر چه چون بر ها های یک دو خود ما من تو او ایشان آنها آن‌ها
+ای بی دیگر باید نه همه وی هست نیست باشد باشند بودند داشت دارد دارند کرده کنند
+""".split())
+
+
+def normalize(text: str) -> str:
+    text = text.translate(_ARABIC_TO_PERSIAN)
+    return _DIACRITICS.sub("", text)
+
+
+def split_sentences(text: str) -> list:
+    """
+    متن را به جمله‌ها می‌شکند؛ خطوط شکسته‌شده داخل یک پاراگراف به هم وصل می‌شوند.
+    """
+    sentences = []
+    for part in _SENTENCE_END.split(normalize(text)):
+        sentence = " ".join(part.split())
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+def tokenize(sentence: str) -> list:
+    return [
+        word
+        for word in _WORD.findall(sentence.lower())
+        if len(word) > 1 and word not in STOPWORDS and not word.isdigit()
+    ]
+
+
+def compute_idf(token_lists) -> dict:
+    # هر جمله یک «سند» حساب می‌شود
+    df = Counter()
+    for tokens in token_lists:
+        df.update(set(tokens))
+    n = len(token_lists)
+    return {word: math.log((1 + n) / (1 + count)) + 1 for word, count in df.items()}
+
+
+def tfidf_matrix(token_lists, idf: dict) -> np.ndarray:
+    """
+    ماتریس TF-IDF (جمله × کلمه) با سطرهای نرمال‌شده؛ واژگان فقط از همین جمله‌ها.
+    """
+    vocab = {}
+    rows, cols, values = [], [], []
+    for i, tokens in enumerate(token_lists):
+        for word, count in Counter(tokens).items():
+            j = vocab.setdefault(word, len(vocab))
+            rows.append(i)
+            cols.append(j)
+            values.append((1 + math.log(count)) * idf.get(word, 1.0))
+
+    matrix = np.zeros((len(token_lists), max(1, len(vocab))), dtype=np.float32)
+    matrix[rows, cols] = values
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+def centroid_scores(matrix: np.ndarray) -> np.ndarray:
+    centroid = matrix.sum(axis=0)
+    norm = np.linalg.norm(centroid)
+    if not norm:
+        return np.zeros(len(matrix), dtype=np.float32)
+    return matrix @ (centroid / norm)
+
+
+def textrank_scores(matrix: np.ndarray, damping: float = 0.85,
+                    iterations: int = 50, tol: float = 1e-6) -> np.ndarray:
+    n = len(matrix)
+    similarity = matrix @ matrix.T
+    np.fill_diagonal(similarity, 0)
+
+    # ماتریس گذار: هر سطر به جمع یک نرمال می‌شود (جمله‌های بی‌ارتباط یکنواخت)
+    totals = similarity.sum(axis=1, keepdims=True)
+    transition = np.where(totals > 0, similarity / np.where(totals > 0, totals, 1), 1.0 / n)
+
+    scores = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < tol:
+            return updated
+        scores = updated
+    return scores
+
+
+def score_sentences(token_lists, idf: dict, method: str = SUMMARY_METHOD) -> np.ndarray:
+    matrix = tfidf_matrix(token_lists, idf)
+    if method == "tfidf":
+        return centroid_scores(matrix)
+    return textrank_scores(matrix)
+
+
+def _top(indices: list, scores: np.ndarray, count: int) -> list:
+    order = np.argsort(-scores, kind="stable")[:count]
+    return [indices[i] for i in order]
+
+
+def select_sentences(
+    token_lists,
+    count: int,
+    method: str = SUMMARY_METHOD,
+    chunk_size: int = SUMMARY_CHUNK_SENTENCES,
+) -> list:
+    """
+    شماره جمله‌های برتر را (به ترتیب متن) برمی‌گرداند.
+    اگر تعداد جمله‌ها از chunk_size بیشتر باشد:
+    map: از هر تکه چند جمله برتر انتخاب می‌شود،
+    reduce: همین کار روی جمله‌های انتخاب‌شده تکرار می‌شود تا در یک تکه جا شوند.
+    """
+    idf = compute_idf(token_lists)
+    candidates = [i for i, tokens in enumerate(token_lists) if len(tokens) >= SUMMARY_MIN_WORDS]
+    if not candidates:
+        candidates = [i for i, tokens in enumerate(token_lists) if tokens]
+
+    chunk_size = max(chunk_size, 2 * count)
+    per_chunk = max(count, chunk_size // 10)
+
+    while len(candidates) > chunk_size:
+        selected = []
+        for start in range(0, len(candidates), chunk_size):
+            chunk = candidates[start:start + chunk_size]
+            scores = score_sentences([token_lists[i] for i in chunk], idf, method)
+            selected.extend(_top(chunk, scores, per_chunk))
+        candidates = sorted(selected)
+
+    if not candidates:
+        return []
+    scores = score_sentences([token_lists[i] for i in candidates], idf, method)
+    return sorted(_top(candidates, scores, count))
+
+
+def summarize(
+    text: str,
+    max_sentences: int = SUMMARY_SENTENCES,
+    max_chars: int = SUMMARY_MAX_CHARS,
+    method: str = SUMMARY_METHOD,
+    chunk_size: int = SUMMARY_CHUNK_SENTENCES,
+) -> str:
+    """
+    خلاصه استخراجی متن: جمله‌های مهم‌تر، به ترتیبی که در متن آمده‌اند.
+    """
+    sentences = split_sentences(text)
+    if len(sentences) <= max_sentences:
+        return "\n\n".join(sentences)[:max_chars]
+
+    token_lists = [tokenize(s) for s in sentences]
+    chosen = select_sentences(token_lists, max_sentences, method, chunk_size)
+    if not chosen:
+        # هیچ کلمه قابل امتیازی نیست (جدول عددی، فقط کلمات پرتکرار)؛ جمله‌های اول متن
+        chosen = range(max_sentences)
+
+    parts = []
+    length = 0
+    for i in chosen:
+        sentence = sentences[i]
+        if parts and length + len(sentence) + 2 > max_chars:
+            break
+        parts.append(sentence)
+        length += len(sentence) + 2
+    return "\n\n".join(parts)[:max_chars]
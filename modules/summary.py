@@ -1,150 +1,195 @@
-import os
-import requests
-from PyPDF2 import PdfReader
-from PyPDF2.errors import PdfReadError
+import io
+import asyncio
 from docx import Document as DocxDocument
 
-BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-TELEGRAM_API = f"https://api.telegram.org/bot{BOT_TOKEN}"
+from modules.telegram_api import send_message
+from modules.delivery import deliver_text
+from modules.downloader import download, DownloadError
+from modules.extract import extract_pdf_text, PdfTextError, PDF_TEXT_BACKEND
+from modules.cache import result_cache, content_hash
+from modules.metrics import set_mode, timed, count_error
+from modules.summarizer import (
+    summarize,
+    SUMMARY_METHOD,
+    SUMMARY_SENTENCES,
+    SUMMARY_MAX_CHARS,
+)
 
 
-def send_message(chat_id, text):
-    requests.post(f"{TELEGRAM_API}/sendMessage", json={
-        "chat_id": chat_id,
-        "text": text
-    })
+def extract_docx_text(doc_bytes: bytes) -> str:
+    doc = DocxDocument(io.BytesIO(doc_bytes))
 
+    full_text = ""
+    for para in doc.paragraphs:
+        if para.text:
+            full_text += para.text + "\n\n"
+    return full_text
 
-def simple_summarize(raw_text: str, max_chars: int = 2000) -> str:
+
+def summary_options() -> dict:
+    # خلاصه با تنظیمات دیگر نتیجه دیگری است؛ پس در کلید کش می‌آیند
+    return {
+        "method": SUMMARY_METHOD,
+        "sentences": SUMMARY_SENTENCES,
+        "max_chars": SUMMARY_MAX_CHARS,
+    }
+
+
+def summary_pdf_cache_key(file_unique_id: str) -> str:
+    return result_cache.make_key(
+        file_unique_id, "SUMMARY_PDF",
+        backend=PDF_TEXT_BACKEND, **summary_options(),
+    )
+
+
+def summary_word_cache_key(file_unique_id: str) -> str:
+    return result_cache.make_key(file_unique_id, "SUMMARY_WORD", **summary_options())
+
+
+async def send_cached_summary(chat_id: int, cache_key: str) -> bool:
     """
-    یک خلاصه‌ساز خیلی ساده:
-    - متن را محدود می‌کند
-    - بر اساس پاراگراف‌ها چند قسمت اول را نگه می‌دارد
+    اگر خلاصه در کش بود همان را می‌فرستد و True برمی‌گرداند.
     """
-    text = raw_text.strip()
-    if len(text) > max_chars:
-        text = text[:max_chars]
+    cached = await result_cache.aget(cache_key)
+    if cached is None or not cached.strip():
+        return False
 
-    # جداکردن پاراگراف‌ها
-    paragraphs = [p.strip() for p in text.split("\n\n") if p.strip()]
+    await send_message(chat_id, "خلاصه آماده شد ✅")
+    await deliver_text(chat_id, cached.decode("utf-8"))
+    return True
 
-    if not paragraphs:
-        return text
 
-    # چند پاراگراف اول را برمی‌گردانیم
-    selected = paragraphs[:6]
-    summary = "\n\n".join(selected)
+async def send_summary(chat_id: int, cache_key: str, summary: str):
+    """
+    خلاصه را می‌فرستد و در کش می‌گذارد؛ خلاصه خالی نه فرستاده و نه کش می‌شود.
+    """
+    if not summary.strip():
+        await send_message(chat_id, "نتونستم از این متن خلاصه‌ای دربیارم 😕")
+        return
 
-    return summary
+    await send_message(chat_id, "خلاصه آماده شد ✅")
+    await deliver_text(chat_id, summary)
+    await result_cache.aput(cache_key, summary.encode("utf-8"))
 
 
-async def handle_summary_pdf(chat_id: int, file_id: str):
+async def handle_summary_pdf(chat_id: int, file_id: str, file_unique_id: str = None):
+    set_mode("SUMMARY_PDF")
     try:
-        file_info = requests.get(
-            f"{TELEGRAM_API}/getFile",
-            params={"file_id": file_id}
-        ).json()
+        pdf_bytes = None
+        if not file_unique_id:
+            pdf_bytes = await download(file_id, "pdf")
+            file_unique_id = content_hash(pdf_bytes)
 
-        file_path = file_info["result"]["file_path"]
-        file_url = f"https://api.telegram.org/file/bot{BOT_TOKEN}/{file_path}"
+        cache_key = summary_pdf_cache_key(file_unique_id)
+        if await send_cached_summary(chat_id, cache_key):
+            return
 
-        pdf_bytes = requests.get(file_url).content
-        pdf_filename = "summary_input.pdf"
-        with open(pdf_filename, "wb") as f:
-            f.write(pdf_bytes)
+        if pdf_bytes is None:
+            pdf_bytes = await download(file_id, "pdf")
 
         try:
-            reader = PdfReader(pdf_filename)
-        except PdfReadError:
-            send_message(
+            with timed("parse"):
+                full_text = await extract_pdf_text(pdf_bytes)
+        except PdfTextError as e:
+            count_error(e)
+            await send_message(
                 chat_id,
                 "نتونستم این PDF رو بخونم 😕\n"
                 "یا خراب شده، یا فرمتش عجیبه. لطفاً یک فایل دیگه امتحان کن."
             )
             return
 
-        full_text = ""
-        for page in reader.pages:
-            text = page.extract_text() or ""
-            full_text += text + "\n\n"
-
         if not full_text.strip():
-            send_message(
+            await send_message(
                 chat_id,
                 "هیچ متن قابل خوندنی توی این PDF پیدا نکردم 😕\n"
                 "احتمالاً اسکن/عکس هست."
             )
             return
 
-        send_message(chat_id, "در حال خلاصه‌سازی ساده PDF هستم... ⏳")
-        summary = simple_summarize(full_text)
-        send_message(chat_id, "خلاصه آماده شد ✅")
-        send_message(chat_id, summary)
+        await send_message(chat_id, "در حال خلاصه‌سازی PDF هستم... ⏳")
+        with timed("summarize"):
+            summary = await asyncio.to_thread(summarize, full_text)
+        await send_summary(chat_id, cache_key, summary)
+
+    except DownloadError as e:
+        count_error(e)
+        await send_message(chat_id, str(e))
 
     except Exception as e:
+        count_error(e)
         print("ERROR in handle_summary_pdf:", e)
-        send_message(
+        await send_message(
             chat_id,
             "در خلاصه‌سازی PDF یه خطای غیرمنتظره پیش اومد 😔"
         )
 
 
-async def handle_summary_word(chat_id: int, file_id: str):
+async def handle_summary_word(chat_id: int, file_id: str, file_unique_id: str = None):
+    set_mode("SUMMARY_WORD")
     try:
-        file_info = requests.get(
-            f"{TELEGRAM_API}/getFile",
-            params={"file_id": file_id}
-        ).json()
+        doc_bytes = None
+        if not file_unique_id:
+            doc_bytes = await download(file_id, "docx")
+            file_unique_id = content_hash(doc_bytes)
 
-        file_path = file_info["result"]["file_path"]
-        file_url = f"https://api.telegram.org/file/bot{BOT_TOKEN}/{file_path}"
-
-        doc_bytes = requests.get(file_url).content
-        doc_filename = "summary_input.docx"
-        with open(doc_filename, "wb") as f:
-            f.write(doc_bytes)
+        cache_key = summary_word_cache_key(file_unique_id)
+        if await send_cached_summary(chat_id, cache_key):
+            return
 
-        doc = DocxDocument(doc_filename)
+        if doc_bytes is None:
+            doc_bytes = await download(file_id, "docx")
 
-        full_text = ""
-        for para in doc.paragraphs:
-            if para.text:
-                full_text += para.text + "\n\n"
+        with timed("parse"):
+            full_text = await asyncio.to_thread(extract_docx_text, doc_bytes)
 
         if not full_text.strip():
-            send_message(
+            await send_message(
                 chat_id,
                 "داخل این فایل Word متنی پیدا نکردم 😕"
             )
             return
 
-        send_message(chat_id, "در حال خلاصه‌سازی ساده Word هستم... ⏳")
-        summary = simple_summarize(full_text)
-        send_message(chat_id, "خلاصه آماده شد ✅")
-        send_message(chat_id, summary)
+        await send_message(chat_id, "در حال خلاصه‌سازی Word هستم... ⏳")
+        with timed("summarize"):
+            summary = await asyncio.to_thread(summarize, full_text)
+        await send_summary(chat_id, cache_key, summary)
+
+    except DownloadError as e:
+        count_error(e)
+        await send_message(chat_id, str(e))
 
     except Exception as e:
+        count_error(e)
         print("ERROR in handle_summary_word:", e)
-        send_message(
+        await send_message(
             chat_id,
             "در خلاصه‌سازی Word یه خطای غیرمنتظره پیش اومد 😔"
         )
 
 
 async def handle_summary_text(chat_id: int, raw_text: str):
+    set_mode("SUMMARY_TEXT")
     try:
         if not raw_text.strip():
-            send_message(chat_id, "متنی برای خلاصه‌سازی نفرستادی 😕")
+            await send_message(chat_id, "متنی برای خلاصه‌سازی نفرستادی 😕")
+            return
+
+        cache_key = result_cache.make_key(
+            content_hash(raw_text), "SUMMARY_TEXT", **summary_options()
+        )
+        if await send_cached_summary(chat_id, cache_key):
             return
 
-        send_message(chat_id, "در حال خلاصه‌سازی ساده متن هستم... ⏳")
-        summary = simple_summarize(raw_text)
-        send_message(chat_id, "خلاصه آماده شد ✅")
-        send_message(chat_id, summary)
+        await send_message(chat_id, "در حال خلاصه‌سازی متن هستم... ⏳")
+        with timed("summarize"):
+            summary = await asyncio.to_thread(summarize, raw_text)
+        await send_summary(chat_id, cache_key, summary)
 
     except Exception as e:
+        count_error(e)
         print("ERROR in handle_summary_text:", e)
-        send_message(
+        await send_message(
             chat_id,
             "در خلاصه‌سازی متن یه خطای غیرمنتظره پیش اومد 😔"
         )
@@ -0,0 +1,211 @@
+import io
+import os
+import asyncio
+
+import httpx
+
+from modules.metrics import timed, bytes_total
+
+BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+
+# آدرس پایه Bot API؛ برای تست می‌شود آن را به یک سرور محلی داد
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org").rstrip("/")
+TELEGRAM_API = f"{TELEGRAM_API_BASE}/bot{BOT_TOKEN}"
+TELEGRAM_FILE_API = f"{TELEGRAM_API_BASE}/file/bot{BOT_TOKEN}"
+
+# تایم‌اوت‌ها (ثانیه)
+TELEGRAM_CONNECT_TIMEOUT = float(os.getenv("TELEGRAM_CONNECT_TIMEOUT", "10"))
+TELEGRAM_TIMEOUT = float(os.getenv("TELEGRAM_TIMEOUT", "60"))
+
+# تعداد تلاش دوباره و فاصله پایه بین تلاش‌ها
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "3"))
+TELEGRAM_BACKOFF = float(os.getenv("TELEGRAM_BACKOFF", "0.5"))
+
+# متدهایی که تکرارشان اثر دوباره ندارد؛ بقیه (sendMessage، sendDocument) فقط وقتی
+# دوباره فرستاده می‌شوند که درخواست مطمئناً به تلگرام نرسیده باشد (خطای اتصال یا 429)،
+# وگرنه کاربر پیام یا فایل تکراری می‌گیرد
+IDEMPOTENT_METHODS = frozenset({
+    "getFile", "getUpdates", "getMe", "editMessageText", "deleteWebhook", "setWebhook",
+})
+
+# خطاهایی که یعنی درخواست اصلاً فرستاده نشده
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# اندازه استخر اتصال‌ها
+TELEGRAM_MAX_CONNECTIONS = int(os.getenv("TELEGRAM_MAX_CONNECTIONS", "20"))
+
+_client = None
+
+
+class TelegramAPIError(Exception):
+    def __init__(self, method: str, description: str, error_code: int = None):
+        super().__init__(f"{method}: {description}")
+        self.method = method
+        self.description = description
+        self.error_code = error_code
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    یک کلاینت مشترک با اتصال‌های keep-alive برمی‌گرداند
+    (و اگر پکیج h2 نصب باشد با HTTP/2).
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=_http2_available(),
+            timeout=httpx.Timeout(TELEGRAM_TIMEOUT, connect=TELEGRAM_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=TELEGRAM_MAX_CONNECTIONS,
+                max_keepalive_connections=TELEGRAM_MAX_CONNECTIONS,
+            ),
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def retry_delay(attempt: int, payload: dict = None) -> float:
+    # در جواب 429 تلگرام خودش می‌گوید چند ثانیه صبر کنیم
+    if payload:
+        retry_after = (payload.get("parameters") or {}).get("retry_after")
+        if retry_after is not None:
+            return float(retry_after)
+    return TELEGRAM_BACKOFF * (2 ** attempt)
+
+
+async def _request(method: str, url: str, idempotent: bool = True, **kwargs) -> httpx.Response:
+    """
+    درخواست HTTP با تلاش دوباره برای خطاهای شبکه، 429 و خطاهای 5xx.
+    با idempotent=False فقط خطای اتصال و 429 (که تلگرام پیام را قبول نکرده) دوباره امتحان می‌شوند.
+    """
+    client = get_client()
+    attempt = 0
+    while True:
+        # فایل‌ها stream خوانده می‌شوند؛ در تلاش دوباره باید از اول خوانده شوند
+        for value in (kwargs.get("files") or {}).values():
+            if hasattr(value[1], "seek"):
+                value[1].seek(0)
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            if attempt >= TELEGRAM_MAX_RETRIES:
+                raise
+            if not idempotent and not isinstance(e, _NOT_SENT_ERRORS):
+                raise
+            await asyncio.sleep(retry_delay(attempt))
+            attempt += 1
+            continue
+
+        retryable = response.status_code == 429 or (idempotent and response.status_code >= 500)
+        if retryable:
+            if attempt < TELEGRAM_MAX_RETRIES:
+                try:
+                    payload = response.json()
+                except ValueError:
+                    payload = None
+                await asyncio.sleep(retry_delay(attempt, payload))
+                attempt += 1
+                continue
+
+        return response
+
+
+async def call(api_method: str, data: dict = None, files: dict = None) -> dict:
+    """
+    یک متد Bot API را صدا می‌زند و فیلد result را برمی‌گرداند.
+    """
+    url = f"{TELEGRAM_API}/{api_method}"
+    idempotent = api_method in IDEMPOTENT_METHODS
+    if files:
+        response = await _request("POST", url, idempotent, data=data, files=files)
+    else:
+        response = await _request("POST", url, idempotent, json=data or {})
+
+    try:
+        payload = response.json()
+    except ValueError:
+        raise TelegramAPIError(api_method, response.text, response.status_code)
+
+    if not payload.get("ok"):
+        raise TelegramAPIError(
+            api_method,
+            payload.get("description", ""),
+            payload.get("error_code"),
+        )
+    return payload.get("result")
+
+
+async def send_message(chat_id: int, text: str, reply_markup: dict = None):
+    data = {"chat_id": chat_id, "text": text}
+    if reply_markup is not None:
+        data["reply_markup"] = reply_markup
+    try:
+        return await call("sendMessage", data)
+    except Exception as e:
+        # خطای ارسال پیام نباید کل هندلر را از کار بیندازد
+        print("ERROR in send_message:", e)
+        return None
+
+
+async def edit_message_text(chat_id: int, message_id: int, text: str):
+    data = {"chat_id": chat_id, "message_id": message_id, "text": text}
+    try:
+        return await call("editMessageText", data)
+    except TelegramAPIError as e:
+        # اگر متن عوض نشده باشد تلگرام خطا می‌دهد؛ این یکی مهم نیست
+        if "not modified" not in e.description:
+            print("ERROR in edit_message_text:", e)
+    except Exception as e:
+        print("ERROR in edit_message_text:", e)
+    return None
+
+
+async def get_file(file_id: str) -> dict:
+    return await call("getFile", {"file_id": file_id})
+
+
+async def send_document(chat_id: int, filename: str, content: bytes):
+    # با BytesIO بدنه multipart تکه‌تکه از همین بافر خوانده می‌شود
+    # و یک کپی کامل دیگر از فایل در حافظه ساخته نمی‌شود
+    with timed("upload"):
+        result = await call(
+            "sendDocument",
+            data={"chat_id": chat_id},
+            files={"document": (filename, io.BytesIO(content))},
+        )
+    bytes_total.inc(len(content), direction="upload")
+    return result
+
+
+async def get_updates(offset: int = None, limit: int = 100, timeout: int = 30) -> list:
+    """
+    long polling: تا timeout ثانیه منتظر آپدیت تازه می‌ماند
+    (timeout باید از TELEGRAM_TIMEOUT کمتر باشد).
+    """
+    data = {
+        "limit": limit,
+        "timeout": timeout,
+        "allowed_updates": ["message", "edited_message"],
+    }
+    if offset is not None:
+        data["offset"] = offset
+    return await call("getUpdates", data)
+
+
+async def delete_webhook():
+    # تا وقتی webhook تنظیم شده باشد، getUpdates خطای 409 می‌دهد
+    return await call("deleteWebhook", {"drop_pending_updates": False})
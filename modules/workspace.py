@@ -0,0 +1,51 @@
+import os
+import time
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+# فقط وقتی فایل واقعاً باید روی دیسک برود (مثلاً برای pdftoppm)
+# در یک پوشه جدا برای همان کار نوشته می‌شود.
+WORKSPACE_DIR = os.getenv(
+    "WORKSPACE_DIR", os.path.join(tempfile.gettempdir(), "bot-jobs")
+)
+
+# پوشه‌هایی که از اجرای قبلی (مثلاً بعد از crash) مانده‌اند و از این قدیمی‌ترند پاک می‌شوند
+WORKSPACE_STALE_SECONDS = int(os.getenv("WORKSPACE_STALE_SECONDS", str(24 * 3600)))
+
+
+@contextmanager
+def job_workspace(prefix: str = "job-"):
+    """
+    یک پوشه موقت اختصاصی برای یک کار می‌سازد و در پایان
+    (حتی با خطا) کامل پاکش می‌کند.
+    """
+    os.makedirs(WORKSPACE_DIR, exist_ok=True)
+    path = tempfile.mkdtemp(prefix=prefix, dir=WORKSPACE_DIR)
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def spill(workspace: str, filename: str, data) -> str:
+    """
+    داده را داخل پوشه کار می‌نویسد و مسیرش را برمی‌گرداند.
+    """
+    path = os.path.join(workspace, filename)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def cleanup_stale_workspaces():
+    if not os.path.isdir(WORKSPACE_DIR):
+        return
+
+    now = time.time()
+    for entry in os.scandir(WORKSPACE_DIR):
+        try:
+            if now - entry.stat().st_mtime > WORKSPACE_STALE_SECONDS:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except FileNotFoundError:
+            pass
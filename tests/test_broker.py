@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from modules.broker import BrokerQueue, RedisBroker, SQLiteBroker
+from modules.jobs import QueueFullError
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def broker(request, tmp_path):
+    if request.param == "sqlite":
+        broker = SQLiteBroker(str(tmp_path / "jobs.db"))
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")  # اسکریپت‌های Lua در fakeredis
+        broker = RedisBroker(fakeredis.FakeRedis())
+    yield broker
+    broker.close()
+
+
+def test_reserve_hides_job_until_ack(broker):
+    job_id = broker.put(1, {"handler": "h", "args": [1]})
+    assert broker.reserve() == (job_id, {"handler": "h", "args": [1]}, 1)
+    assert broker.reserve() is None
+    assert broker.size() == 1
+
+    broker.ack(job_id)
+    broker.requeue_expired()
+    assert broker.reserve() is None
+    assert broker.size() == 0
+
+
+def test_expired_job_is_delivered_again(broker):
+    job_id = broker.put(1, {"handler": "h", "args": []})
+    # worker کرش کرده و مهلتش گذشته
+    assert broker.reserve(visibility_timeout=-1)[2] == 1
+
+    broker.requeue_expired()
+    assert broker.reserve() == (job_id, {"handler": "h", "args": []}, 2)
+
+
+def test_extend_keeps_job_hidden(broker):
+    job_id = broker.put(1, {"handler": "h", "args": []})
+    broker.reserve(visibility_timeout=-1)
+    broker.extend(job_id)
+
+    broker.requeue_expired()
+    assert broker.reserve() is None
+
+
+def test_jobs_are_delivered_in_order(broker):
+    first = broker.put(1, {"handler": "a", "args": []})
+    second = broker.put(2, {"handler": "b", "args": []})
+    assert broker.reserve()[0] == first
+    assert broker.reserve()[0] == second
+
+
+def test_sqlite_chat_waits_for_running_job(tmp_path):
+    broker = SQLiteBroker(str(tmp_path / "jobs.db"))
+    try:
+        first = broker.put(1, {"handler": "a", "args": []})
+        broker.put(1, {"handler": "b", "args": []})
+        other = broker.put(2, {"handler": "c", "args": []})
+
+        assert broker.reserve()[0] == first
+        # کار دوم چت 1 تا تمام شدن اولی تحویل داده نمی‌شود
+        assert broker.reserve()[0] == other
+        assert broker.reserve() is None
+
+        broker.ack(first)
+        assert broker.reserve()[1]["handler"] == "b"
+    finally:
+        broker.close()
+
+
+def test_broker_queue_limits_size(tmp_path):
+    async def handle_pdf_to_word(*args):
+        pass
+
+    queue = BrokerQueue(SQLiteBroker(str(tmp_path / "jobs.db")), maxsize=2)
+    assert queue.submit(1, handle_pdf_to_word, 1, "file") == 0
+    assert queue.submit(2, handle_pdf_to_word, 2, "file") == 1
+    with pytest.raises(QueueFullError):
+        queue.submit(3, handle_pdf_to_word, 3, "file")
+
+    assert queue.broker.reserve()[1] == {"handler": "handle_pdf_to_word", "args": [1, "file"]}
+    queue.broker.close()
+
+
+def test_broker_queue_asubmit(tmp_path):
+    async def handle_summary_text(*args):
+        pass
+
+    queue = BrokerQueue(SQLiteBroker(str(tmp_path / "jobs.db")))
+    assert asyncio.run(queue.asubmit(1, handle_summary_text, 1, "text")) == 0
+    assert asyncio.run(queue.asubmit(2, handle_summary_text, 2, "text")) == 1
+    assert len(queue) == 2
+    queue.broker.close()
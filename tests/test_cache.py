@@ -0,0 +1,105 @@
+import os
+import time
+
+from modules.cache import ResultCache
+
+
+def make_cache(tmp_path, **kwargs):
+    return ResultCache(str(tmp_path / "cache"), **kwargs)
+
+
+def age(cache, key, atime=None, mtime=None):
+    # زمان دسترسی/ساخت فایل کش را به عقب می‌برد
+    path = cache._path(key)
+    st = os.stat(path)
+    os.utime(path, (atime or st.st_atime, mtime or st.st_mtime))
+
+
+def test_get_and_put(tmp_path):
+    cache = make_cache(tmp_path)
+    key = cache.make_key("file1", "WORD", backend="pypdf2")
+    assert key == cache.make_key("file1", "WORD", backend="pypdf2")
+    assert key != cache.make_key("file1", "WORD", backend="pdfium")
+
+    assert cache.get(key) is None
+    cache.put(key, b"result")
+    assert cache.get(key) == b"result"
+
+
+def test_ttl_expiry(tmp_path):
+    cache = make_cache(tmp_path, ttl=60)
+    cache.put("old", b"x")
+    cache.put("new", b"y")
+    age(cache, "old", mtime=time.time() - 120)
+
+    assert cache.get("old") is None
+    assert not os.path.exists(cache._path("old"))
+    assert cache.get("new") == b"y"
+
+
+def test_lru_eviction_order(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=30)
+    now = time.time()
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, b"0123456789")
+        age(cache, key, atime=now - 100 + i)
+
+    cache.put("d", b"0123456789")
+    # a کهنه‌ترین بود
+    assert cache.get("a") is None
+    assert [cache.get(key) is not None for key in "bcd"] == [True, True, True]
+
+
+def test_get_refreshes_atime(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=30)
+    now = time.time()
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, b"0123456789")
+        age(cache, key, atime=now - 100 + i)
+    created = os.path.getmtime(cache._path("a"))
+
+    assert cache.get("a") == b"0123456789"
+    assert os.path.getatime(cache._path("a")) >= now
+    assert os.path.getmtime(cache._path("a")) == created
+
+    cache.put("d", b"0123456789")
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+
+
+def test_existing_directory_is_reused(tmp_path):
+    make_cache(tmp_path).put("key", b"data")
+    # پروسس دیگر (یا بعد از ری‌استارت) همان نتیجه را می‌بیند
+    assert make_cache(tmp_path).get("key") == b"data"
+
+
+def test_size_limit_covers_other_processes(tmp_path):
+    first, second = make_cache(tmp_path, max_bytes=25), make_cache(tmp_path, max_bytes=25)
+    first.put("a", b"0123456789")
+    age(first, "a", atime=time.time() - 100)
+    second.put("b", b"0123456789")
+    first.put("c", b"0123456789")
+
+    files = os.listdir(tmp_path / "cache")
+    assert sorted(files) == ["b", "c"]
+    assert second.get("c") == b"0123456789"
+
+
+def test_too_large_result_is_not_cached(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=5)
+    cache.put("big", b"0123456789")
+    assert cache.get("big") is None
+
+
+def test_contains_does_not_touch_entry(tmp_path):
+    cache = make_cache(tmp_path, ttl=60)
+    assert not cache.contains("key")
+
+    cache.put("key", b"x")
+    age(cache, "key", atime=time.time() - 30)
+    atime = os.stat(cache._path("key")).st_atime
+    assert cache.contains("key")
+    assert os.stat(cache._path("key")).st_atime == atime
+
+    age(cache, "key", mtime=time.time() - 120)
+    assert not cache.contains("key")
@@ -0,0 +1,71 @@
+import io
+import random
+import zipfile
+
+import pytest
+
+from modules.delivery import split_text
+from modules.docx_writer import build_docx, split_docx
+
+
+def test_short_text_is_one_part():
+    assert split_text("  سلام  ") == ["سلام"]
+    assert split_text("") == []
+
+
+def test_split_prefers_paragraph_then_sentence():
+    first, second = "a" * 60, "b" * 60
+    assert split_text(f"{first}\n\n{second}", limit=100) == [first, second]
+
+    sentences = "Short one. " + "x" * 80 + ". Tail"
+    assert split_text(sentences, limit=50)[0] == "Short one."
+
+    assert split_text("آیا؟ " + "ب" * 60, limit=50)[0] == "آیا؟"
+
+
+def test_split_never_exceeds_limit_and_keeps_words():
+    text = " ".join(f"word{i}" for i in range(2000))
+    parts = split_text(text, limit=100)
+    assert all(len(part) <= 100 for part in parts)
+    assert " ".join(parts) == text
+
+
+def test_split_without_break_cuts_at_limit():
+    assert split_text("x" * 250, limit=100) == ["x" * 100, "x" * 100, "x" * 50]
+
+
+def paragraphs(content: bytes) -> list:
+    with zipfile.ZipFile(io.BytesIO(content)) as source:
+        document = source.read("word/document.xml").decode("utf-8")
+    return document.split("<w:body>")[1].split("</w:p>")[:-1]
+
+
+def random_pages(count: int, words: int) -> list:
+    rng = random.Random(0)
+    return [
+        " ".join("".join(rng.choice("abcdefghij") for _ in range(7)) for _ in range(words))
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize("markers", [True, False])
+def test_split_docx_keeps_every_paragraph(markers):
+    content = build_docx(random_pages(20, 2000), markers)
+    parts = split_docx(content, len(content) // 3)
+
+    assert len(parts) >= 3
+    assert all(len(part) <= len(content) // 3 for part in parts)
+    assert sum((paragraphs(part) for part in parts), []) == paragraphs(content)
+
+
+def test_split_docx_cuts_at_page_markers():
+    parts = split_docx(build_docx(random_pages(10, 2000), True), 40_000)
+    assert len(parts) > 1
+    for part in parts:
+        assert "--- صفحه " in paragraphs(part)[0]
+
+
+def test_split_docx_gives_up_when_it_cannot_split():
+    content = build_docx(random_pages(1, 2000))
+    assert split_docx(content, 100) is None
+    assert split_docx(b"not a zip", 100) is None
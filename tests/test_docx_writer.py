@@ -0,0 +1,74 @@
+import io
+import textwrap
+
+import docx
+
+from bench.pdfgen import text_pdf
+from modules.docx_writer import DocxStreamWriter, build_docx, is_rtl, page_marker
+from modules.extract import PyPDF2Backend
+
+PROSE = (
+    "Streaming the document keeps memory flat because every page is written to the zip "
+    "as soon as it is ready, and the reader never has to hold the whole tree. "
+    "Wrapped lines of one paragraph must come back as a single paragraph in Word"
+)
+
+
+def paragraphs(content: bytes) -> list:
+    return [p.text for p in docx.Document(io.BytesIO(content)).paragraphs]
+
+
+def test_wrapped_lines_are_joined():
+    page = "\n".join(textwrap.wrap(PROSE, 60))
+    assert paragraphs(build_docx([page])) == [PROSE]
+
+
+def test_headings_lists_and_sentence_ends_stay_separate():
+    wrapped = textwrap.wrap(PROSE, 60)
+    page = "\n".join([
+        "Results and discussion of the streaming writer experiment",
+        *wrapped,
+        "- first item of a list that is long enough to look wrapped",
+        "- second item",
+        "Table 1 lists pages per second for each backend in the bench:",
+        "pypdf2 120 35 12",
+    ])
+    assert paragraphs(build_docx([page])) == [
+        "Results and discussion of the streaming writer experiment " + PROSE,
+        "- first item of a list that is long enough to look wrapped",
+        "- second item",
+        "Table 1 lists pages per second for each backend in the bench:",
+        "pypdf2 120 35 12",
+    ]
+
+
+def test_blank_line_ends_paragraph():
+    assert paragraphs(build_docx(["one\n\ntwo"])) == ["one", "two"]
+
+
+def test_pypdf2_lines_are_not_fused_into_one_paragraph():
+    pages = PyPDF2Backend.pages(text_pdf(2), 0, 2)
+    lines = [line.strip() for page in pages for line in page.split("\n") if line.strip()]
+    result = paragraphs(build_docx(pages))
+
+    # قبلاً هر صفحه یک پاراگراف ~۲۳۰۰ کاراکتری می‌شد
+    assert len(result) > len(lines) * 0.7
+    assert max(len(p) for p in result) < 5 * max(len(line) for line in lines)
+    assert " ".join(result) == " ".join(lines)
+
+
+def test_page_markers_and_rtl():
+    content = build_docx(["متن فارسی صفحه اول", "", "page three"], markers=True)
+    assert paragraphs(content) == [
+        page_marker(1), "متن فارسی صفحه اول", page_marker(3), "page three",
+    ]
+    assert is_rtl("متن فارسی با یک word")
+    assert not is_rtl("English text with یک")
+
+
+def test_stream_writer_counts():
+    buffer = io.BytesIO()
+    with DocxStreamWriter(buffer) as writer:
+        writer.add_page(1, "a\x00b\n\nc", marker=False)
+    assert (writer.paragraphs, writer.chars) == (2, 3)
+    assert paragraphs(buffer.getvalue()) == ["ab", "c"]
@@ -0,0 +1,112 @@
+import json
+import asyncio
+
+import httpx
+import pytest
+
+from modules import downloader, telegram_api
+from modules.downloader import FileTooLargeError, InvalidFileError, fetch
+
+PDF = b"%PDF-1.4\n" + b"x" * 5000
+
+
+class FakeFiles:
+    """
+    getFile و دانلود فایل روی httpx.MockTransport (بدون شبکه).
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.report_size = True
+        self.content_length = True
+        self.downloaded = 0
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/getFile"):
+            file_id = json.loads(request.content)["file_id"]
+            result = {"file_id": file_id, "file_path": file_id}
+            if self.report_size:
+                result["file_size"] = len(self.files[file_id])
+            return httpx.Response(200, json={"ok": True, "result": result})
+
+        content = self.files[request.url.path.rsplit("/", 1)[1]]
+        if self.content_length:
+            return httpx.Response(200, content=content)
+
+        async def chunks():
+            for i in range(0, len(content), 1000):
+                self.downloaded = i + 1000
+                yield content[i:i + 1000]
+
+        # بدون Content-Length (chunked)
+        return httpx.Response(200, content=chunks())
+
+
+@pytest.fixture
+def files(monkeypatch):
+    fake = FakeFiles()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(fake.handler))
+    monkeypatch.setattr(telegram_api, "_client", client)
+    # تکه‌های کوچک تا معلوم شود دانلود کجا قطع شده
+    monkeypatch.setattr(downloader, "DOWNLOAD_CHUNK_SIZE", 1000)
+    yield fake
+    asyncio.run(client.aclose())
+
+
+def test_fetch_returns_content(files):
+    files.files["a"] = PDF
+    assert asyncio.run(fetch("a", "pdf")) == PDF
+
+
+def test_file_size_from_get_file_is_rejected(files):
+    files.files["a"] = PDF
+    with pytest.raises(FileTooLargeError):
+        asyncio.run(fetch("a", "pdf", max_bytes=1000))
+
+
+def test_content_length_is_rejected(files):
+    files.files["a"] = PDF
+    files.report_size = False
+    with pytest.raises(FileTooLargeError):
+        asyncio.run(fetch("a", "pdf", max_bytes=1000))
+
+
+def test_stream_stops_at_limit(files):
+    files.files["a"] = b"%PDF" + b"x" * 100_000
+    files.report_size = False
+    files.content_length = False
+    with pytest.raises(FileTooLargeError):
+        asyncio.run(fetch("a", "pdf", max_bytes=10_000))
+    # دانلود بعد از رد شدن سقف ادامه پیدا نمی‌کند
+    assert files.downloaded < 20_000
+
+
+def test_invalid_file_is_rejected_early(files):
+    files.files["a"] = b"<html>" + b"x" * 100_000
+    files.report_size = False
+    files.content_length = False
+    with pytest.raises(InvalidFileError):
+        asyncio.run(fetch("a", "pdf"))
+    assert files.downloaded < 5000
+
+
+def test_docx_magic(files):
+    files.files["doc"] = b"PK\x03\x04" + b"x" * 100
+    files.files["pdf"] = PDF
+    assert asyncio.run(fetch("doc", "docx")).startswith(b"PK")
+    with pytest.raises(InvalidFileError):
+        asyncio.run(fetch("pdf", "docx"))
+
+
+def test_short_file_is_checked_when_complete(files):
+    files.files["a"] = b"%PD"
+    with pytest.raises(InvalidFileError):
+        asyncio.run(fetch("a", "pdf"))
+
+
+def test_check_magic_window():
+    assert downloader._check_magic(b"junk%PDF", "pdf", complete=False) is True
+    # %PDF ممکن است هنوز در راه باشد
+    assert downloader._check_magic(b"junk", "pdf", complete=False) is False
+    with pytest.raises(InvalidFileError):
+        downloader._check_magic(b"x" * 1024, "pdf", complete=False)
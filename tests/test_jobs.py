@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from modules.jobs import JobQueue, QueueFullError, UserQueueFullError, estimate_cost
+from modules.ratelimit import RateLimiter
+
+
+def run_queue(submit_jobs, **kwargs):
+    """
+    یک کار اول صف را نگه می‌دارد تا submit_jobs بقیه را ثبت کند،
+    بعد همه را با یک worker اجرا می‌کند و ترتیب اجرا را برمی‌گرداند.
+    """
+    async def main():
+        queue = JobQueue(workers=1, **kwargs)
+        await queue.start()
+        started, release = asyncio.Event(), asyncio.Event()
+        order = []
+
+        async def gate():
+            started.set()
+            await release.wait()
+
+        async def job(name):
+            order.append(name)
+
+        queue.submit(0, gate)
+        await started.wait()
+        result = submit_jobs(queue, job)
+        release.set()
+        while len(queue):
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return order, result
+
+    return asyncio.run(main())
+
+
+def test_light_jobs_overtake_heavy_ones():
+    def submit(queue, job):
+        for i in range(3):
+            queue.submit(1, job, f"ocr{i}", cost=10)
+        return [queue.submit(2, job, f"word{i}", cost=1) for i in range(3)]
+
+    order, ahead = run_queue(submit)
+    assert order == ["word0", "word1", "word2", "ocr0", "ocr1", "ocr2"]
+    assert ahead == [0, 1, 2]
+
+
+def test_users_are_interleaved_by_finish_tag():
+    def submit(queue, job):
+        for i in range(3):
+            queue.submit(1, job, f"a{i}", cost=2)
+        for i in range(3):
+            queue.submit(2, job, f"b{i}", cost=3)
+
+    order, _ = run_queue(submit)
+    # برچسب‌ها: a = 2, 4, 6 و b = 3, 6, 9
+    assert order == ["a0", "b0", "a1", "a2", "b1", "b2"]
+
+
+def test_jobs_of_one_chat_keep_their_order():
+    def submit(queue, job):
+        queue.submit(1, job, "first", cost=10)
+        queue.submit(1, job, "second", cost=1)
+
+    order, _ = run_queue(submit)
+    assert order == ["first", "second"]
+
+
+def test_queue_limits():
+    async def main():
+        async def job():
+            pass
+
+        queue = JobQueue(workers=1, maxsize=3, user_max_pending=2)
+        await queue.start()
+        queue.submit(1, job)
+        queue.submit(1, job)
+        with pytest.raises(UserQueueFullError):
+            queue.submit(1, job)
+        queue.submit(2, job)
+        with pytest.raises(QueueFullError):
+            queue.submit(3, job)
+        await queue.stop()
+
+    asyncio.run(main())
+
+
+def test_estimate_cost():
+    assert estimate_cost("WORD") == 1
+    assert estimate_cost("OCR_PDF", 1024 * 1024) == 10 * 1024 / 100
+
+
+def test_rate_limiter_burst_and_refill():
+    now = [0.0]
+    limiter = RateLimiter(rate_per_minute=6, burst=2, clock=lambda: now[0])
+
+    assert limiter.take(1) == 0
+    assert limiter.take(1) == 0
+    assert limiter.take(1) == pytest.approx(10)
+    # کاربر دیگر سطل خودش را دارد
+    assert limiter.take(2) == 0
+
+    now[0] = 10
+    assert limiter.take(1) == 0
+    assert limiter.take(1) > 0
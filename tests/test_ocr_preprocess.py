@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from modules.ocr_preprocess import (
+    binarize, content_box, estimate_skew, get_profile, peak_bytes, preprocess, to_gray,
+)
+
+DPI = 150
+WIDTH, HEIGHT = int(8.5 * DPI), int(11 * DPI)
+
+
+def text_page(angle: float = 0) -> Image.Image:
+    """
+    صفحه ساختگی با خطوط «کلمه» (مستطیل‌های سیاه) که angle درجه (پادساعتگرد) چرخیده است.
+    """
+    image = Image.new("L", (WIDTH, HEIGHT), 255)
+    draw = ImageDraw.Draw(image)
+    rng = np.random.default_rng(0)
+    for y in range(DPI, HEIGHT - DPI, DPI // 4):
+        x = DPI
+        while x < WIDTH - DPI:
+            word = int(rng.integers(10, 60))
+            draw.rectangle([x, y, min(x + word, WIDTH - DPI), y + DPI // 10], fill=0)
+            x += word + int(rng.integers(8, 20))
+    return image.rotate(angle, fillcolor=255) if angle else image
+
+
+def ink_of(image: Image.Image) -> np.ndarray:
+    return np.asarray(image) < 128
+
+
+@pytest.mark.parametrize("angle", [-4, -2, 0, 2, 4])
+def test_estimate_skew(angle):
+    ink = binarize(to_gray(text_page(angle)), "sauvola", DPI)
+    # زاویه‌ای که چرخاندن با آن کجی را برمی‌گرداند
+    assert estimate_skew(ink, 5, 0.5) == pytest.approx(-angle, abs=0.5)
+
+
+@pytest.mark.parametrize("angle", [-3, 3])
+def test_preprocess_straightens_page(angle):
+    result, dpi = preprocess(text_page(angle), get_profile("default"), DPI)
+    assert dpi == DPI
+    assert estimate_skew(ink_of(result), 5, 0.5) == 0
+
+
+@pytest.mark.parametrize("profile", ["fast", "default", "accurate"])
+def test_blank_pages_are_skipped(profile):
+    blank = np.full((HEIGHT, WIDTH), 255, dtype=np.uint8)
+    assert preprocess(Image.fromarray(blank), get_profile(profile), DPI) == (None, DPI)
+
+    # چند نقطه نویز اسکنر هنوز صفحه سفید است
+    blank[np.random.default_rng(1).random(blank.shape) < 0.0005] = 0
+    assert preprocess(Image.fromarray(blank), get_profile(profile), DPI)[0] is None
+
+
+def test_text_page_is_not_blank():
+    result, _ = preprocess(text_page(), get_profile("fast"), DPI)
+    assert result is not None
+    assert ink_of(result).any()
+
+
+def test_content_box_ignores_scanner_border():
+    ink = np.zeros((HEIGHT, WIDTH), dtype=bool)
+    ink[:, :20] = True  # نوار سیاه لبه اسکنر
+    ink[300:320, 400:800] = True
+    left, _, right, _ = content_box(ink, margin=0)
+    assert (left, right) == (400, 800)
+
+
+def test_content_box_of_all_border_page_keeps_everything():
+    ink = np.ones((100, 80), dtype=bool)
+    assert content_box(ink, margin=5) == (0, 0, 80, 100)
+    assert content_box(np.zeros((100, 80), dtype=bool), margin=5) is None
+
+
+def test_off_profile_returns_image_unchanged():
+    image = text_page()
+    assert preprocess(image, get_profile("off"), DPI) == (image, DPI)
+
+
+def test_peak_bytes_grows_with_page_size():
+    assert peak_bytes(WIDTH, HEIGHT, DPI, "off") == 0
+    small = peak_bytes(WIDTH, HEIGHT, DPI, "default")
+    assert 0 < small < peak_bytes(2 * WIDTH, 2 * HEIGHT, DPI, "default")
@@ -0,0 +1,100 @@
+import asyncio
+
+from modules import polling
+from modules.polling import OFFSET_KEY, UpdatePoller
+from modules.storage import AsyncStorage, MemoryStorage
+
+
+def update(update_id: int, chat_id: int) -> dict:
+    return {"update_id": update_id, "message": {"chat": {"id": chat_id}, "text": str(update_id)}}
+
+
+class Recorder:
+    def __init__(self, delay: float = 0):
+        self.handled = []
+        self.running = 0
+        self.max_running = 0
+        self.delay = delay
+
+    async def __call__(self, upd):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(self.delay)
+        self.handled.append(upd["update_id"])
+        self.running -= 1
+
+
+def make_poller(handler, **kwargs):
+    return UpdatePoller(handler, AsyncStorage(MemoryStorage()), **kwargs)
+
+
+def test_duplicates_are_processed_once():
+    handler = Recorder()
+    poller = make_poller(handler)
+
+    async def run():
+        await poller.dispatch([update(1, 10), update(2, 10), update(1, 10)])
+        await poller.dispatch([update(2, 10), update(3, 10)])
+
+    asyncio.run(run())
+    assert handler.handled == [1, 2, 3]
+
+
+def test_chat_updates_run_in_order():
+    handler = Recorder(delay=0.001)
+    poller = make_poller(handler)
+    updates = [update(i, 10 + i % 3) for i in range(1, 31)]
+
+    asyncio.run(poller.dispatch(list(reversed(updates))))
+    for chat_id in (10, 11, 12):
+        chat = [u["update_id"] for u in updates if u["message"]["chat"]["id"] == chat_id]
+        assert [i for i in handler.handled if i in chat] == chat
+
+
+def test_concurrency_cap():
+    handler = Recorder(delay=0.01)
+    poller = make_poller(handler, concurrency=3)
+
+    asyncio.run(poller.dispatch([update(i, i) for i in range(1, 11)]))
+    assert sorted(handler.handled) == list(range(1, 11))
+    assert handler.max_running == 3
+
+
+def test_dispatch_returns_next_offset():
+    poller = make_poller(Recorder())
+    # حتی اگر آخرین آپدیت تکراری بوده باشد
+    offset = asyncio.run(poller.dispatch([update(5, 1), update(9, 2), update(9, 2)]))
+    assert offset == 10
+
+
+def test_run_persists_offset(monkeypatch):
+    batches = [[update(3, 1), update(4, 2)], [], [update(4, 2), update(7, 1)]]
+    offsets = []
+
+    async def fake_get_updates(offset, limit, timeout):
+        offsets.append(offset)
+        if batches:
+            return batches.pop(0)
+        await asyncio.Event().wait()
+
+    async def fake_delete_webhook():
+        pass
+
+    monkeypatch.setattr(polling, "get_updates", fake_get_updates)
+    monkeypatch.setattr(polling, "delete_webhook", fake_delete_webhook)
+
+    handler = Recorder()
+    poller = make_poller(handler)
+
+    async def run():
+        await poller.storage.set_value(OFFSET_KEY, 3)
+        poller.start()
+        while batches or len(offsets) < 4:
+            await asyncio.sleep(0.001)
+        await poller.stop()
+        return await poller.storage.get_value(OFFSET_KEY)
+
+    assert asyncio.run(run()) == 8
+    # بعد از ری‌استارت از offset ذخیره‌شده ادامه می‌دهد
+    assert offsets == [3, 5, 5, 8]
+    assert handler.handled == [3, 4, 7]
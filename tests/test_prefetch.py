@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+
+from modules import prefetch
+from modules.prefetch import PrefetchBuffer
+from modules.router import PDF_MIME
+
+
+def message(file_id, chat_id=1, size=100):
+    return {
+        "chat": {"id": chat_id},
+        "document": {"file_id": file_id, "mime_type": PDF_MIME, "file_size": size},
+    }
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    calls = []
+
+    async def fake_fetch(file_id, kind):
+        calls.append(file_id)
+        return b"%PDF-" + file_id.encode()
+
+    monkeypatch.setattr(prefetch, "fetch", fake_fetch)
+    monkeypatch.setattr(prefetch, "preparse", lambda content, mime: {})
+    return calls
+
+
+def test_take_returns_bytes_once(fetched):
+    async def main():
+        buffer = PrefetchBuffer(max_mb=1)
+        buffer.start(message("a"))
+        assert await buffer.take("a") == b"%PDF-a"
+        assert await buffer.take("a") is None
+
+    asyncio.run(main())
+    assert fetched == ["a"]
+
+
+def test_no_fetch_keeps_nothing(fetched):
+    async def main():
+        buffer = PrefetchBuffer(max_mb=1)
+        entry = buffer.start(message("a"), fetch=False)
+        assert entry.task is None
+        assert await buffer.take("a") is None
+
+    asyncio.run(main())
+    assert fetched == []
+
+
+def test_discard_drops_untaken_entries(fetched):
+    async def main():
+        buffer = PrefetchBuffer(max_mb=1)
+        buffer.start(message("a"))
+        buffer.start(message("b"))
+        buffer.discard("a", "missing")
+        assert await buffer.take("a") is None
+        assert await buffer.take("b") == b"%PDF-b"
+
+    asyncio.run(main())
+
+
+def test_releasing_drops_entry_when_job_skips_download(fetched):
+    ran = []
+
+    async def handle_cached(chat_id, file_id):
+        # مثل هندلری که نتیجه را از کش فرستاد و download را صدا نزد
+        ran.append(file_id)
+
+    async def handle_error(chat_id, file_id):
+        raise RuntimeError("boom")
+
+    async def main():
+        buffer = PrefetchBuffer(max_mb=1)
+        buffer.start(message("a"))
+        buffer.start(message("b"))
+
+        job = buffer.releasing(handle_cached, ["a"])
+        assert job.__name__ == "handle_cached"
+        await job(1, "a")
+        with pytest.raises(RuntimeError):
+            await buffer.releasing(handle_error, ["b"])(1, "b")
+
+        assert ran == ["a"]
+        assert not buffer._entries
+
+    asyncio.run(main())
+
+
+def test_hold_replaces_and_expires(fetched, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(prefetch.time, "monotonic", lambda: now[0])
+
+    async def main():
+        buffer = PrefetchBuffer(max_mb=0, ttl=60)
+        old = buffer.start(message("a", chat_id=1), fetch=False)
+        buffer.hold(1, old)
+        new = buffer.start(message("b", chat_id=1), fetch=False)
+        buffer.hold(1, new)
+        assert buffer.is_waiting(1, new)
+        assert not buffer.is_waiting(1, old)
+
+        # پیش‌دریافت خاموش است پس _evict هیچ‌وقت صدا زده نمی‌شود؛ hold خودش پاک می‌کند
+        now[0] += 120
+        buffer.hold(2, buffer.start(message("c", chat_id=2), fetch=False))
+        assert list(buffer._waiting) == [2]
+
+    asyncio.run(main())
+
+
+def test_hold_is_capped(fetched):
+    async def main():
+        buffer = PrefetchBuffer(max_mb=1, max_files=3)
+        for chat_id in range(10):
+            buffer.hold(chat_id, buffer.start(message(f"f{chat_id}", chat_id=chat_id)))
+        assert list(buffer._waiting) == [7, 8, 9]
+        # بایت‌های فایل‌های منتظری که بیرون رفتند هم آزاد می‌شوند
+        assert set(buffer._entries) <= {"f7", "f8", "f9"}
+        assert buffer.take_waiting(9).file_id == "f9"
+
+    asyncio.run(main())
+
+
+def test_discard_keeps_entry_shared_with_another_message(fetched):
+    async def main():
+        buffer = PrefetchBuffer(max_mb=1)
+        buffer.start(message("a", chat_id=1))
+        # همان فایل دوباره (مثلاً با حالت دیگر) که کارش رد شد
+        buffer.start(message("a", chat_id=1), fetch=False)
+        buffer.discard("a")
+        assert await buffer.take("a") == b"%PDF-a"
+
+    asyncio.run(main())
+    assert fetched == ["a"]
+
+
+def test_lookup_does_not_count_message_again(fetched):
+    async def main():
+        buffer = PrefetchBuffer(max_mb=1)
+        msg = message("a")
+        entry = buffer.start(msg)
+        # فایل بدون حالت: همان ورودی نگه داشته می‌شود و کارش بعداً آزادش می‌کند
+        assert buffer.lookup(msg) is entry
+        buffer.hold(1, entry)
+        buffer.discard(buffer.take_waiting(1).file_id)
+        assert not buffer._entries
+
+        assert buffer.lookup(message("b")).task is None
+
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+import asyncio
+
+from modules.router import DOCX_MIME, PDF_MIME, Router, UpdateContext
+
+
+def message(text=None, mime=None, chat_id=1):
+    msg = {"chat": {"id": chat_id}, "from": {"id": chat_id}}
+    if text is not None:
+        msg["text"] = text
+    if mime is not None:
+        msg["document"] = {"file_id": "f1", "file_unique_id": "u1", "mime_type": mime}
+    return msg
+
+
+def make_router(mode=None):
+    calls = []
+    lookups = []
+
+    async def get_mode(chat_id):
+        lookups.append(chat_id)
+        return mode
+
+    router = Router(get_mode)
+
+    def record(name):
+        async def handler(*args):
+            calls.append((name,) + args[1:])
+        return handler
+
+    @router.command("/start")
+    async def start(ctx):
+        calls.append(("start",))
+
+    router.menu_item("📄 PDF → Word", "WORD", "ok", row=0)
+    router.on_menu(record("menu"))
+    router.on_text(record("text"))
+    router.fallback(PDF_MIME)(record("pdf without mode"))
+    router.fallback()(record("unsupported"))
+
+    async def job_runner(ctx, handler, *args):
+        calls.append(("job", handler, ctx.mode) + args)
+
+    router.on_job(job_runner)
+    router.job("WORD", PDF_MIME, "handle_pdf_to_word")
+    router.job("SUMMARY_WORD", DOCX_MIME, "handle_summary_word")
+    router.job("SUMMARY_TEXT", None, "handle_summary_text")
+    return router, calls, lookups
+
+
+def dispatch(router, msg):
+    asyncio.run(router.dispatch(UpdateContext(msg)))
+
+
+def test_commands_do_not_load_mode():
+    router, calls, lookups = make_router("WORD")
+    dispatch(router, message("/start@MyBot now"))
+    assert calls == [("start",)]
+    assert lookups == []
+
+
+def test_menu_button():
+    router, calls, lookups = make_router()
+    dispatch(router, message("📄 PDF → Word"))
+    assert calls[0][0] == "menu"
+    assert calls[0][1].mode == "WORD"
+    assert lookups == []
+
+
+def test_document_goes_to_job_of_current_mode():
+    router, calls, lookups = make_router("WORD")
+    dispatch(router, message(mime=PDF_MIME))
+    assert calls == [("job", "handle_pdf_to_word", "WORD", "f1", "u1")]
+    assert lookups == [1]
+
+
+def test_document_without_matching_mode_uses_fallback():
+    router, calls, _ = make_router(None)
+    dispatch(router, message(mime=PDF_MIME))
+    dispatch(router, message(mime="image/png"))
+    assert calls == [("pdf without mode",), ("unsupported",)]
+
+
+def test_text_job_and_plain_text():
+    router, calls, _ = make_router("SUMMARY_TEXT")
+    dispatch(router, message("some long text"))
+    assert calls == [("job", "handle_summary_text", "SUMMARY_TEXT", "some long text")]
+
+    router, calls, _ = make_router("WORD")
+    dispatch(router, message("hello"))
+    dispatch(router, message("/unknown"))
+    assert calls == [("text",), ("text",)]
+
+
+def test_document_filter_sees_mode_and_can_stop_dispatch():
+    router, calls, lookups = make_router("WORD")
+    seen = []
+
+    @router.document_filter
+    async def too_large(ctx):
+        seen.append(ctx.mode)
+        return True
+
+    dispatch(router, message(mime=PDF_MIME))
+    assert seen == ["WORD"]
+    assert calls == []
+    assert lookups == [1]
+
+
+def test_keyboard_rows():
+    router, _, _ = make_router()
+    router.menu_item("🧾 خلاصه PDF", "SUMMARY_PDF", "ok", row=1)
+    router.menu_item("📝 خلاصه Word", "SUMMARY_WORD", "ok", row=1)
+    assert router.keyboard()["keyboard"] == [
+        [{"text": "📄 PDF → Word"}],
+        [{"text": "🧾 خلاصه PDF"}, {"text": "📝 خلاصه Word"}],
+    ]
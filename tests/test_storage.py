@@ -0,0 +1,125 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from modules.storage import AsyncStorage, MemoryStorage, SQLiteStorage
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def storage(request, tmp_path):
+    if request.param == "memory":
+        storage = MemoryStorage()
+    else:
+        storage = SQLiteStorage(str(tmp_path / "bot.db"))
+    yield storage
+    storage.close()
+
+
+def test_consume_free_then_paid(storage):
+    assert storage.consume_credit(1) == "FREE"
+    assert storage.consume_credit(1) is None
+
+    storage.add_credit(1, 2)
+    assert storage.consume_credit(1) == "PAID"
+    assert storage.consume_credit(1) == "PAID"
+    assert storage.consume_credit(1) is None
+    assert storage.get_access(1) == {"free_used": True, "paid_remaining": 0}
+
+
+def test_refund_returns_the_same_credit(storage):
+    source = storage.consume_credit(1)
+    storage.refund_credit(1, source)
+    assert storage.get_access(1)["free_used"] is False
+
+    storage.add_credit(1, 1)
+    source = storage.consume_credit(1)
+    storage.refund_credit(1, source)
+    assert storage.get_access(1)["paid_remaining"] == 1
+
+
+def test_concurrent_consume_never_double_spends(storage):
+    storage.add_credit(1, 10)
+    with ThreadPoolExecutor(16) as pool:
+        sources = list(pool.map(lambda _: storage.consume_credit(1), range(50)))
+
+    assert sources.count("PAID") == 10
+    assert sources.count(None) == 40
+    assert storage.get_access(1)["paid_remaining"] == 0
+
+
+def test_consume_across_connections(tmp_path):
+    # دو اتصال جدا روی یک فایل، مثل دو پروسس uvicorn
+    path = str(tmp_path / "bot.db")
+    first, second = SQLiteStorage(path), SQLiteStorage(path)
+    try:
+        first.add_credit(1, 20)
+        with ThreadPoolExecutor(8) as pool:
+            sources = list(pool.map(
+                lambda i: (first if i % 2 else second).consume_credit(1), range(40)
+            ))
+        assert sources.count("PAID") == 20
+        assert second.get_access(1)["paid_remaining"] == 0
+    finally:
+        first.close()
+        second.close()
+
+
+def test_async_storage(storage):
+    async def run():
+        wrapped = AsyncStorage(storage)
+        await wrapped.set_state(1, "WORD")
+        await wrapped.set_value("offset", 42)
+        await wrapped.add_credit(1, 1)
+        return (
+            await wrapped.get_state(1),
+            await wrapped.get_value("offset"),
+            await wrapped.consume_credit(1),
+        )
+
+    assert asyncio.run(run()) == ("WORD", 42, "PAID")
+
+
+def test_concurrent_set_state_is_one_transaction(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "bot.db"))
+    batches = []
+    set_states = storage.set_states
+
+    def recording_set_states(states):
+        batches.append(dict(states))
+        set_states(states)
+
+    storage.set_states = recording_set_states
+
+    async def run():
+        wrapped = AsyncStorage(storage)
+        await wrapped.set_state(0, "WORD")
+        await asyncio.gather(*(wrapped.set_state(i, "OCR_PDF") for i in range(1, 20)))
+        return [await wrapped.get_state(i) for i in range(20)]
+
+    try:
+        assert asyncio.run(run()) == ["WORD"] + ["OCR_PDF"] * 19
+        # اولی تنها نوشته شد؛ بقیه که هم‌زمان رسیدند حداکثر در دو تراکنش
+        assert batches[0] == {0: "WORD"}
+        assert len(batches) <= 3
+        assert [storage.get_state(i) for i in range(20)] == ["WORD"] + ["OCR_PDF"] * 19
+    finally:
+        storage.close()
+
+
+def test_set_state_reads_its_own_pending_write(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "bot.db"))
+
+    async def run():
+        wrapped = AsyncStorage(storage)
+        task = asyncio.create_task(wrapped.set_state(1, "WORD"))
+        await asyncio.sleep(0)
+        # هنوز در ترد نوشته می‌شود ولی خواندن همان مقدار را می‌دهد
+        state = await wrapped.get_state(1)
+        await task
+        return state
+
+    try:
+        assert asyncio.run(run()) == "WORD"
+    finally:
+        storage.close()
@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from modules import summarizer
+from modules.summarizer import select_sentences, split_sentences, summarize, tokenize
+
+WORDS = (
+    "cache queue worker page image text model memory network process file speed "
+    "report table figure result system value method analysis"
+).split()
+
+
+def make_text(sentences: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return " ".join(
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 12))).capitalize() + "."
+        for _ in range(sentences)
+    )
+
+
+def test_split_on_persian_marks_and_blank_lines():
+    text = "این چیست؟ آن یک کتاب است۔ جمله\nشکسته‌شده!\n\nپاراگراف بعد"
+    assert split_sentences(text) == [
+        "این چیست؟", "آن یک کتاب است۔", "جمله شکسته‌شده!", "پاراگراف بعد",
+    ]
+
+
+def test_arabic_letters_are_normalized():
+    assert split_sentences("كتاب علي") == ["کتاب علی"]
+
+
+def test_zwnj_words_stay_one_token():
+    assert tokenize("کتاب‌ها را می‌خواهم و 1402 بار") == ["کتاب‌ها", "می‌خواهم", "بار"]
+
+
+def test_short_text_is_returned_whole():
+    assert summarize("One. Two. Three.", max_sentences=5) == "One.\n\nTwo.\n\nThree."
+
+
+def test_summary_keeps_text_order_and_limits():
+    text = make_text(60)
+    sentences = split_sentences(text)
+    summary = summarize(text, max_sentences=5, max_chars=10_000)
+    parts = summary.split("\n\n")
+    assert len(parts) == 5
+    positions = [sentences.index(part) for part in parts]
+    assert positions == sorted(positions)
+
+
+@pytest.mark.parametrize("max_chars", [50, 200, 1000])
+def test_summary_respects_max_chars(max_chars):
+    assert len(summarize(make_text(60), max_sentences=8, max_chars=max_chars)) <= max_chars
+
+
+def test_map_reduce_above_chunk_size(monkeypatch):
+    sizes = []
+    score = summarizer.score_sentences
+
+    def recording_score(token_lists, idf, method=summarizer.SUMMARY_METHOD):
+        sizes.append(len(token_lists))
+        return score(token_lists, idf, method)
+
+    monkeypatch.setattr(summarizer, "score_sentences", recording_score)
+    token_lists = [tokenize(s) for s in split_sentences(make_text(100))]
+
+    chosen = select_sentences(token_lists, 3, chunk_size=20)
+    assert len(chosen) == 3
+    # هیچ ماتریس شباهتی بزرگ‌تر از یک تکه ساخته نشد
+    assert max(sizes) <= 20
+    assert len(sizes) > 5
+
+    sizes.clear()
+    select_sentences(token_lists, 3, chunk_size=400)
+    assert sizes == [100]
+
+
+@pytest.mark.parametrize("text", [
+    "\n\n".join(f"{i} {i * 7}." for i in range(50)),
+    "\n\n".join(["این است."] * 20),
+])
+def test_unscorable_text_falls_back_to_leading_sentences(text):
+    summary = summarize(text, max_sentences=8)
+    assert summary == "\n\n".join(split_sentences(text)[:8])
@@ -0,0 +1,75 @@
+import os
+import asyncio
+
+from modules.jobs import JOB_WORKERS
+from modules.broker import (
+    JOB_BROKER,
+    BROKER_VISIBILITY_TIMEOUT,
+    BROKER_MAX_ATTEMPTS,
+    create_broker,
+)
+from modules.handlers import HANDLERS, WARMUP_HANDLERS, warm_up
+from modules.pool import shutdown_executor
+from modules.telegram_api import send_message, close_client
+
+# وقتی صف خالی است، هر چند ثانیه یک بار دوباره سر بزنیم
+BROKER_POLL_INTERVAL = float(os.getenv("BROKER_POLL_INTERVAL", "0.5"))
+
+
+async def keep_alive(broker, job_id: str):
+    # تا وقتی کار در حال اجراست مهلتش را تمدید می‌کنیم؛
+    # اگر این پروسس بمیرد، مهلت تمام می‌شود و کار دوباره تحویل داده می‌شود.
+    while True:
+        await asyncio.sleep(BROKER_VISIBILITY_TIMEOUT / 3)
+        await asyncio.to_thread(broker.extend, job_id)
+
+
+async def consume(broker, index: int):
+    while True:
+        await asyncio.to_thread(broker.requeue_expired)
+        job = await asyncio.to_thread(broker.reserve)
+        if job is None:
+            await asyncio.sleep(BROKER_POLL_INTERVAL)
+            continue
+
+        job_id, payload, attempts = job
+        chat_id = payload["args"][0]
+
+        if attempts > BROKER_MAX_ATTEMPTS:
+            await asyncio.to_thread(broker.ack, job_id)
+            await send_message(
+                chat_id,
+                "پردازش فایلت چند بار ناموفق بود 😔\n"
+                "لطفاً یه کم بعد دوباره بفرست.",
+            )
+            continue
+
+        heartbeat = asyncio.create_task(keep_alive(broker, job_id))
+        try:
+            await HANDLERS[payload["handler"]](*payload["args"])
+        except Exception as e:
+            print(f"ERROR in broker worker {index}:", e)
+        finally:
+            heartbeat.cancel()
+
+        await asyncio.to_thread(broker.ack, job_id)
+
+
+async def main():
+    # هندلرها (با اسمی که سمت وب در broker ثبت شده) از modules.handlers می‌آیند؛
+    # با WARMUP_HANDLERS قبل از گرفتن اولین کار بار می‌شوند
+    if WARMUP_HANDLERS:
+        await asyncio.to_thread(warm_up)
+    broker = create_broker()
+    try:
+        await asyncio.gather(*(consume(broker, i) for i in range(JOB_WORKERS)))
+    finally:
+        broker.close()
+        await close_client()
+        shutdown_executor()
+
+
+if __name__ == "__main__":
+    if not JOB_BROKER:
+        raise SystemExit("JOB_BROKER is not set (e.g. sqlite:///jobs.db)")
+    asyncio.run(main())